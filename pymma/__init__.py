@@ -4,17 +4,60 @@
 """PYMMA Package."""
 
 from .constants import (LOG_LEVEL, LOG_FORMAT, START_FRAME_REX,  # NOQA
+                        FRAME_PREFIX, DECODER_READ_SIZE,
                         SAMPLE_RATE, HEADER_REX, REJECT_PATHS, GPS_WARM_UP,
-                        NMEA_PROPERTIES)
+                        PACKET_TYPES, FILTER_MAX_KEYS, GEOFENCE_CELL_SIZE,
+                        EARTH_RADIUS_KM,
+                        NMEA_PROPERTIES, TCP_BATCH_BYTES, TCP_BATCH_LATENCY,
+                        DUPE_TTL, DUPE_MAX_ENTRIES, STATS_INTERVAL,
+                        HEARD_MAX_ENTRIES, HEARD_FLUSH_INTERVAL,
+                        SERVER_ADDRESS, SERVER_PORT, SERVER_MAX_CLIENTS,
+                        SERVER_MAX_BUFFER, SERVER_KEEPALIVE,
+                        SUPERVISOR_BACKOFF, SUPERVISOR_MAX_BACKOFF,
+                        STALL_TIMEOUT, LINE_TIMEOUT, AFSK_BAUD,
+                        AFSK_MARK, AFSK_SPACE, AX25_MIN_BITS, AX25_MAX_BITS,
+                        NATIVE_BLOCK_SIZE, DECODE_CHUNK_SECONDS,
+                        DECODE_OVERLAP_SECONDS, DECODE_BLOCK_SAMPLES,
+                        KISS_FEND, KISS_FESC, KISS_TFEND,
+                        KISS_TFESC, KISS_PORT, KISS_SPEED, IQ_SAMPLE_RATE,
+                        IQ_FORMAT, IQ_BLOCK_SAMPLES, FM_DEVIATION,
+                        FIR_TAPS_PER_PHASE, CHANNELIZER_OUTPUTS,
+                        GATE_THRESHOLD, GATE_WINDOW, GATE_PRE_ROLL, GATE_HANG,
+                        QUEUE_MAX_DEPTH, QUEUE_POLICY,
+                        QUEUE_POLICIES, QUEUE_BLOCK_TIMEOUT, METRICS_ADDRESS,
+                        METRICS_INTERVAL, LATENCY_BUCKETS, CONNECT_TIMEOUT,
+                        HAPPY_EYEBALLS_DELAY, DOWNLINK_TIMEOUT,
+                        DOWNLINK_MAX_LINE, SPOOL_SEGMENT_BYTES,
+                        SPOOL_MAX_BYTES, SPOOL_MAX_AGE, SPOOL_REPLAY_RATE,
+                        SPOOL_FSYNC_FRAMES, SPOOL_FSYNC_INTERVAL, TRANSPORTS,
+                        HTTP_URL, HTTP_BATCH_FRAMES, HTTP_BATCH_BYTES,
+                        HTTP_BATCH_LATENCY, HTTP_RETRIES,
+                        HTTP_BACKOFF, HTTP_MAX_BACKOFF, HTTP_TIMEOUT,
+                        HTTP_POOL_SIZE, UDP_GATEWAY, UDP_BATCH_FRAMES,
+                        UDP_RESOLVE_INTERVAL)
 
 from .exceptions import InvalidFrame  # NOQA
 
 from .functions import (process_ambiguity, encode_lat, encode_lng,  # NOQA
-                        get_beacon_frame, get_status_frame,
-                        get_weather_frame)
+                        encode_frame, get_receiver_configs, ax25_fcs,
+                        parse_gateway, happy_eyeballs_connect,
+                        decode_ax25, encode_ax25, kiss_unescape,
+                        encode_kiss, decode_position,
+                        get_beacon_frame,
+                        get_status_frame, get_weather_frame)
+
+from .dsp import (AFSKDemodulator, afsk_modulate, fm_modulate,  # NOQA
+                  lowpass_taps, Mixer, Decimator, Discriminator,
+                  FMDemodulator, Channelizer, EnergyGate, IQFileSource,
+                  RtlSdrSource, SoapySource, open_iq_source,
+                  decode_pcm_chunk)
 
 from .classes import (IGateThread, StaticBeaconThread, GPSBeaconThread,  # NOQA
-                      MultimonThread, SerialGPSPoller)
+                      MultimonThread, SerialGPSPoller, DupeCache,
+                      HeardStation, HeardList, HeardListThread, FanoutServer,
+                      FilterRule, CircleFence, PolygonFence, Geofence,
+                      FrameFilter, FrameQueue, Histogram, Metrics,
+                      MetricsThread, Spool)
 
 __author__ = 'Greg Albrecht W2GMD <oss@undef.net>'
 __copyright__ = 'Copyright 2016 Dominik Heidler'
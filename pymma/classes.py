@@ -3,18 +3,27 @@
 
 """PYMMA Classes."""
 
-import errno
+import bisect
+import collections
+import concurrent.futures
+import http.server
 import itertools
 import logging
+import math
+import os
 import queue
-import random
+import re
+import select
+import selectors
 import socket
+import sqlite3
 import subprocess
 import threading
 import time
 
 import pkg_resources
 import requests
+import requests.adapters
 
 import serial
 
@@ -29,6 +38,591 @@ __copyright__ = 'Copyright 2016 Dominik Heidler'
 __license__ = 'GNU General Public License, Version 3'
 
 
+class FrameQueue(queue.Queue):
+
+    """
+    Bounded frame queue with an overflow policy and a priority lane.
+
+    Priority frames (beacons and other locally generated frames) are handed
+    out first and, when the queue is full, displace the oldest gated RF
+    frame instead of being subject to the overflow policy.
+    """
+
+    def __init__(self, maxsize: int = pymma.QUEUE_MAX_DEPTH,
+                 policy: str = pymma.QUEUE_POLICY,
+                 block_timeout: float = pymma.QUEUE_BLOCK_TIMEOUT) -> None:
+        if policy not in pymma.QUEUE_POLICIES:
+            raise ValueError(
+                'Unknown queue policy "{}", expected one of: {}'.format(
+                    policy, ', '.join(pymma.QUEUE_POLICIES)))
+        self.stats: dict = {
+            'depth': 0,
+            'high_water': 0,
+            'dropped_oldest': 0,
+            'dropped_newest': 0,
+        }
+        super(FrameQueue, self).__init__(maxsize)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        # Self-pipe making the queue selectable, created on first fileno().
+        self._wakeup_fds = None
+        self._signalled = False
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """Builds a FrameQueue from the `queue` config section."""
+        queue_config = config.get('queue', {})
+        return cls(
+            int(queue_config.get('max_depth', pymma.QUEUE_MAX_DEPTH)),
+            queue_config.get('policy', pymma.QUEUE_POLICY),
+            float(queue_config.get(
+                'block_timeout', pymma.QUEUE_BLOCK_TIMEOUT)))
+
+    def _init(self, maxsize: int) -> None:
+        self.queue: collections.deque = collections.deque()
+        self.priority_queue: collections.deque = collections.deque()
+
+    def _qsize(self) -> int:
+        return len(self.queue) + len(self.priority_queue)
+
+    def _get(self):
+        if self.priority_queue:
+            item = self.priority_queue.popleft()
+        else:
+            item = self.queue.popleft()
+        self.stats['depth'] -= 1
+        return item
+
+    def get(self, block=True, timeout=None):
+        return super(FrameQueue, self).get(block, timeout)[1]
+
+    def get_stamped(self, block=True, timeout=None) -> tuple:
+        """
+        Removes and returns a (stamp, item) tuple from the queue, where
+        stamp is the time.monotonic() the frame was received at.
+        """
+        return super(FrameQueue, self).get(block, timeout)
+
+    def fileno(self) -> int:
+        """
+        Returns a descriptor that becomes readable when frames are put, so
+        the queue can be registered with a selector.
+
+        The consumer calls clear_wakeup() before draining the queue.
+        """
+        with self.mutex:
+            if self._wakeup_fds is None:
+                self._wakeup_fds = os.pipe()
+                for wakeup_fd in self._wakeup_fds:
+                    os.set_blocking(wakeup_fd, False)
+                if self._qsize():
+                    self._signal()
+            return self._wakeup_fds[0]
+
+    def _signal(self) -> None:
+        # Called with the mutex held; writes at most one byte per wakeup.
+        if self._wakeup_fds is None or self._signalled:
+            return
+        self._signalled = True
+        try:
+            os.write(self._wakeup_fds[1], b'\x00')
+        except BlockingIOError:
+            pass
+
+    def wake(self) -> None:
+        """Makes fileno() readable, waking up a consumer's selector."""
+        with self.mutex:
+            self._signal()
+
+    def clear_wakeup(self) -> None:
+        """
+        Resets fileno() to not readable. Frames put afterwards signal it
+        again, so nothing is missed by draining the queue after this call.
+        """
+        with self.mutex:
+            if not self._signalled:
+                return
+            self._signalled = False
+            try:
+                while os.read(self._wakeup_fds[0], 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def _drop_oldest(self, lane: collections.deque) -> None:
+        lane.popleft()
+        self.unfinished_tasks -= 1
+        self.stats['depth'] -= 1
+        self.stats['dropped_oldest'] += 1
+
+    def _make_room(self, priority: bool, endtime: float = None) -> bool:
+        """
+        Applies the overflow policy if the queue is full, with the mutex
+        held. Returns False when the new item is to be dropped instead.
+        """
+        if self.maxsize <= 0 or self._qsize() < self.maxsize:
+            return True
+
+        if priority and self.queue:
+            self._drop_oldest(self.queue)
+        elif self.policy == 'drop_oldest':
+            self._drop_oldest(self.queue or self.priority_queue)
+        elif self.policy == 'drop_newest':
+            self.stats['dropped_newest'] += 1
+            return False
+        else:
+            if endtime is None:
+                endtime = time.monotonic() + self.block_timeout
+            while self._qsize() >= self.maxsize:
+                remaining = endtime - time.monotonic()
+                if remaining <= 0:
+                    self.stats['dropped_newest'] += 1
+                    return False
+                self.not_full.wait(remaining)
+        return True
+
+    def _append(self, item, stamp: float, priority: bool) -> None:
+        if priority:
+            self.priority_queue.append((stamp, item))
+        else:
+            self.queue.append((stamp, item))
+
+        self.stats['depth'] += 1
+        if self.stats['depth'] > self.stats['high_water']:
+            self.stats['high_water'] = self.stats['depth']
+        self.unfinished_tasks += 1
+
+    def put(self, item, block=True, timeout=None, priority=False,  # NOQA pylint: disable=arguments-differ
+            stamp=None):
+        """
+        Puts item on the queue, applying the overflow policy when full.
+
+        Under the `block` policy, waits for room at most timeout seconds,
+        defaulting to block_timeout, or not at all if block is False.
+        stamp is when the frame was received, defaulting to now. Raises
+        queue.Full when the item itself is dropped.
+        """
+        if stamp is None:
+            stamp = time.monotonic()
+
+        endtime = None
+        if not block:
+            endtime = time.monotonic()
+        elif timeout is not None:
+            if timeout < 0:
+                raise ValueError("'timeout' must be a non-negative number")
+            endtime = time.monotonic() + timeout
+
+        with self.not_full:
+            if not self._make_room(priority, endtime):
+                raise queue.Full
+            self._append(item, stamp, priority)
+            self.not_empty.notify()
+            self._signal()
+
+    def put_many(self, items: list, stamp: float = None) -> int:
+        """
+        Puts a batch of items received together on the queue, taking the
+        lock and waking consumers once for all of them.
+
+        Returns how many were queued. Once one item is dropped by the
+        overflow policy the rest of the batch is dropped with it; under the
+        `block` policy the whole batch waits at most block_timeout.
+        """
+        if not items:
+            return 0
+        if stamp is None:
+            stamp = time.monotonic()
+
+        queued = 0
+        with self.not_full:
+            endtime = None
+            if self.policy == 'block':
+                endtime = time.monotonic() + self.block_timeout
+            for item in items:
+                if not self._make_room(False, endtime):
+                    self.stats['dropped_newest'] += len(items) - queued - 1
+                    break
+                self._append(item, stamp, False)
+                queued += 1
+
+            if queued:
+                self.not_empty.notify(queued)
+                self._signal()
+        return queued
+
+
+class Histogram(object):
+
+    """Cumulative histogram with fixed bucket upper bounds."""
+
+    def __init__(self, buckets: tuple = pymma.LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Records one observation."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics(object):
+
+    """
+    Registry of component stats, rendered in the Prometheus text format.
+
+    Components keep updating their own `stats` dicts and histograms; the
+    registry only reads them when metrics are rendered, so it adds nothing
+    to the hot path.
+    """
+
+    def __init__(self) -> None:
+        self._collectors: list = []
+
+    def register(self, name: str, stats, labels: dict = None) -> None:
+        """
+        Registers a stats dict (or a callable returning one) under name.
+
+        Numeric values become `pymma_<name>_<key>` samples and Histogram
+        values become histograms.
+        """
+        self._collectors.append((name, stats, labels or {}))
+
+    @staticmethod
+    def _labels(labels: dict) -> str:
+        if not labels:
+            return ''
+        return '{' + ','.join(
+            '{}="{}"'.format(key, str(value).replace('"', '\\"'))
+            for key, value in sorted(labels.items())) + '}'
+
+    def render(self) -> str:
+        """Renders all registered stats in the Prometheus text format."""
+        families: collections.OrderedDict = collections.OrderedDict()
+
+        for name, stats, labels in self._collectors:
+            if callable(stats):
+                stats = stats()
+            for key, value in list(stats.items()):
+                metric = 'pymma_{}_{}'.format(name, key)
+                family = families.setdefault(metric, [])
+                if isinstance(value, Histogram):
+                    family.append((labels, value))
+                elif isinstance(value, (int, float)):
+                    family.append((labels, float(value)))
+
+        lines = []
+        for metric, samples in families.items():
+            if samples and isinstance(samples[0][1], Histogram):
+                lines.append('# TYPE {} histogram'.format(metric))
+                for labels, histogram in samples:
+                    cumulative = 0
+                    for bound, count in zip(
+                            histogram.buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append('{}_bucket{} {}'.format(
+                            metric, self._labels(dict(labels, le=bound)),
+                            cumulative))
+                    lines.append('{}_sum{} {}'.format(
+                        metric, self._labels(labels), histogram.sum))
+                    lines.append('{}_count{} {}'.format(
+                        metric, self._labels(labels), histogram.count))
+            else:
+                for labels, value in samples:
+                    lines.append('{}{} {}'.format(
+                        metric, self._labels(labels), value))
+
+        return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):  # NOQA pylint: disable=invalid-name
+        """Serves the metrics page."""
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class MetricsThread(threading.Thread):
+
+    """
+    Serves Metrics over HTTP for Prometheus and/or periodically dumps them to
+    a file (eg. for the node_exporter textfile collector).
+    """
+
+    _logger = logging.getLogger(__name__)
+    if not _logger.handlers:
+        _logger.setLevel(pymma.LOG_LEVEL)
+        _console_handler = logging.StreamHandler()
+        _console_handler.setLevel(pymma.LOG_LEVEL)
+        _console_handler.setFormatter(pymma.LOG_FORMAT)
+        _logger.addHandler(_console_handler)
+        _logger.propagate = False
+
+    def __init__(self, metrics: Metrics, config: dict) -> None:
+        super(MetricsThread, self).__init__()
+        self.metrics = metrics
+        self.config = config
+        self.httpd = None
+
+        metrics_config = self.config.get('metrics', {})
+        self.address: str = metrics_config.get(
+            'address', pymma.METRICS_ADDRESS)
+        self.port: int = int(metrics_config.get('port', 0))
+        self.path: str = metrics_config.get('file')
+        self.interval: float = float(
+            metrics_config.get('interval', pymma.METRICS_INTERVAL))
+
+        self.daemon = True
+        self._stopper = threading.Event()
+
+    def stop(self):
+        """
+        Stop the thread at the next opportunity.
+        """
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+        self._stopper.set()
+
+    def stopped(self):
+        """
+        Checks if the thread is stopped.
+        """
+        return self._stopper.isSet()
+
+    def _dump(self) -> None:
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as metrics_file:
+            metrics_file.write(self.metrics.render())
+        os.replace(tmp_path, self.path)
+
+    def run(self):
+        """
+        Runs the thread.
+        """
+        if self.port:
+            self.httpd = http.server.ThreadingHTTPServer(
+                (self.address, self.port), _MetricsHandler)
+            self.httpd.daemon_threads = True
+            self.httpd.metrics = self.metrics
+            self._logger.info(
+                'Serving metrics on http://%s:%s/metrics',
+                self.address, self.port)
+            threading.Thread(
+                target=self.httpd.serve_forever, daemon=True).start()
+
+        while not self.stopped():
+            if self.path:
+                try:
+                    self._dump()
+                except OSError as exc:
+                    self._logger.warning(
+                        'Failed to write metrics to "%s": %s', self.path, exc)
+            self._stopper.wait(self.interval)
+
+
+class Spool(object):  # pylint: disable=too-many-instance-attributes
+
+    """
+    Append-only on-disk spool of encoded frames.
+
+    Frames are appended to size-limited segment files as
+    `<unix time> <frame>\\n` records and fsynced in batches. They are read
+    back oldest segment first, and segments are deleted once read, so a
+    crash mid-replay only resends part of a segment.
+
+    Stamps are passed in and out on the time.monotonic() clock, so frames
+    that fail to send again after a replay keep their original time when
+    spooled back.
+    """
+
+    def __init__(self, path: str,  # NOQA pylint: disable=too-many-arguments
+                 segment_bytes: int = pymma.SPOOL_SEGMENT_BYTES,
+                 max_bytes: int = pymma.SPOOL_MAX_BYTES,
+                 max_age: float = pymma.SPOOL_MAX_AGE,
+                 fsync_frames: int = pymma.SPOOL_FSYNC_FRAMES,
+                 fsync_interval: float = pymma.SPOOL_FSYNC_INTERVAL) -> None:
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.fsync_frames = fsync_frames
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._writer = None
+        self._writer_path = ''
+        self._reader = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        os.makedirs(self.path, exist_ok=True)
+        self._segments: collections.deque = collections.deque(sorted(
+            os.path.join(self.path, name) for name in os.listdir(self.path)
+            if name.endswith('.spool')))
+        self._next_segment = len(self._segments) and int(
+            os.path.basename(self._segments[-1]).split('.')[0]) + 1
+
+        self.stats: dict = {
+            'spooled': 0,
+            'replayed': 0,
+            'expired': 0,
+            'dropped_segments': 0,
+            'segments': len(self._segments),
+            'bytes': sum(
+                os.path.getsize(segment) for segment in self._segments),
+        }
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Builds a Spool from the `spool` config section, or returns None if
+        no spool path is configured.
+        """
+        spool_config = config.get('spool', {})
+        if not spool_config.get('path'):
+            return None
+        return cls(
+            spool_config['path'],
+            int(spool_config.get(
+                'segment_bytes', pymma.SPOOL_SEGMENT_BYTES)),
+            int(spool_config.get('max_bytes', pymma.SPOOL_MAX_BYTES)),
+            float(spool_config.get('max_age', pymma.SPOOL_MAX_AGE)),
+            int(spool_config.get('fsync_frames', pymma.SPOOL_FSYNC_FRAMES)),
+            float(spool_config.get(
+                'fsync_interval', pymma.SPOOL_FSYNC_INTERVAL)))
+
+    def __bool__(self) -> bool:
+        return bool(self._segments)
+
+    def _open_writer(self) -> None:
+        self._writer_path = os.path.join(
+            self.path, '{:016d}.spool'.format(self._next_segment))
+        self._next_segment += 1
+        self._writer = open(self._writer_path, 'ab')
+        self._segments.append(self._writer_path)
+        self.stats['segments'] = len(self._segments)
+
+    def _close_writer(self) -> None:
+        if self._writer is not None:
+            self._sync()
+            self._writer.close()
+            self._writer = None
+
+    def _sync(self) -> None:
+        self._writer.flush()
+        os.fsync(self._writer.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _remove_oldest(self) -> None:
+        segment = self._segments.popleft()
+        if segment == self._writer_path:
+            self._close_writer()
+        try:
+            self.stats['bytes'] -= os.path.getsize(segment)
+            os.remove(segment)
+        except OSError:
+            pass
+        self.stats['segments'] = len(self._segments)
+
+    def extend(self, raw_frames: list, stamps: list = None) -> None:
+        """
+        Appends encoded frames, optionally with the time.monotonic() stamps
+        they were received at.
+        """
+        now = time.time()
+        offset = now - time.monotonic()
+        with self._lock:
+            for index, raw_frame in enumerate(raw_frames):
+                if self._writer is None or \
+                        self._writer.tell() >= self.segment_bytes:
+                    self._close_writer()
+                    self._open_writer()
+                stamp = stamps[index] + offset if stamps else now
+                record = b'%.3f %s' % (stamp, raw_frame)
+                self._writer.write(record)
+                self.stats['bytes'] += len(record)
+            self.stats['spooled'] += len(raw_frames)
+            self._unsynced += len(raw_frames)
+
+            if self._unsynced >= self.fsync_frames or \
+                    time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+            # Make room by dropping the oldest segments, rolling the one
+            # being written to first if it is the only one left.
+            while self.stats['bytes'] > self.max_bytes and self._segments:
+                if self._segments[0] == self._writer_path and \
+                        len(self._segments) == 1:
+                    self._close_writer()
+                    self._open_writer()
+                if self._reader is not None:
+                    self._reader.close()
+                    self._reader = None
+                self._remove_oldest()
+                self.stats['dropped_segments'] += 1
+
+    def pop(self, limit: int) -> list:
+        """
+        Removes and returns up to limit (stamp, encoded frame) tuples,
+        oldest first, skipping any older than max_age.
+        """
+        records: list = []
+        now = time.time()
+        offset = now - time.monotonic()
+        cutoff = now - self.max_age
+        with self._lock:
+            while len(records) < limit and self._segments:
+                if self._reader is None:
+                    if self._segments[0] == self._writer_path:
+                        self._close_writer()
+                    self._reader = open(self._segments[0], 'rb')
+
+                record = self._reader.readline()
+                if not record.endswith(b'\n'):
+                    # End of segment (or a record cut short by a crash).
+                    self._reader.close()
+                    self._reader = None
+                    self._remove_oldest()
+                    continue
+
+                stamp, _, raw_frame = record.partition(b' ')
+                try:
+                    stamp = float(stamp)
+                except ValueError:
+                    continue
+                if stamp < cutoff:
+                    self.stats['expired'] += 1
+                    continue
+                records.append((stamp - offset, raw_frame))
+
+            self.stats['replayed'] += len(records)
+        return records
+
+    def close(self) -> None:
+        """Syncs and closes the spool's files."""
+        with self._lock:
+            self._close_writer()
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+
 class IGateThread(threading.Thread):  # pylint: disable=too-many-instance-attributes
 
     """PYMMA IGate Class."""
@@ -42,7 +636,7 @@ class IGateThread(threading.Thread):  # pylint: disable=too-many-instance-attrib
         _logger.addHandler(_console_handler)
         _logger.propagate = False
 
-    def __init__(self, frame_queue: queue.Queue, config: dict) -> None:
+    def __init__(self, frame_queue: FrameQueue, config: dict) -> None:
         super(IGateThread, self).__init__()
         self.frame_queue = frame_queue
         self.config = config
@@ -50,30 +644,142 @@ class IGateThread(threading.Thread):  # pylint: disable=too-many-instance-attrib
         self.server: str = ''
         self.port: int = 0
         self.connected: bool = False
-        self.socket: socket.socket = socket.socket
+        self.socket = None
 
         self.callsign: str = self.config['callsign']
         self.passcode: str = self.config['passcode']
-        self.gateways: list = itertools.cycle(self.config['gateways'])
+        self.gateways: list = list(self.config['gateways'])
+        self.gateway: str = ''
         self.proto: str = self.config.get('proto', 'any')
 
+        self.transport: str = self.config.get('transport', 'tcp')
+        if self.transport not in pymma.TRANSPORTS:
+            raise ValueError(
+                'Unknown transport "{}", expected one of: {}'.format(
+                    self.transport, ', '.join(pymma.TRANSPORTS)))
+
+        http_config = self.config.get('http', {})
+        self.http_url: str = http_config.get('url', pymma.HTTP_URL)
+        self.http_batch_frames: int = int(
+            http_config.get('batch_frames', pymma.HTTP_BATCH_FRAMES))
+        self.http_batch_bytes: int = int(
+            http_config.get('batch_bytes', pymma.HTTP_BATCH_BYTES))
+        self.http_batch_latency: float = float(
+            http_config.get('batch_latency', pymma.HTTP_BATCH_LATENCY))
+        self.http_retries: int = int(
+            http_config.get('retries', pymma.HTTP_RETRIES))
+        self.http_backoff: float = float(
+            http_config.get('backoff', pymma.HTTP_BACKOFF))
+        self.http_max_backoff: float = float(
+            http_config.get('max_backoff', pymma.HTTP_MAX_BACKOFF))
+        self.http_timeout: float = float(
+            http_config.get('timeout', pymma.HTTP_TIMEOUT))
+        self.http_pool_size: int = int(
+            http_config.get('pool_size', pymma.HTTP_POOL_SIZE))
+
+        udp_config = self.config.get('udp', {})
+        self.udp_gateway: str = udp_config.get('gateway', pymma.UDP_GATEWAY)
+        self.udp_batch_frames: int = int(
+            udp_config.get('batch_frames', pymma.UDP_BATCH_FRAMES))
+        self.udp_resolve_interval: float = float(
+            udp_config.get('resolve_interval', pymma.UDP_RESOLVE_INTERVAL))
+        self._udp_address = None
+        self._udp_resolved = 0.0
+
+        tcp_config = self.config.get('tcp', {})
+        self.connect_timeout: float = float(
+            tcp_config.get('connect_timeout', pymma.CONNECT_TIMEOUT))
+
+        # Links silent for longer than this (in seconds) are failed over,
+        # 0 disables dead link detection.
+        self.downlink_timeout: float = float(
+            tcp_config.get('downlink_timeout', pymma.DOWNLINK_TIMEOUT))
+        self.last_heard = 0.0
+        self._standby_heard = 0.0
+        self._downlink = b''
+
+        # A second, logged in, connection kept ready for failover.
+        self.use_standby: bool = bool(tcp_config.get('standby', True))
+        self.standby = None
+        self._standby_lock = threading.Lock()
+        self._standby_refreshing = threading.Event()
+        self.batch_bytes: int = int(
+            tcp_config.get('batch_bytes', pymma.TCP_BATCH_BYTES))
+        self.batch_latency: float = float(
+            tcp_config.get('batch_latency', pymma.TCP_BATCH_LATENCY))
+
+        # Frames are spooled to disk while APRS-IS is unreachable, and
+        # replayed at replay_rate frames/s once reconnected.
+        self.spool = Spool.from_config(self.config)
+        self.replay_rate: float = float(self.config.get('spool', {}).get(
+            'replay_rate', pymma.SPOOL_REPLAY_RATE))
+        self._replay_allowance = 0.0
+        self._last_replay = time.monotonic()
+
+        # TCP event loop state: the batch being collected, and batches
+        # waiting for the socket to become writable, as
+        # [raw_batch, offset, raw_frames, stamps, started, replayed] lists.
+        self._selector = None
+        self._batch: list = []
+        self._batch_stamps: list = []
+        self._batch_size = 0
+        self._batch_started = 0.0
+        self._pending: collections.deque = collections.deque()
+
+        self.stats: dict = {
+            'batches': 0,
+            'frames_sent': 0,
+            'bytes_sent': 0,
+            'max_batch_frames': 0,
+            'last_flush_latency': 0.0,
+            'max_flush_latency': 0.0,
+            'connects': 0,
+            'connect_failures': 0,
+            'failovers': 0,
+            'gateway_rtt': 0.0,
+            'standby_ready': 0,
+            'send_errors': 0,
+            'retries': 0,
+            'dropped': 0,
+            'resolves': 0,
+            'downlink_lines': 0,
+            'downlink_frames': 0,
+            'keepalives': 0,
+            'dead_links': 0,
+            'verified': 0,
+            # Time from a frame being read from the decoder to the socket
+            # write completing.
+            'end_to_end_latency_seconds': Histogram(),
+        }
+
         self.daemon = True
         self._stopper = threading.Event()
 
-        # Try to get my version
+        self.version = self.get_version()
+
+    @classmethod
+    def get_version(cls) -> str:
+        """
+        Gets the installed pymma version, or 'GIT' when running from source.
+        """
         try:
-            self.version = pkg_resources.get_distribution(
-                'pymma').version
+            return pkg_resources.get_distribution('pymma').version
         except Exception as exc:  # pylint: disable=broad-except
-            self._logger.exception(exc)
-            self.version = 'GIT'
+            cls._logger.exception(exc)
+            return 'GIT'
 
     def stop(self):
         """
         Stop the thread at the next opportunity.
         """
-        self._disconnect()
         self._stopper.set()
+        self.frame_queue.wake()
+        self._disconnect()
+        standby = self._take_standby()
+        if standby is not None:
+            standby[1].close()
+        if self.spool is not None:
+            self.spool.close()
 
     def stopped(self):
         """
@@ -85,63 +791,325 @@ class IGateThread(threading.Thread):  # pylint: disable=too-many-instance-attrib
         """
         Runs the thread.
         """
-        self._logger.info('Starting IGate Thread="%s"', self)
-        self._tcp_worker()
+        self._logger.info(
+            'Starting IGate Thread="%s" transport="%s"', self, self.transport)
+        if self.transport == 'http':
+            self._http_worker()
+        elif self.transport == 'udp':
+            self._udp_worker()
+        else:
+            self._tcp_worker()
+
+    def log_stats(self) -> None:
+        """Logs uplink, queue and spool counters."""
+        stats = {key: value for key, value in self.stats.items()
+                 if not isinstance(value, Histogram)}
+        self._logger.info(
+            'IGate stats stats="%s" queue="%s" spool="%s"', stats,
+            getattr(self.frame_queue, 'stats', None),
+            getattr(self.spool, 'stats', None))
+
+    def downlink_stats(self) -> dict:
+        """
+        Returns the seconds since the uplink last heard from the server, for
+        the metrics endpoint.
+        """
+        if not self.connected or not self.last_heard:
+            return {}
+        return {'last_heard_age_seconds': time.monotonic() - self.last_heard}
+
+    def _family(self) -> int:
+        if self.proto == 'ipv6':
+            return socket.AF_INET6
+        elif self.proto == 'ipv4':
+            return socket.AF_INET
+        return socket.AF_UNSPEC
+
+    def _probe(self, gateway: str) -> tuple:
+        """
+        Connects to gateway, reads its hello and logs in, returning
+        (rtt, gateway, socket, logresp) where rtt covers the whole exchange
+        up to the login response.
+        """
+        host, port = pymma.parse_gateway(gateway)
+        started = time.monotonic()
+
+        sock = pymma.happy_eyeballs_connect(
+            host, port, self._family(), self.connect_timeout)
+        connected = time.monotonic()
+
+        try:
+            sock.settimeout(self.connect_timeout)
+            server_hello = sock.recv(1024)
+            if not server_hello:
+                raise socket.error('Connection closed before server hello')
+            hello = time.monotonic()
+            logresp = self._login(sock)
+        except Exception:
+            sock.close()
+            raise
+
+        rtt = time.monotonic() - started
+        self._logger.info(
+            'Probed gateway="%s" connect_rtt="%.3f" hello_rtt="%.3f" '
+            'rtt="%.3f" server_hello="%s"',
+            gateway, connected - started, hello - started, rtt, server_hello)
+        return rtt, gateway, sock, logresp
+
+    def _probe_gateways(self, exclude: str = None) -> list:
+        """
+        Probes all gateways in parallel, returning (rtt, gateway, socket,
+        logresp) tuples for those that accepted a login, fastest first.
+        """
+        gateways = [gateway for gateway in self.gateways
+                    if gateway != exclude]
+        if not gateways:
+            return []
+
+        results = []
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=len(gateways)) as executor:
+            futures = {executor.submit(self._probe, gateway): gateway
+                       for gateway in gateways}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    results.append(future.result())
+                except (socket.error, OSError) as exc:
+                    self.stats['connect_failures'] += 1
+                    self._logger.warning(
+                        'Error when connecting to "%s": "%s"',
+                        futures[future], exc)
+
+        results.sort(key=lambda result: result[0])
+        return results
+
+    def _login(self, sock: socket.socket) -> bytes:
+        """
+        Logs in to APRS-IS on a connected socket, returning the server's
+        login response line.
+        """
+        login_info = bytes(
+            ('user {} pass {} vers PYMMA {} filter m/10\r\n'.format(
+                self.callsign, self.passcode, self.version)),
+            'utf8'
+        )
+        sock.settimeout(self.connect_timeout)
+        sock.sendall(login_info)
+
+        server_return = b''
+        while True:
+            data = sock.recv(1024)
+            if not data:
+                raise socket.error('Connection closed during login')
+            server_return += data
+            # Only complete lines, the response may arrive in pieces.
+            logresp = [line.rstrip(b'\r')
+                       for line in server_return.split(b'\n')[:-1]
+                       if line.startswith(b'# logresp ')]
+            if logresp:
+                break
+            if len(server_return) > pymma.DOWNLINK_MAX_LINE:
+                raise socket.error('No login response from server')
+        self._logger.info('server_return="%s"', server_return)
+        sock.settimeout(None)
+        return logresp[0]
+
+    def _logresp(self, line: bytes) -> None:
+        """
+        Handles a '# logresp CALL verified|unverified, server NAME' line.
+        """
+        verified = b' verified' in line
+        self.stats['verified'] = int(verified)
+        if verified:
+            self._logger.info('Login response="%s"', line)
+        else:
+            self._logger.warning(
+                'Login not verified (check passcode) response="%s"', line)
+
+    @staticmethod
+    def _login_best(results: list):
+        """
+        Keeps the fastest logged in gateway, closing the rest.
+        Returns (rtt, gateway, socket, logresp) or None.
+        """
+        if not results:
+            return None
+        for result in results[1:]:
+            result[2].close()
+        return results[0]
+
+    def _take_standby(self):
+        with self._standby_lock:
+            standby, self.standby = self.standby, None
+        self.stats['standby_ready'] = 0
+        return standby
+
+    def _refresh_standby(self) -> None:
+        """
+        Connects and logs in to the next best gateway, keeping it as a hot
+        standby for failover.
+        """
+        try:
+            while not self.stopped() and self.standby is None:
+                standby = self._login_best(
+                    self._probe_gateways(exclude=self.gateway))
+                if standby is not None:
+                    with self._standby_lock:
+                        self.standby = standby[1:]
+                        self._standby_heard = time.monotonic()
+                    self.stats['standby_ready'] = 1
+                    self._logger.info(
+                        'Standby gateway="%s" rtt="%.3f"',
+                        standby[1], standby[0])
+                    # Let the TCP event loop start watching it.
+                    self.frame_queue.wake()
+                    break
+                self._stopper.wait(self.connect_timeout)
+        finally:
+            self._standby_refreshing.clear()
+
+    def _start_standby_refresh(self) -> None:
+        if not self.use_standby or len(self.gateways) < 2:
+            return
+        if self._standby_refreshing.is_set():
+            return
+        self._standby_refreshing.set()
+        threading.Thread(target=self._refresh_standby, daemon=True).start()
+
+    def _use_gateway(self, gateway: str, sock: socket.socket,
+                     logresp: bytes) -> None:
+        self._logresp(logresp)
+        self.gateway = gateway
+        self.server, self.port = pymma.parse_gateway(gateway)
+        # Writes are driven by the TCP event loop and already batched, so
+        # Nagle would only add delay.
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.socket = sock
+        self.connected = True
+        self.last_heard = time.monotonic()
+        self._downlink = b''
+        self.stats['connects'] += 1
+        self._logger.info('Connected to gateway="%s"', gateway)
 
     def _connect(self) -> None:
         """
         Connects to the APRS-IS network.
+
+        Fails over to the hot standby connection when one is ready,
+        otherwise probes all gateways in parallel and logs in to the
+        fastest.
         """
-        while not self.connected:
-            try:
-                # Connect
-                gateway = next(self.gateways)
-                self.server, self.port = gateway.split(':')
-                self.port = int(self.port)
-
-                if self.proto == 'ipv6':
-                    addrinfo = socket.getaddrinfo(
-                        self.server, self.port, socket.AF_INET6)
-                elif self.proto == 'ipv4':
-                    addrinfo = socket.getaddrinfo(
-                        self.server, self.port, socket.AF_INET)
-                else:
-                    addrinfo = socket.getaddrinfo(self.server, self.port)
+        while not self.connected and not self.stopped():
+            standby = self._take_standby()
+            if standby is not None:
+                self._logger.info(
+                    'Failing over to standby gateway="%s"', standby[0])
+                self.stats['failovers'] += 1
+                self._use_gateway(*standby)
+                break
 
-                self.socket = socket.socket(*addrinfo[0][0:3])
+            chosen = self._login_best(self._probe_gateways())
+            if chosen is not None:
+                self.stats['gateway_rtt'] = chosen[0]
+                self._use_gateway(*chosen[1:])
+                break
 
-                self._logger.info(
-                    "Connecting to %s:%i", addrinfo[0][4][0], self.port)
+            self._spool_wait(1)
 
-                self.socket.connect(addrinfo[0][4])
+        self._start_standby_refresh()
 
-                self._logger.info('Connected!')
+    def _spool_wait(self, timeout: float) -> None:
+        """
+        Waits for timeout seconds, moving queued frames to the spool in the
+        meantime if there is one.
+        """
+        if self.spool is None:
+            time.sleep(timeout)
+            return
 
-                server_hello = self.socket.recv(1024)
-                self._logger.info('server_hello="%s"', server_hello)
+        deadline = time.monotonic() + timeout
+        raw_frames: list = []
+        stamps: list = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                stamp, frame = self.frame_queue.get_stamped(True, remaining)
+            except queue.Empty:
+                break
+            raw_frames.append(pymma.encode_frame(frame))
+            stamps.append(stamp)
+            if len(raw_frames) >= 1000:
+                self.spool.extend(raw_frames, stamps)
+                raw_frames, stamps = [], []
 
-                # Login
-                login_info = bytes(
-                    ('user {} pass {} vers PYMMA {} filter m/10\r\n'.format(
-                        self.callsign, self.passcode, self.version)),
-                    'utf8'
-                )
-                self.socket.send(login_info)
+        if raw_frames:
+            self.spool.extend(raw_frames, stamps)
 
-                server_return = self.socket.recv(1024)
-                self._logger.info('server_return="%s"', server_return)
+    def _replay_spool(self) -> None:
+        """
+        Sends spooled frames, paced at replay_rate frames per second.
+        """
+        now = time.monotonic()
+        self._replay_allowance = min(
+            self.replay_rate,
+            self._replay_allowance +
+            (now - self._last_replay) * self.replay_rate)
+        self._last_replay = now
+
+        if not self.spool or self._replay_allowance < 1:
+            return
 
-                self.connected = True
-            except socket.error as ex:
-                self._logger.warning(
-                    "Error when connecting to %s:%d: '%s'",
-                    self.server, self.port, str(ex))
-                time.sleep(1)
+        records = self.spool.pop(int(self._replay_allowance))
+        self._replay_allowance -= len(records)
+        if records:
+            stamps, raw_frames = map(list, zip(*records))
+            self._pending.append(
+                [b''.join(raw_frames), 0, raw_frames, stamps, now, True])
+            self._logger.debug('Replayed spooled frames="%s"', len(records))
+
+    def _failover(self) -> None:
+        """
+        Drops the current connection and connects again, to the standby if
+        one is ready.
+        """
+        self.connected = False
+        self._disconnect()
+        self._connect()
+
+    def _drain_standby(self) -> None:
+        """
+        Reads (and discards) pending data on the standby connection, so it
+        stays healthy, replacing it if it has failed.
+        """
+        standby = self.standby
+        if standby is None:
+            return
+
+        sock = standby[1]
+        try:
+            while True:
+                data = sock.recv(4096, socket.MSG_DONTWAIT)
+                if not data:
+                    raise socket.error('Standby connection closed')
+                self._standby_heard = time.monotonic()
+        except BlockingIOError:
+            return
+        except (socket.error, OSError) as exc:
+            self._logger.warning(
+                'Lost standby gateway="%s": "%s"', standby[0], exc)
+            if self._take_standby() is not None:
+                sock.close()
+            self._start_standby_refresh()
 
     def _disconnect(self) -> None:
         """
         Disconnects/closes socket.
         """
+        if self.socket is None:
+            return
         try:
             self.socket.close()
         except Exception as exc:  # pylint: disable=broad-except
@@ -150,142 +1118,496 @@ class IGateThread(threading.Thread):  # pylint: disable=too-many-instance-attrib
 
     def send(self, frame: APRSPacket) -> None:
         """
-        Adds frame to APRS-IS queue.
+        Adds a locally generated frame to the APRS-IS queue, ahead of gated
+        RF frames.
         """
         try:
-            # wait 10sec for queue slot, then drop the data
-            self.frame_queue.put(frame, True, 10)
-        except Exception as exc:  # pylint: disable=broad-except
-            self._logger.exception(exc)
+            self.frame_queue.put(frame, priority=True)
+        except queue.Full:
             self._logger.warning(
                 'Lost TX data (queue full): "%s"', frame)
 
+    def _post_batch(self, session: requests.Session,  # NOQA pylint: disable=too-many-arguments
+                    login_info: bytes, raw_frames: list, stamps: list,
+                    started: float, replayed: bool = False) -> None:
+        """
+        POSTs a batch of frames under one login line, retrying failures with
+        bounded exponential backoff.
+        """
+        body = login_info + b''.join(raw_frames)
+
+        for attempt in range(self.http_retries + 1):
+            try:
+                response = session.post(
+                    self.http_url, data=body, timeout=self.http_timeout)
+                response.raise_for_status()
+                self._logger.debug(
+                    'response="%s" response.text="%s"',
+                    response, response.text)
+                self._record_sent(
+                    raw_frames, len(body), stamps, started, replayed)
+                return
+            except requests.RequestException as exc:
+                self.stats['send_errors'] += 1
+                self._logger.warning(
+                    'HTTP POST to "%s" failed (attempt %s): "%s"',
+                    self.http_url, attempt + 1, exc)
+
+            if attempt < self.http_retries:
+                self.stats['retries'] += 1
+                if self._stopper.wait(min(
+                        self.http_max_backoff,
+                        self.http_backoff * 2 ** attempt)):
+                    break
+
+        if self.spool is not None:
+            self.spool.extend(raw_frames, stamps)
+        else:
+            self.stats['dropped'] += len(raw_frames)
+            self._logger.warning(
+                'Lost TX data (HTTP POST failed): %s frames', len(raw_frames))
+
     def _http_worker(self) -> None:
-        self._logger.info('Running HTTP Worker Thread.')
+        """
+        Sends queued frames to APRS-IS with batched, keep-alive HTTP POSTs.
+        """
+        self._logger.info('Running HTTP Worker Thread url="%s"', self.http_url)
+
+        login_info = bytes(
+            'user {} pass {} vers PYMMA {}\r\n'.format(
+                self.callsign, self.passcode, self.version), 'utf8')
+
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.http_pool_size)
 
         with requests.Session() as session:
-            session.headers.update(
-                {'content-type': 'application/octet-stream'})
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({
+                'content-type': 'application/octet-stream',
+                'accept-type': 'text/plain',
+            })
 
             while not self.stopped():
                 try:
-                    # wait max 1sec for new data
-                    frame = self.frame_queue.get(True, 1)
-                    if not frame:
-                        next
+                    raw_frames, stamps, started = self._next_batch(
+                        self.http_batch_frames, self.http_batch_bytes,
+                        self.http_batch_latency)
+                except queue.Empty:
+                    continue
 
-                    self._logger.info('Sending via HTTP frame="%s"', frame)
+                self._post_batch(
+                    session, login_info, raw_frames, stamps, started)
 
-                    # Login
-                    login_info = (
-                        'user {} pass {} vers PYMMA {}').format(
-                            self.callsign, self.passcode, self.version)
-                    data = '\n'.join([login_info, str(frame)])
+                if self.spool:
+                    records = self.spool.pop(self.http_batch_frames)
+                    if records:
+                        stamps, raw_frames = map(list, zip(*records))
+                        self._post_batch(
+                            session, login_info, raw_frames, stamps,
+                            time.monotonic(), True)
 
-                    response = session.post(
-                        'http://noam.aprs2.net:8080', data=data)
-                    self._logger.debug(
-                        'response="%s" response.text="%s"',
-                        response, response.text)
-                    #session.raise_for_error()
+        self._logger.debug('Sending thread exit.')
 
-                except queue.Empty:
-                    pass
+    def _udp_resolve(self) -> None:
+        """
+        Resolves the UDP gateway and (re)connects the datagram socket when
+        its address has changed.
+        """
+        host, port = pymma.parse_gateway(self.udp_gateway)
+        self._udp_resolved = time.monotonic()
+        family, socktype, proto, _, address = socket.getaddrinfo(
+            host, port, self._family(), socket.SOCK_DGRAM)[0]
+        self.stats['resolves'] += 1
 
-        self._logger.debug('Sending thread exit.')
+        if address == self._udp_address and self.socket is not None:
+            return
+
+        self._disconnect()
+        self.socket = socket.socket(family, socktype, proto)
+        # Connecting a datagram socket saves a route lookup per send.
+        self.socket.connect(address)
+        self._udp_address = address
+        self._logger.info(
+            'Sending via UDP to gateway="%s" address="%s"',
+            self.udp_gateway, address)
+
+    def _udp_send_batch(self, login_info: bytes, raw_frames: list,
+                        stamps: list, started: float) -> None:
+        """
+        Sends a batch of frames, one datagram per frame.
+
+        Each datagram is gathered from the pre-encoded login line and the
+        frame with sendmsg(), without joining them in Python.
+        """
+        sendmsg = self.socket.sendmsg
+        sent_frames: list = []
+        sent_bytes = 0
+        for raw_frame in raw_frames:
+            try:
+                sent_bytes += sendmsg((login_info, raw_frame))
+                sent_frames.append(raw_frame)
+            except OSError as exc:
+                self.stats['send_errors'] += 1
+                self.stats['dropped'] += 1
+                self._logger.warning(
+                    'UDP send to gateway="%s" failed: "%s"',
+                    self.udp_gateway, exc)
+                # Re-resolve before the next batch, the gateway may have moved.
+                self._udp_resolved = 0.0
+
+        if sent_frames:
+            self._record_sent(sent_frames, sent_bytes, stamps, started)
 
     def _udp_worker(self) -> None:
+        """
+        Sends queued frames to APRS-IS as UDP datagrams.
+        """
         self._logger.info('Running UDP Worker Thread.')
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        login_info = bytes(
+            'user {} pass {} vers PYMMA {}\n'.format(
+                self.callsign, self.passcode, self.version), 'utf8')
 
         while not self.stopped():
+            if time.monotonic() - self._udp_resolved > \
+                    self.udp_resolve_interval:
+                try:
+                    self._udp_resolve()
+                except (socket.gaierror, OSError) as exc:
+                    self._logger.warning(
+                        'Unable to resolve UDP gateway="%s": "%s"',
+                        self.udp_gateway, exc)
+                    if self.socket is None:
+                        self._udp_resolved = 0.0
+                        self._stopper.wait(self.connect_timeout)
+                        continue
+
             try:
-                # wait max 1sec for new data
-                frame = self.frame_queue.get(True, 1)
-                if not frame:
-                    next
-
-                self._logger.info('Sending via UDP frame="%s"', frame)
-                login = 'user {} pass {} vers PYMMA {}'.format(
-                    self.callsign, self.passcode, self.version)
-                raw_frame = bytes('\n'.join([login, str(frame)]), 'utf8')
-                self.socket.sendto(raw_frame, ('noam.aprs2.net', 8080))
+                raw_frames, stamps, started = self._next_batch(
+                    self.udp_batch_frames)
             except queue.Empty:
-                pass
+                continue
+
+            self._udp_send_batch(login_info, raw_frames, stamps, started)
+
         self._logger.debug('UDP Worker Thread Exit.')
 
+    def _next_batch(self, max_frames: int = 0, max_bytes: int = 0,
+                    latency: float = 0.0) -> tuple:
+        """
+        Drains ready frames from the queue into a single batch.
+
+        Waits up to 1sec for the first frame, then keeps collecting until
+        max_frames or max_bytes (0 for no limit) is reached, latency seconds
+        have passed or, once they have, the queue is empty.
+        """
+        # wait max 1sec for new data
+        stamp, frame = self.frame_queue.get_stamped(True, 1)
+        started = time.monotonic()
+        deadline = started + latency
+
+        raw_frames: list = []
+        stamps: list = []
+        batch_size = 0
+
+        while True:
+            if frame:
+                self._logger.debug('Sending frame="%s"', frame)
+                raw_frame = pymma.encode_frame(frame)
+                raw_frames.append(raw_frame)
+                stamps.append(stamp)
+                batch_size += len(raw_frame)
+
+            if (max_bytes and batch_size >= max_bytes) or \
+                    len(raw_frames) == max_frames:
+                break
+
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    stamp, frame = self.frame_queue.get_stamped(
+                        True, remaining)
+                else:
+                    stamp, frame = self.frame_queue.get_stamped(False)
+            except queue.Empty:
+                break
+
+        return raw_frames, stamps, started
+
+    def _record_sent(self, raw_frames: list,  # NOQA pylint: disable=too-many-arguments
+                     batch_bytes: int, stamps: list, started: float,
+                     replayed: bool = False) -> None:
+        """
+        Updates the uplink stats after a batch has been written.
+
+        Replayed frames are left out of the end-to-end latency histogram,
+        which would otherwise measure the outage they were spooled for.
+        """
+        sent = time.monotonic()
+        flush_latency = sent - started
+        frames = len(raw_frames)
+
+        if not replayed:
+            latency = self.stats['end_to_end_latency_seconds']
+            for stamp in stamps:
+                latency.observe(sent - stamp)
+
+        self.stats['batches'] += 1
+        self.stats['frames_sent'] += frames
+        self.stats['bytes_sent'] += batch_bytes
+        self.stats['last_flush_latency'] = flush_latency
+        if frames > self.stats['max_batch_frames']:
+            self.stats['max_batch_frames'] = frames
+        if flush_latency > self.stats['max_flush_latency']:
+            self.stats['max_flush_latency'] = flush_latency
+
+        self._logger.debug(
+            'Sent batch frames="%s" bytes="%s" flush_latency="%.6f"',
+            frames, batch_bytes, flush_latency)
+
+    def _tcp_watch(self) -> None:
+        """
+        Brings the selector registrations in line with the current state:
+        the uplink is always read and written to while batches are pending,
+        the queue is only read from while nothing is pending, and the
+        standby connection is read from while there is one.
+        """
+        wanted: dict = {}
+        if self.socket is not None:
+            events = selectors.EVENT_READ
+            if self._pending:
+                events |= selectors.EVENT_WRITE
+            wanted[self.socket] = (events, self._on_uplink)
+        if not self._pending:
+            wanted[self.frame_queue] = (selectors.EVENT_READ, self._on_queue)
+        standby = self.standby
+        if standby is not None:
+            wanted[standby[1]] = (selectors.EVENT_READ, self._on_standby)
+
+        for key in list(self._selector.get_map().values()):
+            if key.fileobj not in wanted:
+                self._selector.unregister(key.fileobj)
+
+        for fileobj, (events, callback) in wanted.items():
+            try:
+                key = self._selector.get_key(fileobj)
+            except KeyError:
+                self._selector.register(fileobj, events, callback)
+                continue
+            if key.events != events or key.data != callback:
+                self._selector.modify(fileobj, events, callback)
+
+    def _tcp_timeout(self):
+        """
+        Returns how long the event loop may sleep: until a link would be
+        considered dead, the batch being collected is due, or the next spool
+        replay.
+        """
+        timeouts = []
+        if self.downlink_timeout:
+            timeouts.append(
+                self.last_heard + self.downlink_timeout - time.monotonic())
+            if self.standby is not None:
+                timeouts.append(
+                    self._standby_heard + self.downlink_timeout -
+                    time.monotonic())
+        if self._batch:
+            timeouts.append(
+                self._batch_started + self.batch_latency - time.monotonic())
+        if self.spool:
+            timeouts.append(1 / self.replay_rate)
+        if not timeouts:
+            return None
+        return max(0, min(timeouts))
+
+    def _on_queue(self, _) -> None:
+        """
+        Moves ready frames from the queue into the batch being collected.
+        """
+        self.frame_queue.clear_wakeup()
+        while self._batch_size < self.batch_bytes:
+            try:
+                stamp, frame = self.frame_queue.get_stamped(False)
+            except queue.Empty:
+                return
+            if not frame:
+                continue
+            self._logger.debug('Sending frame="%s"', frame)
+            raw_frame = pymma.encode_frame(frame)
+            if not self._batch:
+                self._batch_started = time.monotonic()
+            self._batch.append(raw_frame)
+            self._batch_stamps.append(stamp)
+            self._batch_size += len(raw_frame)
+
+        # The byte budget is used up with frames still queued.
+        self.frame_queue.wake()
+
+    def _flush_batch(self) -> None:
+        """
+        Hands the batch being collected to the socket once it is full or
+        its latency budget has expired.
+        """
+        if not self._batch:
+            return
+        if self._batch_size < self.batch_bytes and \
+                time.monotonic() < self._batch_started + self.batch_latency:
+            return
+
+        self._pending.append([
+            b''.join(self._batch), 0, self._batch, self._batch_stamps,
+            self._batch_started, False])
+        self._batch, self._batch_stamps, self._batch_size = [], [], 0
+        self._write_pending()
+
+    def _write_pending(self) -> None:
+        """
+        Writes pending batches until the socket would block.
+        """
+        while self._pending:
+            entry = self._pending[0]
+            raw_batch, offset = entry[0], entry[1]
+            try:
+                offset += self.socket.send(memoryview(raw_batch)[offset:])
+            except BlockingIOError:
+                return
+            except socket.error:
+                self.stats['send_errors'] += 1
+                raise
+
+            if offset < len(raw_batch):
+                entry[1] = offset
+                return
+
+            self._pending.popleft()
+            self._record_sent(
+                entry[2], len(raw_batch), entry[3], entry[4], entry[5])
+
+    def _on_uplink(self, mask: int) -> None:
+        if mask & selectors.EVENT_READ:
+            try:
+                data = self.socket.recv(65536)
+            except BlockingIOError:
+                data = None
+            if data is not None:
+                if not data:
+                    raise socket.error('Connection closed by gateway')
+                self._on_downlink(data)
+        if mask & selectors.EVENT_WRITE:
+            self._write_pending()
+
+    def _on_downlink(self, data: bytes) -> None:
+        """
+        Splits data received from APRS-IS into lines, tracking server
+        keepalives and login responses.
+        """
+        self.last_heard = time.monotonic()
+
+        lines = (self._downlink + data).split(b'\n')
+        self._downlink = lines.pop()
+        if len(self._downlink) > pymma.DOWNLINK_MAX_LINE:
+            self._downlink = b''
+
+        for line in lines:
+            line = line.rstrip(b'\r')
+            if not line:
+                continue
+            self.stats['downlink_lines'] += 1
+            if line.startswith(b'# logresp '):
+                self._logresp(line)
+            elif line.startswith(b'#'):
+                self.stats['keepalives'] += 1
+                self._logger.debug('Server keepalive="%s"', line)
+            else:
+                self.stats['downlink_frames'] += 1
+
+    def _check_downlink(self) -> None:
+        """
+        Raises socket.error when the uplink has been silent for longer than
+        downlink_timeout, such as a half-open connection whose server has
+        gone away, and replaces a standby connection that has gone silent.
+        """
+        if not self.downlink_timeout:
+            return
+        now = time.monotonic()
+
+        standby = self.standby
+        if standby is not None and \
+                now - self._standby_heard >= self.downlink_timeout:
+            self.stats['dead_links'] += 1
+            self._logger.warning(
+                'Lost standby gateway="%s": "silent for %.0f seconds"',
+                standby[0], now - self._standby_heard)
+            if self._take_standby() is not None:
+                standby[1].close()
+            self._start_standby_refresh()
+
+        silence = now - self.last_heard
+        if silence < self.downlink_timeout:
+            return
+        self.stats['dead_links'] += 1
+        raise socket.error(
+            'No data from gateway for {:.0f} seconds'.format(silence))
+
+    def _on_standby(self, _) -> None:
+        self._drain_standby()
+
+    def _abandon_pending(self) -> None:
+        """
+        Spools (or drops) batches that were not completely written before
+        the connection failed.
+        """
+        while self._pending:
+            _, _, raw_frames, stamps, _, _ = self._pending.popleft()
+            if self.spool is not None:
+                self.spool.extend(raw_frames, stamps)
+            else:
+                self.stats['dropped'] += len(raw_frames)
+                self._logger.warning(
+                    'Lost TX data (connection failed): %s frames',
+                    len(raw_frames))
+
     def _tcp_worker(self) -> None:
         """
-        Running as a thread, reading from socket, sending queue to socket
+        Running as a thread, sending queued frames to APRS-IS and reading
+        from it in a single selector loop, woken up by the frame queue, the
+        sockets and batch/replay deadlines only.
         """
         self._logger.info('Running TCP Worker Thread %s', self)
 
+        self._selector = selectors.DefaultSelector()
         self._connect()
 
         while not self.stopped():
             try:
-                try:
-                    # wait max 1sec for new data
-                    frame = self.frame_queue.get(True, 1)
-                    if not frame:
-                        next
-                    self._logger.info('Sending via TCP frame="%s"', frame)
-                    raw_frame = bytes(str(frame) + '\n', 'utf8')
-
-                    total_sent = 0
-                    while total_sent < len(raw_frame):
-                        sent = self.socket.send(raw_frame[total_sent:])
-                        if sent == 0:
-                            raise socket.error(
-                                0,
-                                'Failed to send data - '
-                                'number of sent bytes: 0')
-                        total_sent += sent
-                        self._logger.debug(
-                            'total_sent="%s" sent="%s"', total_sent, sent)
-                except queue.Empty:
-                    pass
+                self._tcp_watch()
+                for key, mask in self._selector.select(self._tcp_timeout()):
+                    key.data(mask)
 
-                # (try to) read from socket to prevent buffer fillup
-                self.socket.setblocking(False)
+                self._check_downlink()
+                self._flush_batch()
 
-                try:
-                    self.socket.recv(4096)
-                except socket.error as exc:
-                    if exc.errno != 11:
-                        # if the error is other than 'rx queue empty'
-                        raise
-
-                self.socket.setblocking(True)
-            except socket.error as exc:
+                if self.spool and not self._pending:
+                    self._replay_spool()
+                    self._write_pending()
+            except (socket.error, ValueError) as exc:
                 # possible errors on IO:
-                # [Errno  11] Buffer is empty (maybe not when using blocking
-                #             sockets)
                 # [Errno  32] Broken Pipe
                 # [Errno 104] Connection reset by peer
                 # [Errno 110] Connection time out
                 #
-                self._logger.exception(exc)
+                # ValueError is raised for a socket closed by stop().
+                if self.stopped():
+                    break
 
-                rand_sleep = random.randint(1, 20)
-
-                if exc.errno == errno.EAGAIN or exc.errno == errno.EWOULDBLOCK:
-                    self._logger.warning(
-                        'Connection issue, sleeping for %ss: "%s"',
-                        rand_sleep, str(exc))
-                    time.sleep(rand_sleep)
-                elif exc.errno == errno.EPIPE:
-                    self._logger.exception(exc)
-                    raise
-                else:
-                    self._logger.warning(
-                        'Connection issue, sleeping for %ss: "%s"',
-                        rand_sleep, str(exc))
-                    time.sleep(rand_sleep)
-
-                    # try to reconnect
-                    self._connect()
+                self._logger.warning(
+                    'Connection issue with gateway="%s", failing over: "%s"',
+                    self.gateway, str(exc))
+                self._abandon_pending()
+                self._failover()
 
+        self._selector.close()
         self._logger.info('Sending thread exit.')
 
 
@@ -362,18 +1684,445 @@ class StaticBeaconThread(threading.Thread):
             if frame:
                 self.igate.send(frame)
 
-            # Weather
-            frame = pymma.get_weather_frame(**bcargs_weather)
-            if frame:
-                self.igate.send(frame)
+            # Weather
+            frame = pymma.get_weather_frame(**bcargs_weather)
+            if frame:
+                self.igate.send(frame)
+
+            time.sleep(beacon_config['send_every'])
+
+
+class GPSBeaconThread(threading.Thread):
+
+    """
+    Threaded Beacon.
+    """
+
+    _logger = logging.getLogger(__name__)
+    if not _logger.handlers:
+        _logger.setLevel(pymma.LOG_LEVEL)
+        _console_handler = logging.StreamHandler()
+        _console_handler.setLevel(pymma.LOG_LEVEL)
+        _console_handler.setFormatter(pymma.LOG_FORMAT)
+        _logger.addHandler(_console_handler)
+        _logger.propagate = False
+
+    def __init__(self, igate, config, gps):
+        super(GPSBeaconThread, self).__init__()
+        self.igate = igate
+        self.config = config
+        self.gps = gps
+        self.daemon = True
+        self._stopper = threading.Event()
+
+    def stop(self):
+        """
+        Stop the thread at the next opportunity.
+        """
+        self._stopper.set()
+
+    def stopped(self):
+        """
+        Checks if the thread is stopped.
+        """
+        return self._stopper.isSet()
+
+    def run(self):
+        """
+        Runs the thread.
+        """
+        self._logger.info('Starting Beacon Thread="%s"', self)
+
+        beacon_config = self.config.get('beacon')
+
+
+        bcargs_status = {
+            'callsign': self.igate.callsign,
+            'status': beacon_config['status'],
+        }
+
+        bcargs_weather = {
+            'callsign': self.igate.callsign,
+            'weather': beacon_config['weather'],
+        }
+
+        while not self.stopped():
+            # Position
+            bcargs = {
+                'lat': float(self.gps.gps_props['latitude']),
+                'lng': float(self.gps.gps_props['longitude']),
+                'altitude': self.gps.gps_props.get('altitude', 0),
+                'callsign': self.igate.callsign,
+                'table': beacon_config['table'],
+                'symbol': beacon_config['symbol'],
+                'comment': beacon_config['comment'],
+                'ambiguity': beacon_config['location'].get('ambiguity', 0),
+            }
+
+            frame = pymma.get_beacon_frame(**bcargs)
+            if frame:
+                self.igate.send(frame)
+
+            # Status
+            frame = pymma.get_status_frame(**bcargs_status)
+            if frame:
+                self.igate.send(frame)
+
+            # Weather
+            frame = pymma.get_weather_frame(**bcargs_weather)
+            if frame:
+                self.igate.send(frame)
+
+            time.sleep(beacon_config['send_every'])
+
+
+class DupeCache(object):
+
+    """
+    Time-windowed duplicate frame cache.
+
+    Keys are kept in insertion order, so expired entries are always at the
+    front and can be dropped in O(1) each as new keys arrive.
+    """
+
+    def __init__(self, ttl: float = pymma.DUPE_TTL,
+                 max_entries: int = pymma.DUPE_MAX_ENTRIES) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: dict = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evictions': 0,
+        }
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Builds a DupeCache from the `dedupe` config section, or returns None
+        if duplicate suppression is disabled.
+        """
+        dedupe_config = config.get('dedupe', {})
+        ttl = float(dedupe_config.get('ttl', pymma.DUPE_TTL))
+        if ttl <= 0:
+            return None
+        return cls(ttl, int(
+            dedupe_config.get('max_entries', pymma.DUPE_MAX_ENTRIES)))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def is_dupe(self, key: tuple, now: float = None) -> bool:
+        """
+        Checks if key was seen within the TTL, remembering it if not.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        entries = self._entries
+        with self._lock:
+            cutoff = now - self.ttl
+            while entries:
+                oldest = next(iter(entries))
+                if entries[oldest] > cutoff:
+                    break
+                del entries[oldest]
+                self.stats['expired'] += 1
+
+            if key in entries:
+                self.stats['hits'] += 1
+                return True
+
+            self.stats['misses'] += 1
+            entries[key] = now
+            if len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+        return False
+
+
+class HeardStation(object):  # pylint: disable=too-few-public-methods
+
+    """A station in the HeardList."""
+
+    __slots__ = ('callsign', 'lat', 'lng', 'path', 'packets', 'unflushed',
+                 'first_heard', 'last_heard', 'receiver', 'channel')
+
+    def __init__(self, callsign: bytes, now: float) -> None:
+        self.callsign = callsign
+        self.lat = None
+        self.lng = None
+        self.path = b''
+        self.packets = 0
+        # Packets not yet added to the database.
+        self.unflushed = 0
+        self.first_heard = now
+        self.last_heard = now
+        self.receiver = None
+        self.channel = None
+
+    def row(self) -> tuple:
+        """Returns the station as a row of the `heard` table."""
+        return (self.callsign.decode(errors='replace'), self.lat, self.lng,
+                self.path.decode(errors='replace'), self.unflushed,
+                self.first_heard, self.last_heard, self.receiver,
+                self.channel)
+
+    def as_dict(self) -> dict:
+        """Returns the station as a dict."""
+        return dict(zip(HeardList.COLUMNS, self.row()), packets=self.packets)
+
+
+class HeardList(object):
+
+    """
+    Table of every station heard, with its last position and path, packet
+    count and first and last heard times.
+
+    Stations are __slots__ records in LRU order, so the least recently
+    heard is evicted once max_entries are kept. Changed stations are
+    written to SQLite (in WAL mode, so readers never block the writer) by
+    flush() in one transaction, from HeardListThread rather than the
+    receivers.
+    """
+
+    COLUMNS = ('callsign', 'lat', 'lng', 'path', 'packets', 'first_heard',
+               'last_heard', 'receiver', 'channel')
+
+    def __init__(self, path: str = None,
+                 max_entries: int = pymma.HEARD_MAX_ENTRIES) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._stations: collections.OrderedDict = collections.OrderedDict()
+        self._dirty: set = set()
+        # Rows of changed stations evicted before they were flushed.
+        self._evicted: list = []
+        self._lock = threading.Lock()
+        self._db = None
+        self.stats: dict = {
+            'stations': 0,
+            'frames': 0,
+            'evictions': 0,
+            'flushes': 0,
+            'rows_flushed': 0,
+            'flush_seconds': 0.0,
+            'flush_errors': 0,
+        }
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Builds a HeardList from the `heard` config section, or returns None
+        if there is none.
+        """
+        heard_config = config.get('heard')
+        if heard_config is None:
+            return None
+        return cls(heard_config.get('path'), int(heard_config.get(
+            'max_entries', pymma.HEARD_MAX_ENTRIES)))
+
+    def __len__(self) -> int:
+        return len(self._stations)
+
+    def heard(self, source: bytes, dest: bytes, path: list,  # NOQA pylint: disable=too-many-arguments
+              payload: bytes, receiver: str = None,
+              channel: float = None) -> None:
+        """
+        Records a frame from source. Used as a MultimonThread listener.
+        """
+        now = time.time()
+        position = pymma.decode_position(dest, payload)
+        stations = self._stations
+
+        with self._lock:
+            station = stations.get(source)
+            if station is None:
+                station = stations[source] = HeardStation(source, now)
+                if len(stations) > self.max_entries:
+                    self._evict()
+                self.stats['stations'] = len(stations)
+            else:
+                stations.move_to_end(source)
+            station.last_heard = now
+            station.packets += 1
+            station.unflushed += 1
+            station.path = b','.join(path)
+            station.receiver = receiver
+            station.channel = channel
+            if position is not None:
+                station.lat, station.lng = position
+            self._dirty.add(source)
+            self.stats['frames'] += 1
+
+    def _evict(self) -> None:
+        callsign, station = self._stations.popitem(last=False)
+        if callsign in self._dirty:
+            self._dirty.discard(callsign)
+            self._evicted.append(station.row())
+        self.stats['evictions'] += 1
+
+    def get(self, callsign: str) -> dict:
+        """Returns the station heard as callsign, or None."""
+        with self._lock:
+            station = self._stations.get(callsign.encode())
+            return None if station is None else station.as_dict()
+
+    def recent(self, limit: int = 20) -> list:
+        """Returns the most recently heard stations, most recent first."""
+        with self._lock:
+            stations = list(itertools.islice(
+                reversed(self._stations.values()), limit))
+            return [station.as_dict() for station in stations]
+
+    def _open(self):
+        db = sqlite3.connect(self.path)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.execute(
+            'CREATE TABLE IF NOT EXISTS heard ('
+            'callsign TEXT PRIMARY KEY, lat REAL, lng REAL, path TEXT, '
+            'packets INTEGER, first_heard REAL, last_heard REAL, '
+            'receiver TEXT, channel REAL)')
+        db.commit()
+        return db
+
+    def flush(self) -> int:
+        """
+        Writes the stations changed since the last flush to the database
+        in one transaction, returning how many were written.
+        """
+        if not self.path:
+            return 0
+
+        with self._lock:
+            rows = self._evicted
+            self._evicted = []
+            for callsign in self._dirty:
+                station = self._stations[callsign]
+                rows.append(station.row())
+                station.unflushed = 0
+            self._dirty = set()
+        if not rows:
+            return 0
+
+        started = time.monotonic()
+        try:
+            if self._db is None:
+                self._db = self._open()
+            with self._db:
+                self._db.executemany(
+                    'INSERT INTO heard VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT(callsign) DO UPDATE SET '
+                    'lat = coalesce(excluded.lat, lat), '
+                    'lng = coalesce(excluded.lng, lng), '
+                    'path = excluded.path, '
+                    'packets = packets + excluded.packets, '
+                    'first_heard = min(first_heard, excluded.first_heard), '
+                    'last_heard = excluded.last_heard, '
+                    'receiver = excluded.receiver, '
+                    'channel = excluded.channel', rows)
+        except sqlite3.Error:
+            self.stats['flush_errors'] += 1
+            with self._lock:
+                self._evicted.extend(rows)
+            raise
+        finally:
+            self.stats['flush_seconds'] += time.monotonic() - started
+
+        self.stats['flushes'] += 1
+        self.stats['rows_flushed'] += len(rows)
+        return len(rows)
+
+    def close(self) -> None:
+        """Closes the database."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class HeardListThread(threading.Thread):
+
+    """Periodically flushes a HeardList to SQLite."""
+
+    _logger = logging.getLogger(__name__)
+    if not _logger.handlers:
+        _logger.setLevel(pymma.LOG_LEVEL)
+        _console_handler = logging.StreamHandler()
+        _console_handler.setLevel(pymma.LOG_LEVEL)
+        _console_handler.setFormatter(pymma.LOG_FORMAT)
+        _logger.addHandler(_console_handler)
+        _logger.propagate = False
+
+    def __init__(self, heard_list: HeardList, config: dict) -> None:
+        super(HeardListThread, self).__init__()
+        self.heard_list = heard_list
+        self.interval: float = float(config.get('heard', {}).get(
+            'flush_interval', pymma.HEARD_FLUSH_INTERVAL))
+
+        self.daemon = True
+        self._stopper = threading.Event()
+
+    def stop(self):
+        """
+        Stop the thread at the next opportunity.
+        """
+        self._stopper.set()
+
+    def stopped(self):
+        """
+        Checks if the thread is stopped.
+        """
+        return self._stopper.isSet()
+
+    def log_stats(self) -> None:
+        """Logs the heard list's counters."""
+        self._logger.info('Heard list stats="%s"', self.heard_list.stats)
+
+    def _flush(self) -> None:
+        try:
+            self.heard_list.flush()
+        except sqlite3.Error as exc:
+            self._logger.warning(
+                'Failed to write heard list to "%s": %s',
+                self.heard_list.path, exc)
+
+    def run(self):
+        """
+        Runs the thread.
+        """
+        while not self._stopper.wait(self.interval):
+            self._flush()
+        self._flush()
+        self.heard_list.close()
+
+
+class _FanoutClient(object):  # pylint: disable=too-few-public-methods
+
+    __slots__ = ('sock', 'address', 'outbuf', 'inbuf', 'writing')
 
-            time.sleep(beacon_config['send_every'])
+    def __init__(self, sock: socket.socket, address) -> None:
+        self.sock = sock
+        self.address = address
+        self.outbuf = bytearray()
+        self.inbuf = b''
+        self.writing = False
 
 
-class GPSBeaconThread(threading.Thread):
+class FanoutServer(threading.Thread):  # NOQA pylint: disable=too-many-instance-attributes
 
     """
-    Threaded Beacon.
+    Local APRS-IS style server streaming every gated frame to its
+    clients, so other tools on the host can share the RF feed.
+
+    Receivers hand frames over with publish() and a self-pipe wakes the
+    server's selector loop, so they never wait on a client. Each client
+    has a bounded send buffer written with non-blocking sends; a client
+    that falls max_buffer bytes behind is disconnected. Frames waiting
+    for the server thread are bounded by max_buffer too, dropping the
+    oldest.
     """
 
     _logger = logging.getLogger(__name__)
@@ -385,19 +2134,66 @@ class GPSBeaconThread(threading.Thread):
         _logger.addHandler(_console_handler)
         _logger.propagate = False
 
-    def __init__(self, igate, config, gps):
-        super(GPSBeaconThread, self).__init__()
-        self.igate = igate
-        self.config = config
-        self.gps = gps
+    def __init__(self, config: dict) -> None:
+        super(FanoutServer, self).__init__()
+        server_config = config.get('server', {})
+        self.address: str = server_config.get(
+            'address', pymma.SERVER_ADDRESS)
+        self.port: int = int(server_config.get('port', pymma.SERVER_PORT))
+        self.max_clients: int = int(server_config.get(
+            'max_clients', pymma.SERVER_MAX_CLIENTS))
+        self.max_buffer: int = int(server_config.get(
+            'max_buffer', pymma.SERVER_MAX_BUFFER))
+        self.keepalive_interval: float = float(server_config.get(
+            'keepalive', pymma.SERVER_KEEPALIVE))
+        if bool(config.get('append_callsign')):
+            self._qar_path: bytes = b',qAR,' + config['callsign'].encode()
+        else:
+            self._qar_path = b''
+        self._banner = '# pymma {}\r\n'.format(
+            IGateThread.get_version()).encode()
+
+        self._pending: collections.deque = collections.deque()
+        self._pending_bytes = 0
+        self._lock = threading.Lock()
+        self._wakeup_fds = os.pipe()
+        for wakeup_fd in self._wakeup_fds:
+            os.set_blocking(wakeup_fd, False)
+        self._signalled = False
+        self._selector = selectors.DefaultSelector()
+        self._clients: dict = {}
+        self.server_socket = None
+
+        self.stats: dict = {
+            'clients': 0,
+            'connects': 0,
+            'disconnects': 0,
+            'slow_disconnects': 0,
+            'rejected_clients': 0,
+            'frames': 0,
+            'dropped': 0,
+            'bytes_sent': 0,
+        }
+
         self.daemon = True
         self._stopper = threading.Event()
 
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Builds a FanoutServer from the `server` config section, or returns
+        None if there is none.
+        """
+        if config.get('server') is None:
+            return None
+        return cls(config)
+
     def stop(self):
         """
         Stop the thread at the next opportunity.
         """
         self._stopper.set()
+        self._wake()
 
     def stopped(self):
         """
@@ -405,53 +2201,570 @@ class GPSBeaconThread(threading.Thread):
         """
         return self._stopper.isSet()
 
+    def _wake(self) -> None:
+        with self._lock:
+            if self._signalled:
+                return
+            self._signalled = True
+        self._signal()
+
+    def _signal(self) -> None:
+        try:
+            os.write(self._wakeup_fds[1], b'\x00')
+        except BlockingIOError:
+            pass
+
+    def publish(self, source: bytes, dest: bytes, path: list,  # NOQA pylint: disable=too-many-arguments,unused-argument
+                payload: bytes, receiver: str = None,
+                channel: float = None) -> None:
+        """
+        Queues a frame for every client. Used as a MultimonThread gated
+        listener, so clients see only frames that would be gated.
+        """
+        line = b''.join((
+            source, b'>', dest, b',' if path else b'', b','.join(path),
+            self._qar_path, b':', payload, b'\r\n'))
+        with self._lock:
+            self._pending.append(line)
+            self._pending_bytes += len(line)
+            # The server thread has fallen behind, drop the oldest frames.
+            while self._pending_bytes > self.max_buffer:
+                self._pending_bytes -= len(self._pending.popleft())
+                self.stats['dropped'] += 1
+            if self._signalled:
+                return
+            self._signalled = True
+        self._signal()
+
+    def _on_wakeup(self) -> None:
+        with self._lock:
+            lines, self._pending = self._pending, collections.deque()
+            self._pending_bytes = 0
+            self._signalled = False
+        try:
+            while os.read(self._wakeup_fds[0], 4096):
+                pass
+        except BlockingIOError:
+            pass
+        if lines:
+            self.stats['frames'] += len(lines)
+            self._broadcast(b''.join(lines))
+
+    def _broadcast(self, data: bytes) -> None:
+        for client in list(self._clients.values()):
+            self._send(client, data)
+
+    def _send(self, client: _FanoutClient, data: bytes) -> None:
+        client.outbuf += data
+        self._write(client)
+        if len(client.outbuf) > self.max_buffer:
+            self.stats['slow_disconnects'] += 1
+            self._logger.warning(
+                'Disconnecting slow client="%s" with %s bytes unsent',
+                client.address, len(client.outbuf))
+            self._disconnect(client)
+
+    def _write(self, client: _FanoutClient) -> None:
+        try:
+            sent = client.sock.send(client.outbuf)
+        except BlockingIOError:
+            sent = 0
+        except OSError as exc:
+            self._logger.info(
+                'Client="%s" write failed: "%s"', client.address, exc)
+            self._disconnect(client)
+            return
+        self.stats['bytes_sent'] += sent
+        del client.outbuf[:sent]
+        if client.sock not in self._clients:
+            return
+
+        writing = bool(client.outbuf)
+        if writing != client.writing:
+            client.writing = writing
+            events = selectors.EVENT_READ
+            if writing:
+                events |= selectors.EVENT_WRITE
+            self._selector.modify(client.sock, events, client)
+
+    def _accept(self, server_socket: socket.socket) -> None:
+        try:
+            sock, address = server_socket.accept()
+        except BlockingIOError:
+            return
+        if len(self._clients) >= self.max_clients:
+            self.stats['rejected_clients'] += 1
+            self._logger.warning(
+                'Rejected client="%s", %s clients connected',
+                address, len(self._clients))
+            sock.close()
+            return
+
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = _FanoutClient(sock, address)
+        self._clients[sock] = client
+        self._selector.register(sock, selectors.EVENT_READ, client)
+        self.stats['connects'] += 1
+        self.stats['clients'] = len(self._clients)
+        self._logger.info('Client="%s" connected', address)
+        self._send(client, self._banner)
+
+    def _read(self, client: _FanoutClient) -> None:
+        try:
+            data = client.sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._disconnect(client)
+            return
+
+        lines = (client.inbuf + data).split(b'\n')
+        client.inbuf = lines.pop()[:pymma.DOWNLINK_MAX_LINE]
+        for line in lines:
+            # Logins are accepted as is; the feed is the same for everyone.
+            fields = line.split()
+            if len(fields) > 1 and fields[0] == b'user':
+                self._send(client, b'# logresp %s unverified, server PYMMA\r\n'
+                           % fields[1])
+
+    def _disconnect(self, client: _FanoutClient) -> None:
+        if self._clients.pop(client.sock, None) is None:
+            return
+        self._selector.unregister(client.sock)
+        client.sock.close()
+        self.stats['disconnects'] += 1
+        self.stats['clients'] = len(self._clients)
+        self._logger.info('Client="%s" disconnected', client.address)
+
     def run(self):
         """
         Runs the thread.
         """
-        self._logger.info('Starting Beacon Thread="%s"', self)
+        self.server_socket = socket.create_server((self.address, self.port))
+        self.server_socket.setblocking(False)
+        self._selector.register(self.server_socket, selectors.EVENT_READ)
+        self._selector.register(self._wakeup_fds[0], selectors.EVENT_READ)
+        self._logger.info(
+            'Serving APRS-IS on %s:%s', self.address, self.port)
+
+        next_keepalive = time.monotonic() + self.keepalive_interval
+        while not self.stopped():
+            timeout = None
+            if self.keepalive_interval:
+                timeout = max(next_keepalive - time.monotonic(), 0)
+            for key, events in self._selector.select(timeout):
+                if key.fileobj is self.server_socket:
+                    self._accept(self.server_socket)
+                elif key.fileobj == self._wakeup_fds[0]:
+                    self._on_wakeup()
+                elif key.data.sock in self._clients:
+                    if events & selectors.EVENT_READ:
+                        self._read(key.data)
+                    if events & selectors.EVENT_WRITE and \
+                            key.data.sock in self._clients:
+                        self._write(key.data)
+
+            if self.keepalive_interval and \
+                    time.monotonic() >= next_keepalive:
+                next_keepalive = time.monotonic() + self.keepalive_interval
+                self._broadcast('# pymma {}\r\n'.format(
+                    time.strftime('%d %b %Y %H:%M:%S GMT',
+                                  time.gmtime())).encode())
+
+        for client in list(self._clients.values()):
+            self._disconnect(client)
+        self._selector.close()
+        self.server_socket.close()
+        for wakeup_fd in self._wakeup_fds:
+            os.close(wakeup_fd)
+
+
+class FilterRule(object):  # pylint: disable=too-many-instance-attributes
 
-        beacon_config = self.config.get('beacon')
+    """
+    A compiled frame filter rule, dropping frames that match all of its
+    conditions.
+
+    The conditions are compiled once into a list of checks on the frame's
+    raw source, destination, path tokens and payload, cheapest first. A
+    rate limit is checked last, so it only counts frames matching the rest.
+    """
 
+    # Conditions, from cheapest to most expensive to check.
+    KEYS = ('types', 'source', 'dest', 'path', 'payload', 'rate')
+
+    def __init__(self, name: str, types: list = None, source: list = None,  # NOQA pylint: disable=too-many-arguments
+                 dest: list = None, path: list = None, payload: str = None,
+                 rate: float = 0, per: float = 60, by: str = 'source',
+                 max_keys: int = pymma.FILTER_MAX_KEYS) -> None:
+        self.name = name
+        self.cost = 0
+        checks = []
+
+        if types:
+            unknown = set(types).difference(pymma.PACKET_TYPES)
+            if unknown:
+                raise ValueError(
+                    'Unknown packet types "{}" in filter "{}"'.format(
+                        ', '.join(sorted(unknown)), name))
+            self._types = frozenset(
+                bytes([ident]) for packet_type in types
+                for ident in pymma.PACKET_TYPES[packet_type])
+            checks.append(self._check_types)
+        if source:
+            self._sources = tuple(prefix.encode() for prefix in source)
+            checks.append(self._check_source)
+            self.cost = max(self.cost, 1)
+        if dest:
+            self._dests = tuple(prefix.encode() for prefix in dest)
+            checks.append(self._check_dest)
+            self.cost = max(self.cost, 1)
+        if path:
+            self._paths = frozenset(token.encode() for token in path)
+            checks.append(self._check_path)
+            self.cost = max(self.cost, 2)
+        if payload:
+            self._payload_search = re.compile(payload.encode()).search
+            checks.append(self._check_payload)
+            self.cost = max(self.cost, 3)
+        if rate:
+            if by not in ('source', 'dest', 'all'):
+                raise ValueError(
+                    'Unknown rate limit key "{}" in filter "{}"'.format(
+                        by, name))
+            self.rate = float(rate)
+            self.per = float(per)
+            self.by = by
+            self.max_keys = max_keys
+            self._buckets: collections.OrderedDict = \
+                collections.OrderedDict()
+            checks.append(self._check_rate)
+            self.cost = max(self.cost, 4)
+        if not checks:
+            raise ValueError('Filter "{}" has no conditions'.format(name))
+
+        # A single check is called directly.
+        if len(checks) == 1:
+            self.matches = checks[0]
+        else:
+            self._checks = checks
 
-        bcargs_status = {
-            'callsign': self.igate.callsign,
-            'status': beacon_config['status'],
+        self.stats: dict = {
+            'hits': 0,
+            'seconds': 0.0,
         }
 
-        bcargs_weather = {
-            'callsign': self.igate.callsign,
-            'weather': beacon_config['weather'],
+    @classmethod
+    def from_config(cls, rule_config: dict, name: str):
+        """Builds a FilterRule from one entry of the `filters` list."""
+        rule_config = dict(rule_config)
+        name = rule_config.pop('name', name)
+        unknown = set(rule_config).difference(cls.KEYS + ('per', 'by'))
+        if unknown:
+            raise ValueError('Unknown keys "{}" in filter "{}"'.format(
+                ', '.join(sorted(unknown)), name))
+        return cls(name, **rule_config)
+
+    def matches(self, source: bytes, dest: bytes, path: list,  # NOQA pylint: disable=method-hidden,too-many-arguments
+                payload: bytes, now: float = None) -> bool:
+        """Checks if the frame matches all of the rule's conditions."""
+        for check in self._checks:
+            if not check(source, dest, path, payload, now):
+                return False
+        return True
+
+    def _check_types(self, source, dest, path, payload, now) -> bool:  # NOQA pylint: disable=unused-argument,too-many-arguments
+        return payload[:1] in self._types
+
+    def _check_source(self, source, dest, path, payload, now) -> bool:  # NOQA pylint: disable=unused-argument,too-many-arguments
+        return source.startswith(self._sources)
+
+    def _check_dest(self, source, dest, path, payload, now) -> bool:  # NOQA pylint: disable=unused-argument,too-many-arguments
+        return dest.startswith(self._dests)
+
+    def _check_path(self, source, dest, path, payload, now) -> bool:  # NOQA pylint: disable=unused-argument,too-many-arguments
+        return not self._paths.isdisjoint(path)
+
+    def _check_payload(self, source, dest, path, payload, now) -> bool:  # NOQA pylint: disable=unused-argument,too-many-arguments
+        return self._payload_search(payload) is not None
+
+    def _check_rate(self, source, dest, path, payload, now) -> bool:  # NOQA pylint: disable=unused-argument,too-many-arguments
+        """Token bucket per key, allowing `rate` frames every `per` s."""
+        if now is None:
+            now = time.monotonic()
+        if self.by == 'source':
+            key = source
+        elif self.by == 'dest':
+            key = dest
+        else:
+            key = None
+
+        buckets = self._buckets
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [self.rate - 1, now]
+            if len(buckets) > self.max_keys:
+                buckets.popitem(last=False)
+            return False
+        # Keep the buckets in least recently seen order for eviction.
+        buckets.move_to_end(key)
+
+        tokens = min(
+            self.rate, bucket[0] + (now - bucket[1]) * self.rate / self.per)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return False
+        bucket[0] = tokens
+        return True
+
+
+class CircleFence(object):
+
+    """Geofence of all points within radius_km of (lat, lng)."""
+
+    def __init__(self, name: str, lat: float, lng: float,
+                 radius_km: float) -> None:
+        self.name = name
+        self.lat = lat
+        self.lng = lng
+        self.radius_km = radius_km
+        self._cos_lat = math.cos(math.radians(lat))
+        self.stats: dict = {'frames': 0}
+
+    def bounds(self) -> tuple:
+        """Returns the (min_lat, min_lng, max_lat, max_lng) bounding box."""
+        dlat = math.degrees(self.radius_km / pymma.EARTH_RADIUS_KM)
+        dlng = dlat / max(self._cos_lat, 0.01)
+        return (max(self.lat - dlat, -90), max(self.lng - dlng, -180),
+                min(self.lat + dlat, 90), min(self.lng + dlng, 180))
+
+    def contains(self, lat: float, lng: float) -> bool:
+        """Checks if (lat, lng) is inside the fence (haversine)."""
+        half_dlat = math.radians(lat - self.lat) / 2
+        half_dlng = math.radians(lng - self.lng) / 2
+        chord = math.sin(half_dlat) ** 2 + self._cos_lat * math.cos(
+            math.radians(lat)) * math.sin(half_dlng) ** 2
+        return 2 * pymma.EARTH_RADIUS_KM * math.asin(
+            math.sqrt(min(chord, 1))) <= self.radius_km
+
+    def covers(self, min_lat: float, min_lng: float, max_lat: float,
+               max_lng: float) -> bool:
+        """Checks if the box lies entirely inside the fence."""
+        return all(self.contains(lat, lng)
+                   for lat in (min_lat, max_lat)
+                   for lng in (min_lng, max_lng))
+
+
+class PolygonFence(object):
+
+    """Geofence of all points inside a polygon of [lat, lng] vertices."""
+
+    def __init__(self, name: str, polygon: list) -> None:
+        if len(polygon) < 3:
+            raise ValueError(
+                'Fence "{}" needs at least 3 vertices'.format(name))
+        self.name = name
+        self.polygon = [(float(lat), float(lng)) for lat, lng in polygon]
+        self._edges = list(zip(
+            self.polygon, self.polygon[1:] + self.polygon[:1]))
+        self.stats: dict = {'frames': 0}
+
+    def bounds(self) -> tuple:
+        """Returns the (min_lat, min_lng, max_lat, max_lng) bounding box."""
+        lats = [lat for lat, _ in self.polygon]
+        lngs = [lng for _, lng in self.polygon]
+        return min(lats), min(lngs), max(lats), max(lngs)
+
+    def contains(self, lat: float, lng: float) -> bool:
+        """Checks if (lat, lng) is inside the polygon (ray casting)."""
+        inside = False
+        for (lat0, lng0), (lat1, lng1) in self._edges:
+            if (lat0 > lat) != (lat1 > lat) and \
+                    lng < lng0 + (lat - lat0) * (lng1 - lng0) / (lat1 - lat0):
+                inside = not inside
+        return inside
+
+    def covers(self, min_lat: float, min_lng: float, max_lat: float,
+               max_lng: float) -> bool:
+        """
+        Checks if the box lies entirely inside the polygon: its corners are
+        inside and no edge comes near it.
+        """
+        for (lat0, lng0), (lat1, lng1) in self._edges:
+            if min(lat0, lat1) <= max_lat and max(lat0, lat1) >= min_lat and \
+                    min(lng0, lng1) <= max_lng and max(lng0, lng1) >= min_lng:
+                return False
+        return self.contains(min_lat, min_lng)
+
+
+class Geofence(object):
+
+    """
+    Filter rule dropping frames whose position is outside every fence.
+
+    Fences are indexed on a grid of cell_size degree cells. Each cell lists
+    the fences overlapping it, marking those covering it entirely, so a
+    lookup is one dict access plus an exact test only near fence edges,
+    however many fences there are. The position is only decoded for
+    packet types that carry one, and frames without one pass.
+    """
+
+    # Runs after the FilterRules.
+    cost = 5
+
+    def __init__(self, fences: list,
+                 cell_size: float = pymma.GEOFENCE_CELL_SIZE,
+                 name: str = 'geofence') -> None:
+        self.name = name
+        self.fences = fences
+        self.cell_size = cell_size
+        self._columns = int(math.ceil(360 / cell_size)) + 1
+        self._position_types = frozenset(
+            bytes([ident]) for packet_type in
+            ('position', 'mic_e', 'object', 'item')
+            for ident in pymma.PACKET_TYPES[packet_type])
+        self._cells: dict = {}
+        for fence in fences:
+            self._index(fence)
+
+        self.stats: dict = {
+            'hits': 0,
+            'seconds': 0.0,
+            'positions': 0,
         }
 
-        while not self.stopped():
-            # Position
-            bcargs = {
-                'lat': float(self.gps.gps_props['latitude']),
-                'lng': float(self.gps.gps_props['longitude']),
-                'altitude': self.gps.gps_props.get('altitude', 0),
-                'callsign': self.igate.callsign,
-                'table': beacon_config['table'],
-                'symbol': beacon_config['symbol'],
-                'comment': beacon_config['comment'],
-                'ambiguity': beacon_config['location'].get('ambiguity', 0),
-            }
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Builds a Geofence from the `geofence` config section, or returns
+        None if there is none.
+        """
+        geofence_config = config.get('geofence')
+        if not geofence_config:
+            return None
+
+        fences = []
+        for index, fence_config in enumerate(geofence_config['fences']):
+            name = fence_config.get('name', 'fence{}'.format(index))
+            if 'polygon' in fence_config:
+                fences.append(PolygonFence(name, fence_config['polygon']))
+            else:
+                fences.append(CircleFence(
+                    name, float(fence_config['lat']),
+                    float(fence_config['lng']),
+                    float(fence_config['radius_km'])))
+        return cls(fences, float(geofence_config.get(
+            'cell_size', pymma.GEOFENCE_CELL_SIZE)))
+
+    def _cell(self, lat: float, lng: float) -> int:
+        return (int((lat + 90) / self.cell_size) * self._columns +
+                int((lng + 180) / self.cell_size))
+
+    def _index(self, fence) -> None:
+        size = self.cell_size
+        min_lat, min_lng, max_lat, max_lng = fence.bounds()
+        for row in range(int((min_lat + 90) / size),
+                         int((max_lat + 90) / size) + 1):
+            cell_lat = row * size - 90
+            for column in range(int((min_lng + 180) / size),
+                                int((max_lng + 180) / size) + 1):
+                cell_lng = column * size - 180
+                entries = self._cells.setdefault(
+                    row * self._columns + column, [])
+                # Fences after one covering the whole cell are never hit.
+                if entries and not entries[-1][1]:
+                    continue
+                exact = not fence.covers(
+                    cell_lat, cell_lng, cell_lat + size, cell_lng + size)
+                entries.append((fence, exact))
+
+    def locate(self, lat: float, lng: float):
+        """
+        Returns the first fence containing (lat, lng), counting a frame for
+        it, or None.
+        """
+        for fence, exact in self._cells.get(self._cell(lat, lng), ()):
+            if not exact or fence.contains(lat, lng):
+                fence.stats['frames'] += 1
+                return fence
+        return None
+
+    def matches(self, source: bytes, dest: bytes, path: list,  # NOQA pylint: disable=unused-argument,too-many-arguments
+                payload: bytes, now: float = None) -> bool:
+        """Checks if the frame has a position outside every fence."""
+        if payload[:1] not in self._position_types:
+            return False
+        position = pymma.decode_position(dest, payload)
+        if position is None:
+            return False
+        self.stats['positions'] += 1
+        return self.locate(*position) is None
+
+
+class FrameFilter(object):
 
-            frame = pymma.get_beacon_frame(**bcargs)
-            if frame:
-                self.igate.send(frame)
+    """
+    Ordered set of FilterRules deciding which frames are not gated.
 
-            # Status
-            frame = pymma.get_status_frame(**bcargs_status)
-            if frame:
-                self.igate.send(frame)
+    Rules run cheapest first and the first match drops the frame and
+    counts a hit for that rule. The time spent in each rule is measured
+    on a sample of frames, so measuring costs next to nothing.
+    """
 
-            # Weather
-            frame = pymma.get_weather_frame(**bcargs_weather)
-            if frame:
-                self.igate.send(frame)
+    # Every this many frames are timed rule by rule.
+    sample_every = 32
 
-            time.sleep(beacon_config['send_every'])
+    def __init__(self, rules: list) -> None:
+        self.rules = sorted(rules, key=lambda rule: rule.cost)
+        self._frames = 0
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Builds a FrameFilter from the `filters` list, after rules for the
+        `reject_paths` and `reject_internet` settings, and the `geofence`.
+        """
+        rules = []
+        reject_paths = config.get('reject_paths', pymma.REJECT_PATHS)
+        if reject_paths:
+            rules.append(FilterRule('reject_paths', path=list(reject_paths)))
+        if bool(config.get('reject_internet')):
+            rules.append(FilterRule('reject_internet', types=['third_party']))
+        for index, rule_config in enumerate(config.get('filters', [])):
+            rules.append(FilterRule.from_config(
+                rule_config, 'filter{}'.format(index)))
+        geofence = Geofence.from_config(config)
+        if geofence is not None:
+            rules.append(geofence)
+        return cls(rules)
+
+    def match(self, source: bytes, dest: bytes, path: list, payload: bytes,  # NOQA pylint: disable=too-many-arguments
+              now: float = None):
+        """
+        Returns the first rule the frame matches, or None if it passes.
+        """
+        self._frames += 1
+        if self._frames % self.sample_every:
+            for rule in self.rules:
+                if rule.matches(source, dest, path, payload, now):
+                    rule.stats['hits'] += 1
+                    return rule
+            return None
+
+        perf_counter = time.perf_counter
+        for rule in self.rules:
+            started = perf_counter()
+            matched = rule.matches(source, dest, path, payload, now)
+            rule.stats['seconds'] += (
+                perf_counter() - started) * self.sample_every
+            if matched:
+                rule.stats['hits'] += 1
+                return rule
+        return None
 
 
 class MultimonThread(threading.Thread):
@@ -467,18 +2780,125 @@ class MultimonThread(threading.Thread):
         _logger.addHandler(_console_handler)
         _logger.propagate = False
 
-    def __init__(self, frame_queue: queue.Queue, config: dict) -> None:
+    def __init__(self, frame_queue: FrameQueue, config: dict,
+                 dupe_cache: DupeCache = None) -> None:
         super(MultimonThread, self).__init__()
         self.frame_queue = frame_queue
         self.config = config
         self.processes: dict = {}
+        self.receiver: str = self.config.get('name', 'default')
+        self.decoder: str = self.config.get('decoder', 'multimon')
+
+        # Receivers sharing an uplink should share a DupeCache, so a packet
+        # heard on several of them is only gated once.
+        if dupe_cache is None:
+            dupe_cache = DupeCache.from_config(self.config)
+        self.dupe_cache = dupe_cache
+
+        # Fast path: frames are filtered and forwarded as bytes, without
+        # building APRSPacket objects.
+        self.fast_path: bool = bool(self.config.get('fast_path'))
+        self.frame_filter = FrameFilter.from_config(self.config)
+        if bool(self.config.get('append_callsign')):
+            self._qar_path: bytes = b',qAR,' + self.config['callsign'].encode()
+        else:
+            self._qar_path = b''
+
+        self.stats: dict = {
+            'lines_read': 0,
+            'frames_matched': 0,
+            'decode_errors': 0,
+            'duplicates': 0,
+            'rejected': 0,
+            'rejected_path': 0,
+            'rejected_internet': 0,
+            'queued': 0,
+            'queue_full': 0,
+            'up': 0,
+            'restarts': 0,
+            'child_exits': 0,
+            'stalls': 0,
+            'downtime_seconds': 0.0,
+        }
+        self.demodulator = None
+        self.fm_demodulator = None
+        self.iq_source = None
+        self.kiss_conn = None
+        self._iq_eof = False
+
+        # Channelizer mode: several channels (MHz) decoded from one IQ
+        # capture, always with the native decoder.
+        self.channels: list = [
+            float(channel) for channel in
+            self.config.get('iq', {}).get('channels', [])]
+        self.channelizer = None
+        self.channel_stats: dict = {
+            channel * 1e6: {'frames_handled': 0} for channel in self.channels}
+        if self.channels:
+            self.decoder = 'native'
+
+        # Energy gate: silence between transmissions is dropped before it
+        # reaches the decoder.
+        gate_config = self.config.get('gate')
+        self.gate = None
+        if gate_config:
+            self.gate = pymma.EnergyGate(
+                threshold=float(gate_config.get(
+                    'threshold', pymma.GATE_THRESHOLD)),
+                window=float(gate_config.get('window', pymma.GATE_WINDOW)),
+                pre_roll=float(gate_config.get(
+                    'pre_roll', pymma.GATE_PRE_ROLL)),
+                hang=float(gate_config.get('hang', pymma.GATE_HANG)))
+
+        # The source and decoder processes are restarted with exponential
+        # backoff when they exit or stall.
+        supervisor_config = self.config.get('supervisor', {})
+        self.backoff: float = float(
+            supervisor_config.get('backoff', pymma.SUPERVISOR_BACKOFF))
+        self.max_backoff: float = float(
+            supervisor_config.get('max_backoff', pymma.SUPERVISOR_MAX_BACKOFF))
+        self.stall_timeout: float = float(
+            supervisor_config.get('stall_timeout', pymma.STALL_TIMEOUT))
+        self.line_timeout: float = float(
+            supervisor_config.get('line_timeout', pymma.LINE_TIMEOUT))
+        self._last_data = 0.0
+        self._stalled = False
+        self._processes_lock = threading.Lock()
+        # Frames passing the filters while handle_frames() collects a batch.
+        self._frame_batch = None
+
+        # Called as listener(source, dest, path, payload, receiver, channel)
+        # for every frame after dedupe, eg. HeardList.heard.
+        self.listeners: list = []
+        # Called the same way for the frames that also pass the filters and
+        # are queued for APRS-IS, eg. FanoutServer.publish.
+        self.gated_listeners: list = []
+
         self.daemon = True
         self._stopper = threading.Event()
 
     def _workers(self) -> None:
-        self._logger.info('Starting from source="%s"', self.config['source'])
+        self._logger.info(
+            'Starting receiver="%s" from source="%s"',
+            self.receiver, self.config['source'])
+
+        if self.config['source'] == 'kiss':
+            self._open_kiss()
+            return
+
+        if self.config['source'] == 'iq':
+            self._open_iq()
+            if self.decoder != 'native':
+                # multimon-ng is fed PCM from the FM demodulator.
+                self.processes['multimon'] = subprocess.Popen(
+                    ['multimon-ng', '-a', 'AFSK1200', '-A', '-t', 'raw', '-'],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE
+                )
+            return
 
-        if self.config['source'] == 'pulse':
+        if self.config['source'] == 'pulse' and self.decoder != 'native' \
+                and self.gate is None:
             multimon_cmd = ['multimon-ng', '-a', 'AFSK1200', '-A']
 
             multimon_proc = subprocess.Popen(
@@ -511,9 +2931,16 @@ class MultimonThread(threading.Thread):
                     '-p', ppm,
                     '-g', gain,
                     '-E', enable_option,
-                    '-d', device_index,
-                    '-'
+                    '-d', device_index
                 ]
+
+                # FM noise is loud, so the energy gate wants rtl_fm's
+                # squelch to zero the audio between transmissions.
+                squelch = self.config['rtl'].get('squelch')
+                if squelch is not None:
+                    src_cmd.extend(['-l', str(squelch)])
+
+                src_cmd.append('-')
             elif self.config['source'] == 'alsa':
                 alsa_device = self.config['alsa']['device']
 
@@ -526,6 +2953,14 @@ class MultimonThread(threading.Thread):
                     '-c', '1',
                     '-'
                 ]
+            elif self.config['source'] == 'pulse':
+                src_cmd = [
+                    'parec',
+                    '--raw',
+                    '--format=s16le',
+                    '--rate=' + sample_rate,
+                    '--channels=1'
+                ]
 
             self._logger.debug('src_cmd="%s"', ' '.join(src_cmd))
 
@@ -536,44 +2971,503 @@ class MultimonThread(threading.Thread):
 
             self.processes['src'] = src_proc
 
+            # The native decoder reads PCM straight from the source.
+            if self.decoder == 'native':
+                return
+
             multimon_cmd = [
                 'multimon-ng', '-a', 'AFSK1200', '-A', '-t', 'raw', '-']
             self._logger.debug('multimon_cmd="%s"', ' '.join(multimon_cmd))
 
-            multimon_proc = subprocess.Popen(
-                multimon_cmd,
-                stdin=self.processes['src'].stdout,
-                stdout=subprocess.PIPE
-            )
+            if self.gate is not None:
+                # Gated audio is pumped to multimon-ng from this process.
+                multimon_proc = subprocess.Popen(
+                    multimon_cmd,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE
+                )
+            else:
+                multimon_proc = subprocess.Popen(
+                    multimon_cmd,
+                    stdin=self.processes['src'].stdout,
+                    stdout=subprocess.PIPE
+                )
+                # Only multimon-ng reads the source now, so it gets EOF (and
+                # the source SIGPIPE) when the other one exits.
+                self.processes['src'].stdout.close()
 
         self.processes['multimon'] = multimon_proc
 
     def run(self) -> None:
-        self._workers()
+        """
+        Runs the receiver pipeline, restarting it with exponential backoff
+        whenever a process exits or stalls.
+        """
+        threading.Thread(target=self._watchdog, daemon=True).start()
+
+        backoff = self.backoff
+        down_since = time.monotonic()
+
+        while not self.stopped():
+            started = time.monotonic()
+            try:
+                with self._processes_lock:
+                    self._workers()
+            except OSError as exc:
+                self._logger.error(
+                    'Failed to start receiver="%s": "%s"', self.receiver, exc)
+            else:
+                self.stats['downtime_seconds'] += started - down_since
+                self._last_data = started
+                self._stalled = False
+                self.stats['up'] = 1
+                if self.config['source'] == 'kiss':
+                    self._kiss_worker()
+                elif self.config['source'] == 'iq':
+                    self._iq_worker()
+                elif self.decoder == 'native':
+                    self._native_worker()
+                elif self.gate is not None:
+                    self._pump_worker()
+                else:
+                    self._line_worker()
+                if self._iq_eof and self.iq_source.finite:
+                    self._logger.info(
+                        'IQ recording finished for receiver="%s"',
+                        self.receiver)
+                    self._stopper.set()
+                elif not self._stalled and not self.stopped():
+                    self.stats['child_exits'] += 1
+
+            down_since = time.monotonic()
+            self.stats['up'] = 0
+            self._reap()
+            if self.stopped():
+                break
+
+            # A pipeline that ran for a while restarts quickly again.
+            if down_since - started > self.max_backoff:
+                backoff = self.backoff
+
+            self.stats['restarts'] += 1
+            self._logger.warning(
+                'Restarting receiver="%s" in %ss', self.receiver, backoff)
+            self._stopper.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _reap(self) -> None:
+        """
+        Terminates (or kills) and reaps the receiver's processes.
+        """
+        with self._processes_lock:
+            processes, self.processes = self.processes, {}
+            iq_source, self.iq_source = self.iq_source, None
+            kiss_conn, self.kiss_conn = self.kiss_conn, None
+
+        if iq_source is not None:
+            iq_source.close()
+        if kiss_conn is not None:
+            kiss_conn.close()
+
+        for name, proc in processes.items():
+            if proc.poll() is None:
+                proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+            if proc.stdout is not None:
+                proc.stdout.close()
+            self._logger.info(
+                'Reaped %s for receiver="%s" returncode="%s"',
+                name, self.receiver, proc.returncode)
+
+    def _watchdog(self) -> None:
+        """
+        Terminates the pipeline when one of its processes has exited or
+        no data has arrived within the stall timeout, so the reading loop
+        sees EOF and the pipeline is restarted.
+        """
+        if self.config['source'] == 'kiss':
+            # _kiss_worker() times out reads itself.
+            stall_timeout = 0
+        elif self.decoder == 'native':
+            stall_timeout = self.stall_timeout
+        else:
+            stall_timeout = self.line_timeout
+
+        while not self._stopper.wait(1):
+            if not self.stats['up']:
+                continue
+
+            with self._processes_lock:
+                processes = list(self.processes.items())
+
+            exited = [name for name, proc in processes
+                      if proc.poll() is not None]
+            if exited:
+                self._logger.warning(
+                    'Process %s exited for receiver="%s"',
+                    ', '.join(exited), self.receiver)
+            elif stall_timeout and \
+                    time.monotonic() - self._last_data > stall_timeout:
+                self._stalled = True
+                self.stats['stalls'] += 1
+                self._logger.warning(
+                    'Receiver="%s" stalled, no data for %ss',
+                    self.receiver, stall_timeout)
+            else:
+                continue
+
+            for _, proc in processes:
+                if proc.poll() is None:
+                    proc.terminate()
+
+    def _open_kiss(self) -> None:
+        """
+        Connects to the KISS TNC, on a serial `device` or at `host`:`port`.
+        """
+        kiss_config = self.config['kiss']
+        if kiss_config.get('device'):
+            self.kiss_conn = serial.Serial(
+                kiss_config['device'],
+                int(kiss_config.get('speed', pymma.KISS_SPEED)), timeout=1)
+        else:
+            self.kiss_conn = socket.create_connection(
+                (kiss_config.get('host', '127.0.0.1'),
+                 int(kiss_config.get('port', pymma.KISS_PORT))),
+                pymma.CONNECT_TIMEOUT)
+            self.kiss_conn.settimeout(1)
+
+    def _kiss_read(self):
+        """
+        Reads what the TNC has sent, returning None if nothing arrived
+        within a second and b'' at EOF.
+        """
+        if isinstance(self.kiss_conn, socket.socket):
+            try:
+                return self.kiss_conn.recv(pymma.DECODER_READ_SIZE)
+            except socket.timeout:
+                return None
+        # A serial port has no EOF, it only times out.
+        return self.kiss_conn.read(self.kiss_conn.in_waiting or 1) or None
+
+    def _kiss_worker(self) -> None:
+        """
+        Reads KISS frames from the TNC until EOF, decoding the AX.25 UI
+        frames of each read to TNC2 and handing them to handle_frames().
+        """
+        fend = pymma.KISS_FEND
+        fesc = pymma.KISS_FESC
+        decode_ax25 = pymma.decode_ax25
+        partial = b''
+
+        while not self.stopped():
+            try:
+                data = self._kiss_read()
+            except OSError as exc:  # Includes serial.SerialException.
+                self._logger.warning(
+                    'KISS TNC error for receiver="%s": "%s"',
+                    self.receiver, exc)
+                return
+            received = time.monotonic()
+            if data is None:
+                if self.line_timeout and \
+                        received - self._last_data > self.line_timeout:
+                    self._stalled = True
+                    self.stats['stalls'] += 1
+                    self._logger.warning(
+                        'Receiver="%s" stalled, no data for %ss',
+                        self.receiver, self.line_timeout)
+                    return
+                continue
+            if not data:
+                self._logger.warning(
+                    'KISS TNC closed for receiver="%s"', self.receiver)
+                return
+            self._last_data = received
+
+            chunks = (partial + data).split(fend)
+            partial = chunks.pop()
+            if len(partial) > pymma.DECODER_READ_SIZE:
+                self.stats['decode_errors'] += 1
+                partial = b''
+
+            frames = []
+            for chunk in chunks:
+                # Skip the empty chunks between FENDs and anything but data
+                # frames (command 0, the TNC port in the high nibble).
+                if not chunk or chunk[0] & 0x0F:
+                    continue
+                self.stats['lines_read'] += 1
+                if fesc in chunk:
+                    ax25 = pymma.kiss_unescape(chunk[1:])
+                else:
+                    ax25 = memoryview(chunk)[1:]
+                try:
+                    frames.append(decode_ax25(ax25))
+                except pymma.InvalidFrame:
+                    self.stats['decode_errors'] += 1
+
+            if frames:
+                self.stats['frames_matched'] += len(frames)
+                self.handle_frames(frames, received)
+
+    def _open_iq(self) -> None:
+        """
+        Opens the `iq` source and sets up the FM demodulator for the
+        receiver's frequency.
+        """
+        iq_config = self.config.get('iq', {})
+        sample_rate = int(iq_config.get('sample_rate', pymma.IQ_SAMPLE_RATE))
+        deviation = float(iq_config.get('deviation', pymma.FM_DEVIATION))
+
+        if self.channels:
+            frequencies = [channel * 1e6 for channel in self.channels]
+            center = (min(frequencies) + max(frequencies)) / 2
+        else:
+            frequency = float(iq_config['freq']) * 1e6
+            # Tune off the channel to keep it clear of the DC spike.
+            center = frequency
+            if iq_config.get('device'):
+                center += sample_rate / 4
+
+        if iq_config.get('center_freq'):
+            center = float(iq_config['center_freq']) * 1e6
+
+        self.iq_source = pymma.open_iq_source(iq_config, center)
+        self._iq_eof = False
+
+        if not self.channels:
+            self.fm_demodulator = pymma.FMDemodulator(
+                sample_rate, pymma.SAMPLE_RATE, frequency - center,
+                deviation)
+        elif self.channelizer is None:
+            self.channelizer = pymma.Channelizer(
+                frequencies, center, sample_rate, deviation)
+
+    def _iq_blocks(self):
+        """
+        Yields (iq, received) blocks from the IQ source until EOF. iq is
+        reused for the next block.
+        """
+        block_samples = int(self.config.get('iq', {}).get(
+            'block_samples', pymma.IQ_BLOCK_SAMPLES))
+        read = self.iq_source.read
+
+        while not self.stopped():
+            iq = read(block_samples)
+            received = time.monotonic()
+            if not len(iq):  # pylint: disable=len-as-condition
+                self._logger.warning(
+                    'IQ source closed for receiver="%s"', self.receiver)
+                self._iq_eof = True
+                return
+            self._last_data = received
+            yield iq, received
+
+    def _iq_audio(self):
+        """
+        Yields (audio, received) blocks demodulated from the IQ source until
+        EOF. audio is reused for the next block.
+        """
+        demodulate = self.fm_demodulator.process
+        for iq, received in self._iq_blocks():
+            yield demodulate(iq), received
+
+    def _pcm_blocks(self):
+        """
+        Yields (pcm, received) S16_LE blocks from the audio source until
+        EOF. From an IQ source, pcm is int16 samples reused for the next
+        block.
+        """
+        if self.config['source'] == 'iq':
+            to_pcm = self.fm_demodulator.to_pcm
+            for audio, received in self._iq_audio():
+                yield to_pcm(audio), received
+            return
+
+        pcm_stream = self.processes['src'].stdout
+
+        while not self.stopped():
+            pcm = pcm_stream.read(pymma.NATIVE_BLOCK_SIZE)
+            received = time.monotonic()
+            if not pcm:
+                self._logger.warning(
+                    'Source closed for receiver="%s"', self.receiver)
+                return
+            self._last_data = received
+            yield pcm, received
+
+    def _gated(self, blocks):
+        """
+        Yields the (samples, received) blocks of int16 samples let through
+        by the energy gate.
+        """
+        gate = self.gate.process
+        for pcm, received in blocks:
+            samples = gate(pcm)
+            if len(samples):  # pylint: disable=len-as-condition
+                yield samples, received
+
+    def _pump(self, stdin) -> None:
+        """
+        Writes the source's audio, gated if configured, to multimon-ng as
+        S16_LE PCM, closing its stdin at EOF so it exits.
+        """
+        blocks = self._pcm_blocks()
+        if self.gate is not None:
+            blocks = self._gated(blocks)
+        try:
+            for pcm, _ in blocks:
+                stdin.write(pcm)
+                stdin.flush()
+        except (OSError, ValueError) as exc:
+            # multimon-ng has exited, or the source was closed under us.
+            self._logger.debug('PCM pump stopped: "%s"', exc)
+        finally:
+            try:
+                stdin.close()
+            except OSError:
+                pass
+
+    def _iq_worker(self) -> None:
+        """
+        Demodulates FM from the IQ source in-process, feeding the audio to
+        the native decoder directly or to multimon-ng from a pump thread.
+        """
+        if self.channelizer is not None:
+            for iq, received in self._iq_blocks():
+                for frequency, frame in self.channelizer.process(iq):
+                    self.stats['frames_matched'] += 1
+                    self._logger.debug(
+                        'Demodulated frame="%s" channel="%s"',
+                        frame, frequency)
+                    self.handle_frame(frame, received, frequency)
+            return
+
+        if self.decoder != 'native':
+            self._pump_worker()
+        else:
+            self._native_worker()
+
+    def _pump_worker(self) -> None:
+        """
+        Feeds multimon-ng from a pump thread while reading its output.
+        """
+        threading.Thread(
+            target=self._pump,
+            args=(self.processes['multimon'].stdin,),
+            daemon=True).start()
+        self._line_worker()
+
+    def _line_worker(self) -> None:
+        """
+        Reads multimon-ng output in large non-blocking chunks until EOF,
+        handing the frames of each chunk to handle_frames() as one batch.
+        """
+        multimon_fd = self.processes['multimon'].stdout.fileno()
+        os.set_blocking(multimon_fd, False)
+        partial = b''
+
         while not self.stopped():
-            read_line = self.processes['multimon'].stdout.readline().strip()
-            matched_line = pymma.START_FRAME_REX.match(read_line)
+            try:
+                chunk = os.read(multimon_fd, pymma.DECODER_READ_SIZE)
+            except BlockingIOError:
+                select.select([multimon_fd], [], [], 1)
+                continue
+            received = time.monotonic()
+            if not chunk:
+                if partial:
+                    self._handle_lines(partial + b'\n', received)
+                self._logger.warning(
+                    'Decoder closed for receiver="%s"', self.receiver)
+                break
+
+            self._last_data = received
+            if partial:
+                chunk = partial + chunk
+            end = chunk.rfind(b'\n') + 1
+            partial = chunk[end:]
+            if len(partial) > pymma.DECODER_READ_SIZE:
+                self.stats['decode_errors'] += 1
+                partial = b''
+            if end:
+                # The trailing partial line has no newline, so it is skipped.
+                self._handle_lines(chunk, received)
+
+    def _handle_lines(self, lines: bytes, received: float) -> None:
+        """
+        Picks the frames out of the complete decoder output lines in lines
+        with a prefix check per line, slicing out only the frames themselves.
+        """
+        prefix = pymma.FRAME_PREFIX
+        prefix_len = len(prefix)
+        starts_with = lines.startswith
+        find = lines.find
+        frames = []
+
+        self.stats['lines_read'] += lines.count(b'\n')
+        start = 0
+        while True:
+            end = find(b'\n', start)
+            if end < 0:
+                break
+            if starts_with(prefix, start, end):
+                frame = lines[start + prefix_len:end].rstrip()
+                if frame:
+                    frames.append(frame)
+            start = end + 1
+
+        if frames:
+            self.stats['frames_matched'] += len(frames)
+            if self._logger.isEnabledFor(logging.DEBUG):
+                for frame in frames:
+                    self._logger.debug('Matched frame="%s"', frame)
+            self.handle_frames(frames, received)
+
+    def _native_worker(self) -> None:
+        """
+        Demodulates AFSK1200 from the source's PCM in-process, handing frames
+        straight to handle_frame().
+        """
+        if self.demodulator is None:
+            self.demodulator = pymma.AFSKDemodulator()
+
+        if self.gate is not None:
+            blocks = self._gated(self._pcm_blocks())
+            demodulate = self.demodulator.process_samples
+        elif self.config['source'] == 'iq':
+            blocks = self._iq_audio()
+            demodulate = self.demodulator.process_samples
+        else:
+            blocks = self._pcm_blocks()
+            demodulate = self.demodulator.process
 
-            if matched_line:
-                frame = matched_line.group(1)
-                if not frame:
-                    next
-                self._logger.debug('Matched frame="%s"', frame)
-                self.handle_frame(frame)
+        for audio, received in blocks:
+            for _, frame in demodulate(audio):
+                self.stats['frames_matched'] += 1
+                self._logger.debug('Demodulated frame="%s"', frame)
+                self.handle_frame(frame, received)
 
     def stop(self):
         """
         Stop the thread at the next opportunity.
         """
+        self._stopper.set()
+        with self._processes_lock:
+            processes = dict(self.processes)
         for name in ['multimon', 'src']:
+            if name not in processes:
+                continue
             try:
-                proc = self.processes[name]
+                proc = processes[name]
                 proc.terminate()
             except Exception as exc:  # pylint: disable=broad-except
                 self._logger.exception(
                     'Raised Exception while trying to terminate %s: %s',
                     name, exc)
-        self._stopper.set()
 
     def stopped(self):
         """
@@ -581,24 +3475,126 @@ class MultimonThread(threading.Thread):
         """
         return self._stopper.isSet()
 
-    def reject_frame(self, frame: APRSPacket) -> bool:
+    def log_stats(self) -> None:
+        """Logs this receiver's throughput and error counters."""
+        self._logger.info(
+            'Receiver stats receiver="%s" stats="%s"', self.receiver,
+            self.stats)
+
+    def reject_frame(self, frame: APRSPacket,
+                     received: float = None) -> bool:
         """Determines if the frame should be rejected."""
-        if set(self.config.get(
-                'reject_paths',
-                pymma.REJECT_PATHS)).intersection(frame.path):
+        return self.reject_raw_frame(
+            frame.fromcall.encode(), frame.tocall.encode(),
+            [token.encode() for token in frame.path],
+            getattr(frame, 'body', '').encode(), received)
+
+    def reject_raw_frame(self, source: bytes, dest: bytes, path: list,  # NOQA pylint: disable=too-many-arguments
+                         payload: bytes, received: float = None) -> bool:
+        """Determines if the raw frame should be rejected."""
+        rule = self.frame_filter.match(source, dest, path, payload, received)
+        if rule is None:
+            return False
+
+        if rule.name == 'reject_paths':
+            self.stats['rejected_path'] += 1
+        elif rule.name == 'reject_internet':
+            self.stats['rejected_internet'] += 1
+        self._logger.warning(
+            'Rejected frame from source="%s" by filter="%s": "%s"',
+            source.decode(errors='replace'), rule.name, payload)
+        return True
+
+    def _queue_frame(self, frame, received: float = None) -> None:
+        if self._frame_batch is not None:
+            self._frame_batch.append(frame)
+            return
+        try:
+            self.frame_queue.put(frame, stamp=received)
+            self.stats['queued'] += 1
+        except queue.Full:
+            self.stats['queue_full'] += 1
             self._logger.warning(
-                'Rejected frame with REJECTED_PATH: "%s"', frame)
-            return True
-        elif (bool(self.config.get('reject_internet')) and
-              frame.text.startswith('}')):
+                'Lost TX data (queue full): "%s"', frame)
+
+    def handle_frames(self, frames: list, received: float = None) -> None:
+        """
+        Handles a batch of frames read from the decoder together, queueing
+        the ones that pass dedupe and filtering with one put_many().
+        """
+        self._frame_batch = []
+        try:
+            for frame in frames:
+                self.handle_frame(frame, received)
+        finally:
+            batch, self._frame_batch = self._frame_batch, None
+
+        if not batch:
+            return
+        queued = self.frame_queue.put_many(batch, stamp=received)
+        self.stats['queued'] += queued
+        if queued < len(batch):
+            self.stats['queue_full'] += len(batch) - queued
             self._logger.warning(
-                'Rejected frame from the Internet: "%s"', frame)
-            return True
+                'Lost TX data (queue full): %s frames', len(batch) - queued)
 
-        return False
+    def handle_raw_frame(self, frame: bytes, received: float = None,
+                         channel: float = None) -> None:
+        """
+        Handles the Frame from the APRS Decoder without parsing it.
+
+        The header is split from the raw bytes once, filters run on the
+        slices and the frame is queued as bytes ready to send.
+        """
+        matched_frame = pymma.HEADER_REX.match(frame)
+        if not matched_frame:
+            self.stats['decode_errors'] += 1
+            self._logger.warning('Failed to split frame="%s"', frame)
+            return
+
+        source, dest, path, payload = matched_frame.group(
+            'source', 'dest', 'path', 'payload')
+
+        if self.dupe_cache is not None and self.dupe_cache.is_dupe(
+                (source, dest, payload)):
+            self.stats['duplicates'] += 1
+            self._logger.debug('Dropped duplicate frame="%s"', frame)
+            return
+
+        path = path.split(b',') if path else []
+        for listener in self.listeners:
+            listener(source, dest, path, payload, self.receiver, channel)
+
+        if self.reject_raw_frame(source, dest, path, payload, received):
+            self.stats['rejected'] += 1
+            return
+
+        for listener in self.gated_listeners:
+            listener(source, dest, path, payload, self.receiver, channel)
+
+        if self._qar_path:
+            header_end = matched_frame.start('payload') - 1
+            frame = b''.join(
+                (frame[:header_end], self._qar_path, frame[header_end:]))
+
+        self._queue_frame(frame, received)
+
+    def handle_frame(self, frame: bytes, received: float = None,
+                     channel: float = None) -> None:
+        """
+        Handles the Frame from the APRS Decoder.
+
+        received is the time.monotonic() the frame was read from the
+        decoder, used to measure end-to-end latency. channel is the
+        frequency (Hz) it was heard on, in channelizer mode.
+        """
+        if channel is not None:
+            self.channel_stats[channel]['frames_handled'] += 1
+
+        if self.fast_path:
+            self.handle_raw_frame(frame, received, channel)
+            return
 
-    def handle_frame(self, frame: bytes) -> None:
-        """Handles the Frame from the APRS Decoder."""
         self._logger.debug('Handling frame="%s"', frame)
 
         aprs_packet = None
@@ -607,6 +3603,7 @@ class MultimonThread(threading.Thread):
         try:
             decoded_frame = frame.decode()
         except Exception as exc:
+            self.stats['decode_errors'] += 1
             self._logger.warning(
                 'Failed to decode() frame="%s"', frame)
             self._logger.exception(exc)
@@ -619,6 +3616,7 @@ class MultimonThread(threading.Thread):
         try:
             aprs_packet = APRSPacket(decoded_frame)
         except Exception as exc:
+            self.stats['decode_errors'] += 1
             self._logger.warning(
                 'Failed to APRSPacket() frame="%s"', decoded_frame)
             self._logger.exception(exc)
@@ -628,16 +3626,31 @@ class MultimonThread(threading.Thread):
         if not aprs_packet:
             return
 
+        if self.dupe_cache is not None and self.dupe_cache.is_dupe(
+                (aprs_packet.fromcall, aprs_packet.tocall,
+                 getattr(aprs_packet, 'body', ''))):
+            self.stats['duplicates'] += 1
+            self._logger.debug('Dropped duplicate frame="%s"', decoded_frame)
+            return
+
+        if self.listeners or self.gated_listeners:
+            source, dest, path, payload = (
+                aprs_packet.fromcall.encode(), aprs_packet.tocall.encode(),
+                [token.encode() for token in aprs_packet.path],
+                getattr(aprs_packet, 'body', '').encode())
+            for listener in self.listeners:
+                listener(source, dest, path, payload, self.receiver, channel)
+
         if bool(self.config.get('append_callsign')):
             aprs_packet.path.extend(['qAR', self.config['callsign']])
 
-        if not self.reject_frame(aprs_packet):
-            try:
-                self.frame_queue.put(aprs_packet, True, 10)
-            except queue.Full as exc:
-                self._logger.exception(exc)
-                self._logger.warning(
-                    'Lost TX data (queue full): "%s"', frame)
+        if self.reject_frame(aprs_packet, received):
+            self.stats['rejected'] += 1
+            return
+
+        for listener in self.gated_listeners:
+            listener(source, dest, path, payload, self.receiver, channel)
+        self._queue_frame(aprs_packet, received)
 
 
 class SerialGPSPoller(threading.Thread):
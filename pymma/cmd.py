@@ -4,9 +4,21 @@
 """PYMMA Commands"""
 
 import argparse
+import collections
+import concurrent.futures
+import heapq
+import http.server
 import json
-import queue
+import os
+import resource
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
 import time
+import wave
 
 import pymma
 
@@ -30,12 +42,83 @@ def cli():
     print('Starting PYMMA...')
 
     threads: list = []
-    frame_queue: queue.Queue = queue.Queue()
+    frame_queue = pymma.FrameQueue.from_config(config)
 
     igate_thread = pymma.IGateThread(frame_queue, config)
-    multimon_thread = pymma.MultimonThread(frame_queue, config)
 
-    threads = [igate_thread, multimon_thread]
+    # All receivers feed the one uplink and share a dupe cache.
+    dupe_cache = pymma.DupeCache.from_config(config)
+    multimon_threads = [
+        pymma.MultimonThread(frame_queue, receiver_config, dupe_cache)
+        for receiver_config in pymma.get_receiver_configs(config)
+    ]
+
+    threads = [igate_thread] + multimon_threads
+
+    # Every receiver records the stations it hears in one heard list.
+    heard_list = pymma.HeardList.from_config(config)
+    if heard_list is not None:
+        for multimon_thread in multimon_threads:
+            multimon_thread.listeners.append(heard_list.heard)
+        threads.append(pymma.HeardListThread(heard_list, config))
+
+    # Local APRS-IS feed of every frame gated, for other tools on the host.
+    fanout_server = pymma.FanoutServer.from_config(config)
+    if fanout_server is not None:
+        for multimon_thread in multimon_threads:
+            multimon_thread.gated_listeners.append(fanout_server.publish)
+        threads.append(fanout_server)
+
+    metrics_config = config.get('metrics')
+    if metrics_config:
+        metrics = pymma.Metrics()
+        metrics.register(
+            'igate', igate_thread.stats,
+            {'transport': igate_thread.transport})
+        metrics.register(
+            'igate', igate_thread.downlink_stats,
+            {'transport': igate_thread.transport})
+        metrics.register('queue', frame_queue.stats)
+        if igate_thread.spool is not None:
+            metrics.register('spool', igate_thread.spool.stats)
+        if dupe_cache is not None:
+            metrics.register('dedupe', dupe_cache.stats)
+        if heard_list is not None:
+            metrics.register('heard', heard_list.stats)
+        if fanout_server is not None:
+            metrics.register('server', fanout_server.stats)
+        for multimon_thread in multimon_threads:
+            labels = {'receiver': multimon_thread.receiver}
+            metrics.register('receiver', multimon_thread.stats, labels)
+            metrics.register(
+                'decoder',
+                lambda thr=multimon_thread: getattr(
+                    thr.demodulator, 'stats', {}),
+                labels)
+            metrics.register(
+                'fm',
+                lambda thr=multimon_thread: getattr(
+                    thr.fm_demodulator, 'stats', {}),
+                labels)
+            metrics.register(
+                'gate',
+                lambda thr=multimon_thread: getattr(thr.gate, 'stats', {}),
+                labels)
+            for rule in multimon_thread.frame_filter.rules:
+                metrics.register(
+                    'filter', rule.stats, dict(labels, rule=rule.name))
+                for fence in getattr(rule, 'fences', []):
+                    metrics.register(
+                        'fence', fence.stats, dict(labels, fence=fence.name))
+            for index, channel in enumerate(multimon_thread.channel_stats):
+                metrics.register(
+                    'channel',
+                    lambda thr=multimon_thread, index=index, channel=channel:
+                    dict(thr.channel_stats[channel], **(
+                        thr.channelizer.stats[index]
+                        if thr.channelizer is not None else {})),
+                    dict(labels, channel='{:.3f}'.format(channel / 1e6)))
+        threads.append(pymma.MetricsThread(metrics, config))
 
     # Beacon Config
     location_config: dict = {}
@@ -63,9 +146,14 @@ def cli():
     try:
         [thr.start() for thr in threads]  # NOQA pylint: disable=expression-not-assigned
 
-        frame_queue.join()
+        stats_interval = config.get('stats_interval', pymma.STATS_INTERVAL)
+        next_stats = time.monotonic() + stats_interval
 
         while all([thr.is_alive() for thr in threads]):
+            if stats_interval and time.monotonic() >= next_stats:
+                igate_thread.log_stats()
+                [thr.log_stats() for thr in multimon_threads]  # NOQA pylint: disable=expression-not-assigned
+                next_stats += stats_interval
             time.sleep(0.01)
     except KeyboardInterrupt:
         [thr.stop() for thr in threads]  # NOQA pylint: disable=expression-not-assigned
@@ -74,5 +162,903 @@ def cli():
         [thr.stop() for thr in threads]  # NOQA pylint: disable=expression-not-assigned
 
 
+def _percentile(values: list, percent: float) -> float:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def _check_wav(path: str, wav_file) -> None:
+    if (wav_file.getsampwidth() != 2 or wav_file.getnchannels() != 1 or
+            wav_file.getframerate() != pymma.SAMPLE_RATE):
+        raise SystemExit(
+            '{} must be mono S16_LE at {} Hz'.format(path, pymma.SAMPLE_RATE))
+
+
+def _read_pcm(path: str) -> bytes:
+    """Reads S16_LE PCM at SAMPLE_RATE from a raw or WAV file."""
+    if not path.endswith('.wav'):
+        with open(path, 'rb') as pcm_file:
+            return pcm_file.read()
+
+    with wave.open(path) as wav_file:
+        _check_wav(path, wav_file)
+        return wav_file.readframes(wav_file.getnframes())
+
+
+def _pcm_layout(path: str) -> tuple:
+    """
+    Returns the (data offset, samples) of the S16_LE PCM at SAMPLE_RATE in a
+    raw or WAV file, without reading it.
+    """
+    if not path.endswith('.wav'):
+        return 0, os.path.getsize(path) // 2
+
+    with open(path, 'rb') as pcm_file:
+        with wave.open(pcm_file) as wav_file:
+            _check_wav(path, wav_file)
+            # Opening leaves the file at the start of the data chunk.
+            return pcm_file.tell(), wav_file.getnframes()
+
+
+def _synthetic_pcm(frames: int, noise: float) -> bytes:
+    import numpy as np  # pylint: disable=import-outside-toplevel
+    audio = pymma.afsk_modulate([
+        b'N0CALL-%d>APRS,WIDE1-1,WIDE2-1:!3745.00N/12224.00W-PYMMA %d' % (
+            index % 15 + 1, index) for index in range(frames)])
+    if noise:
+        audio = audio + np.random.normal(0, noise, len(audio))
+    return audio.clip(-32768, 32767).astype('<i2').tobytes()
+
+
+def _bench_native(pcm: bytes, block_size: int) -> tuple:
+    demodulator = pymma.AFSKDemodulator()
+    frame_ends: dict = {}
+    latencies = []
+
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    for offset in range(0, len(pcm), block_size):
+        block_start = time.monotonic()
+        frames = demodulator.process(pcm[offset:offset + block_size])
+        block_time = time.monotonic() - block_start
+        block_end = (offset + block_size) // 2
+        for sample_index, frame in frames:
+            frame_ends.setdefault(frame, sample_index)
+            # Time spent waiting for the rest of the block, plus decoding it.
+            latencies.append(
+                (block_end - sample_index) / pymma.SAMPLE_RATE + block_time)
+    wall = time.monotonic() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    return {
+        'frames': demodulator.stats['frames'],
+        'wall_seconds': wall,
+        'cpu_seconds': cpu,
+        'latency_p50': _percentile(latencies, 50),
+        'latency_p99': _percentile(latencies, 99),
+    }, frame_ends
+
+
+def _bench_multimon(pcm: bytes, block_size: int, frame_ends: dict) -> dict:
+    multimon_cmd = ['multimon-ng', '-a', 'AFSK1200', '-A', '-t', 'raw', '-']
+    usage_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    wall_start = time.monotonic()
+    multimon_proc = subprocess.Popen(
+        multimon_cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL)
+
+    # (end sample, time written) for each block fed to multimon-ng.
+    written: list = []
+
+    def _writer():
+        for offset in range(0, len(pcm), block_size):
+            multimon_proc.stdin.write(pcm[offset:offset + block_size])
+            multimon_proc.stdin.flush()
+            written.append(
+                ((offset + block_size) // 2, time.monotonic()))
+        multimon_proc.stdin.close()
+
+    writer = threading.Thread(target=_writer, daemon=True)
+    writer.start()
+
+    frames = 0
+    latencies = []
+    for line in multimon_proc.stdout:
+        matched_line = pymma.START_FRAME_REX.match(line.strip())
+        if not matched_line:
+            continue
+        frames += 1
+        sample_index = frame_ends.get(matched_line.group(1))
+        if sample_index is None:
+            continue
+        line_time = time.monotonic()
+        for block_end, write_time in list(written):
+            if block_end >= sample_index:
+                latencies.append(
+                    (block_end - sample_index) / pymma.SAMPLE_RATE +
+                    line_time - write_time)
+                break
+
+    writer.join()
+    multimon_proc.wait()
+    wall = time.monotonic() - wall_start
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    return {
+        'frames': frames,
+        'wall_seconds': wall,
+        'cpu_seconds': (usage.ru_utime - usage_start.ru_utime +
+                        usage.ru_stime - usage_start.ru_stime),
+        'latency_p50': _percentile(latencies, 50),
+        'latency_p99': _percentile(latencies, 99),
+    }
+
+
+class _APRSISStandIn(threading.Thread):
+
+    """Local stand-in APRS-IS server, timestamping every line received."""
+
+    def __init__(self) -> None:
+        super(_APRSISStandIn, self).__init__()
+        self.daemon = True
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(5)
+        self.port = self.server.getsockname()[1]
+        # Callback invoked with (line, receive time) for every frame line.
+        self.on_line = None
+        self.lines = 0
+        # Seconds between '#' keepalives, like a real APRS-IS server.
+        self.keepalive_interval = 20
+
+    def run(self) -> None:
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            with conn:
+                self._session(conn)
+
+    def _session(self, conn: socket.socket) -> None:
+        conn.sendall(b'# pymma-bench stand-in\r\n')
+        conn.settimeout(self.keepalive_interval or None)
+        buffered = b''
+        logged_in = False
+        while True:
+            try:
+                data = conn.recv(65536)
+            except socket.timeout:
+                if self.keepalive_interval:
+                    conn.sendall(b'# pymma-bench keepalive\r\n')
+                continue
+            if not data:
+                return
+            received = time.monotonic()
+            lines = (buffered + data).split(b'\n')
+            buffered = lines.pop()
+            for line in lines:
+                line = line.rstrip(b'\r')
+                if not logged_in:
+                    logged_in = True
+                    conn.sendall(
+                        b'# logresp N0CALL verified, server BENCH\r\n')
+                    continue
+                self.lines += 1
+                if self.on_line is not None:
+                    self.on_line(line, received)
+
+    def close(self) -> None:
+        """Stops accepting connections."""
+        self.server.close()
+
+
+class _HTTPStandIn(threading.Thread):
+
+    """Local stand-in APRS-IS HTTP submit server."""
+
+    def __init__(self) -> None:
+        super(_HTTPStandIn, self).__init__()
+        self.daemon = True
+        stand_in = self
+
+        class _Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):  # NOQA pylint: disable=invalid-name
+                body = self.rfile.read(
+                    int(self.headers.get('content-length', 0)))
+                received = time.monotonic()
+                # The first line is the login, the rest are frames.
+                for line in body.splitlines()[1:]:
+                    stand_in.lines += 1
+                    if stand_in.on_line is not None:
+                        stand_in.on_line(line, received)
+                self.send_response(200)
+                self.send_header('content-length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):  # NOQA pylint: disable=arguments-differ
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(
+            ('127.0.0.1', 0), _Handler)
+        self.port = self.server.server_address[1]
+        self.url = 'http://127.0.0.1:{}/'.format(self.port)
+        self.on_line = None
+        self.lines = 0
+
+    def run(self) -> None:
+        self.server.serve_forever(poll_interval=0.1)
+
+    def close(self) -> None:
+        """Stops the server."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _UDPStandIn(threading.Thread):
+
+    """Local stand-in APRS-IS UDP submit port."""
+
+    def __init__(self) -> None:
+        super(_UDPStandIn, self).__init__()
+        self.daemon = True
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+        self.server.bind(('127.0.0.1', 0))
+        self.port = self.server.getsockname()[1]
+        self.on_line = None
+        self.lines = 0
+
+    def run(self) -> None:
+        while True:
+            try:
+                data = self.server.recv(65536)
+            except OSError:
+                return
+            received = time.monotonic()
+            # The first line is the login, the rest are frames.
+            for line in data.splitlines()[1:]:
+                self.lines += 1
+                if self.on_line is not None:
+                    self.on_line(line, received)
+
+    def close(self) -> None:
+        """Stops receiving datagrams."""
+        self.server.close()
+
+
+def _bench_decoders(args) -> dict:
+    if args.pcm:
+        pcm = _read_pcm(args.pcm)
+    else:
+        pcm = _synthetic_pcm(args.frames, args.noise)
+
+    audio_seconds = len(pcm) / 2 / pymma.SAMPLE_RATE
+    results: dict = {'audio_seconds': audio_seconds, 'decoders': {}}
+
+    native, frame_ends = _bench_native(pcm, args.block_size)
+    results['decoders']['native'] = native
+
+    if shutil.which('multimon-ng'):
+        results['decoders']['multimon'] = _bench_multimon(
+            pcm, args.block_size, frame_ends)
+
+    for decoder in results['decoders'].values():
+        decoder['cpu_per_audio_second'] = (
+            decoder['cpu_seconds'] / audio_seconds)
+        decoder['frames_per_second'] = (
+            decoder['frames'] / decoder['wall_seconds'])
+
+    return results
+
+
+def _bench_iq(args) -> dict:
+    """Times the FM demodulator and native decoder on IQ samples."""
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    if args.iq:
+        source = pymma.IQFileSource(args.iq, args.iq_format)
+        blocks = []
+        while True:
+            block = source.read(args.block_samples)
+            if not len(block):  # pylint: disable=len-as-condition
+                break
+            blocks.append(block.copy())
+        source.close()
+        offset = args.offset
+    else:
+        iq = pymma.fm_modulate(
+            np.frombuffer(_synthetic_pcm(args.frames, 0), '<i2'),
+            args.sample_rate, args.offset)
+        if args.noise:
+            iq += (np.random.normal(0, args.noise, (len(iq), 2))
+                   .astype(np.float32).view(np.complex64).ravel())
+        blocks = [iq[index:index + args.block_samples]
+                  for index in range(0, len(iq), args.block_samples)]
+        offset = args.offset
+
+    fm_demodulator = pymma.FMDemodulator(
+        args.sample_rate, pymma.SAMPLE_RATE, offset,
+        taps_per_phase=args.taps_per_phase)
+    demodulator = pymma.AFSKDemodulator()
+
+    fm_cpu = 0.0
+    decoder_cpu = 0.0
+    for block in blocks:
+        started = time.process_time()
+        audio = fm_demodulator.process(block)
+        demodulated = time.process_time()
+        demodulator.process_samples(audio)
+        fm_cpu += demodulated - started
+        decoder_cpu += time.process_time() - demodulated
+
+    iq_seconds = fm_demodulator.stats['iq_samples'] / args.sample_rate
+    return {
+        'iq_seconds': iq_seconds,
+        'sample_rate': args.sample_rate,
+        'taps': len(fm_demodulator.decimator.taps),
+        'frames': demodulator.stats['frames'],
+        'fm_cpu_seconds': fm_cpu,
+        'decoder_cpu_seconds': decoder_cpu,
+        'cpu_per_iq_second': (fm_cpu + decoder_cpu) / iq_seconds,
+    }
+
+
+def _bench_channels(args) -> dict:
+    """
+    Times the channelizer against one FM demodulator per channel, on
+    generated IQ with the same frames on every channel.
+    """
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    audio = np.frombuffer(_synthetic_pcm(args.frames, 0), '<i2')
+    span = args.sample_rate / 2 - pymma.SAMPLE_RATE
+    offsets = [
+        -span + 2 * span * index / max(1, args.channels - 1)
+        for index in range(args.channels)]
+    iq = sum(pymma.fm_modulate(audio, args.sample_rate, offset)
+             for offset in offsets) / args.channels
+    if args.noise:
+        iq += (np.random.normal(0, args.noise, (len(iq), 2))
+               .astype(np.float32).view(np.complex64).ravel())
+    iq = iq.astype(np.complex64)
+    blocks = [iq[index:index + args.block_samples]
+              for index in range(0, len(iq), args.block_samples)]
+
+    fm_demodulators = [
+        pymma.FMDemodulator(args.sample_rate, pymma.SAMPLE_RATE, offset,
+                            taps_per_phase=args.taps_per_phase)
+        for offset in offsets]
+    demodulators = [pymma.AFSKDemodulator() for _ in offsets]
+    started = time.process_time()
+    for block in blocks:
+        for fm_demodulator, demodulator in zip(fm_demodulators, demodulators):
+            demodulator.process_samples(fm_demodulator.process(block))
+    demodulators_cpu = time.process_time() - started
+
+    channelizer = pymma.Channelizer(
+        offsets, 0, args.sample_rate, taps_per_phase=args.taps_per_phase)
+    started = time.process_time()
+    for block in blocks:
+        channelizer.process(block)
+    channelizer_cpu = time.process_time() - started
+
+    iq_seconds = len(iq) / args.sample_rate
+    return {
+        'iq_seconds': iq_seconds,
+        'sample_rate': args.sample_rate,
+        'channels': args.channels,
+        'fft_size': channelizer.fft_size,
+        'demodulators_frames': sum(
+            demodulator.stats['frames'] for demodulator in demodulators),
+        'demodulators_cpu_per_iq_second': demodulators_cpu / iq_seconds,
+        'channelizer_frames': sum(
+            stats['frames'] for stats in channelizer.stats),
+        'channelizer_cpu_per_iq_second': channelizer_cpu / iq_seconds,
+    }
+
+
+class _KISSStandIn(threading.Thread):
+
+    """Local stand-in KISS TNC, sending the same stream to every client."""
+
+    def __init__(self, stream: bytes) -> None:
+        super(_KISSStandIn, self).__init__()
+        self.daemon = True
+        self.stream = stream
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(5)
+        self.port = self.server.getsockname()[1]
+
+    def run(self) -> None:
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.sendall(self.stream)
+                    # Stay connected, like a TNC, until the client leaves.
+                    while conn.recv(4096):
+                        pass
+                except OSError:
+                    pass
+
+    def close(self) -> None:
+        """Stops accepting clients."""
+        self.server.close()
+
+
+def _bench_kiss(args) -> dict:
+    """Times KISS deframing and AX.25 decoding from a stand-in TNC."""
+    stream = b''.join(
+        pymma.encode_kiss(pymma.encode_ax25(
+            b'N0CALL-%d>APRS,WIDE1-1*,WIDE2-1:'
+            b'!3745.00N/12224.00W-PYMMA %d' % (index % 15 + 1, index)))
+        for index in range(args.frames))
+    stand_in = _KISSStandIn(stream)
+    stand_in.start()
+
+    frame_queue = pymma.FrameQueue(maxsize=0)
+    multimon_thread = pymma.MultimonThread(frame_queue, {
+        'source': 'kiss',
+        'kiss': {'host': '127.0.0.1', 'port': stand_in.port},
+        'callsign': 'N0CALL',
+        'fast_path': True,
+        'dedupe': {'ttl': 0},
+    })
+
+    usage_start = resource.getrusage(resource.RUSAGE_SELF)
+    wall_start = time.monotonic()
+    multimon_thread.start()
+
+    deadline = wall_start + args.timeout
+    while multimon_thread.stats['frames_matched'] < args.frames and \
+            time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    wall = time.monotonic() - wall_start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    multimon_thread.stop()
+    multimon_thread.join()
+    stand_in.close()
+
+    frames = multimon_thread.stats['frames_matched']
+    return {
+        'frames_in': args.frames,
+        'frames': frames,
+        'frames_queued': frame_queue.qsize(),
+        'bytes': len(stream),
+        'wall_seconds': wall,
+        'frames_per_second': frames / wall,
+        'cpu_seconds': (usage.ru_utime - usage_start.ru_utime +
+                        usage.ru_stime - usage_start.ru_stime),
+        'receiver': multimon_thread.stats,
+    }
+
+
+def _pipeline_frames(args):
+    """Yields frames to replay, as the decoder would hand them over."""
+    for _ in range(args.repeat):
+        if args.lines:
+            with open(args.lines, 'rb') as lines_file:
+                for line in lines_file:
+                    matched_line = pymma.START_FRAME_REX.match(line.strip())
+                    if matched_line:
+                        yield matched_line.group(1)
+        elif args.pcm:
+            demodulator = pymma.AFSKDemodulator()
+            pcm = _read_pcm(args.pcm)
+            for offset in range(0, len(pcm), args.block_size):
+                for _, frame in demodulator.process(
+                        pcm[offset:offset + args.block_size]):
+                    yield frame
+        else:
+            for index in range(args.frames):
+                yield (b'N0CALL-%d>APRS,WIDE1-1,WIDE2-1:'
+                       b'!3745.00N/12224.00W-PYMMA %d' % (
+                           index % 15 + 1, index))
+
+
+def _bench_pipeline(args) -> dict:
+    config: dict = {}
+    if args.config:
+        with open(args.config) as config_file:
+            config = json.load(config_file)
+
+    if args.transport == 'http':
+        stand_in = _HTTPStandIn()
+        config.setdefault('http', {})['url'] = stand_in.url
+    elif args.transport == 'udp':
+        stand_in = _UDPStandIn()
+        config.setdefault('udp', {})['gateway'] = '127.0.0.1:{}'.format(
+            stand_in.port)
+    else:
+        stand_in = _APRSISStandIn()
+    stand_in.start()
+
+    config.update({
+        'callsign': 'N0CALL',
+        'passcode': '-1',
+        'gateways': ['127.0.0.1:{}'.format(stand_in.port)],
+        'transport': args.transport,
+    })
+
+    # Send times of in-flight frames, keyed on payload.
+    sent: dict = collections.defaultdict(collections.deque)
+    latencies: list = []
+
+    def _on_line(line, received):
+        pending = sent.get(line.partition(b':')[2])
+        if pending:
+            latencies.append(received - pending.popleft())
+
+    stand_in.on_line = _on_line
+
+    frame_queue = pymma.FrameQueue.from_config(config)
+    igate_thread = pymma.IGateThread(frame_queue, config)
+    multimon_thread = pymma.MultimonThread(frame_queue, config)
+    igate_thread.start()
+
+    usage_start = resource.getrusage(resource.RUSAGE_SELF)
+    wall_start = time.monotonic()
+
+    frames_in = 0
+    for frame in _pipeline_frames(args):
+        frames_in += 1
+        sent[frame.partition(b':')[2]].append(time.monotonic())
+        multimon_thread.handle_frame(frame)
+
+    # Wait for the uplink to drain, giving up when it makes no progress.
+    last_progress = (stand_in.lines, time.monotonic())
+    while stand_in.lines < multimon_thread.stats['queued']:
+        time.sleep(0.01)
+        if stand_in.lines != last_progress[0]:
+            last_progress = (stand_in.lines, time.monotonic())
+        elif time.monotonic() - last_progress[1] > args.timeout:
+            break
+
+    wall = time.monotonic() - wall_start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    igate_thread.stop()
+    stand_in.close()
+
+    return {
+        'frames_in': frames_in,
+        'frames_out': stand_in.lines,
+        'wall_seconds': wall,
+        'frames_per_second': stand_in.lines / wall,
+        'latency_p50': _percentile(latencies, 50),
+        'latency_p99': _percentile(latencies, 99),
+        'cpu_seconds': (usage.ru_utime - usage_start.ru_utime +
+                        usage.ru_stime - usage_start.ru_stime),
+        'peak_rss_kb': usage.ru_maxrss,
+        'receiver': multimon_thread.stats,
+        'igate': {
+            key: value for key, value in igate_thread.stats.items()
+            if not isinstance(value, pymma.Histogram)},
+        'queue': frame_queue.stats,
+    }
+
+
+def bench():
+    """Benchmarks PYMMA decoders and the RF to APRS-IS pipeline offline."""
+    parser = argparse.ArgumentParser(description='PYMMA Benchmark')
+    parser.add_argument(
+        '-o', dest='output',
+        help='Write results as JSON to this file instead of stdout')
+
+    subparsers = parser.add_subparsers(dest='mode')
+    subparsers.required = True
+
+    decoders_parser = subparsers.add_parser(
+        'decoders', help='Compare the native decoder with multimon-ng')
+    iq_parser = subparsers.add_parser(
+        'iq', help='Time FM demodulation and decoding of IQ samples')
+    pipeline_parser = subparsers.add_parser(
+        'pipeline',
+        help='Replay frames through the pipeline to a stand-in APRS-IS')
+    kiss_parser = subparsers.add_parser(
+        'kiss', help='Time the KISS source against a stand-in TNC')
+
+    for mode_parser in (decoders_parser, pipeline_parser):
+        mode_parser.add_argument(
+            '--pcm', dest='pcm',
+            help='Recorded mono S16_LE audio at SAMPLE_RATE (raw or .wav)')
+        mode_parser.add_argument(
+            '--frames', dest='frames', type=int, default=500,
+            help='Synthetic frames to generate without recorded input')
+        mode_parser.add_argument(
+            '--block-size', dest='block_size', type=int,
+            default=pymma.NATIVE_BLOCK_SIZE,
+            help='Bytes of PCM decoded at a time')
+
+    decoders_parser.add_argument(
+        '--noise', dest='noise', type=float, default=2000.0,
+        help='Noise level added to synthetic audio')
+
+    iq_parser.add_argument(
+        '--iq', dest='iq',
+        help='Recorded IQ to demodulate (eg. from rtl_sdr)')
+    iq_parser.add_argument(
+        '--format', dest='iq_format', default=pymma.IQ_FORMAT,
+        help='Recorded IQ sample format: cu8, cs8, cs16 or cf32')
+    iq_parser.add_argument(
+        '--sample-rate', dest='sample_rate', type=int,
+        default=pymma.IQ_SAMPLE_RATE, help='IQ sample rate')
+    iq_parser.add_argument(
+        '--offset', dest='offset', type=float, default=0.0,
+        help='Channel offset from the center frequency, in Hz')
+    iq_parser.add_argument(
+        '--frames', dest='frames', type=int, default=500,
+        help='Synthetic frames to generate without recorded input')
+    iq_parser.add_argument(
+        '--noise', dest='noise', type=float, default=0.1,
+        help='Noise level added to synthetic IQ')
+    iq_parser.add_argument(
+        '--block-samples', dest='block_samples', type=int,
+        default=pymma.IQ_BLOCK_SAMPLES, help='IQ samples processed at a time')
+    iq_parser.add_argument(
+        '--taps-per-phase', dest='taps_per_phase', type=int,
+        default=pymma.FIR_TAPS_PER_PHASE,
+        help='Channel filter taps per decimation phase')
+    iq_parser.add_argument(
+        '--channels', dest='channels', type=int, default=0,
+        help='Compare the channelizer with one FM demodulator per channel, '
+             'on this many generated channels')
+
+    kiss_parser.add_argument(
+        '--frames', dest='frames', type=int, default=50000,
+        help='Frames for the stand-in TNC to send')
+    kiss_parser.add_argument(
+        '--timeout', dest='timeout', type=float, default=30.0,
+        help='Seconds to wait for every frame to be decoded')
+
+    pipeline_parser.add_argument(
+        '--lines', dest='lines',
+        help='Recorded multimon-ng output to replay')
+    pipeline_parser.add_argument(
+        '--repeat', dest='repeat', type=int, default=1,
+        help='Replay the input this many times')
+    pipeline_parser.add_argument(
+        '-c', dest='config',
+        help='Use this config file (gateways and login are overridden)')
+    pipeline_parser.add_argument(
+        '--transport', dest='transport', default='tcp',
+        choices=pymma.TRANSPORTS,
+        help='Uplink transport to benchmark')
+    pipeline_parser.add_argument(
+        '--timeout', dest='timeout', type=float, default=10.0,
+        help='Seconds to wait for the uplink to make progress')
+
+    args = parser.parse_args()
+
+    if args.mode == 'decoders':
+        results = _bench_decoders(args)
+    elif args.mode == 'iq' and args.channels:
+        results = _bench_channels(args)
+    elif args.mode == 'iq':
+        results = _bench_iq(args)
+    elif args.mode == 'kiss':
+        results = _bench_kiss(args)
+    else:
+        results = _bench_pipeline(args)
+
+    results['mode'] = args.mode
+    results['version'] = pymma.IGateThread.get_version()
+    results['timestamp'] = time.time()
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+def heard():
+    """Lists stations from the heard list database."""
+    parser = argparse.ArgumentParser(description='PYMMA Heard Stations')
+    parser.add_argument(
+        '-c', dest='config',
+        default='pymma.json',
+        help='Use this config file')
+    parser.add_argument(
+        '-n', dest='limit', type=int, default=20,
+        help='Number of most recently heard stations to list')
+    parser.add_argument(
+        'callsign', nargs='?',
+        help='Only show this station')
+    args = parser.parse_args()
+
+    with open(args.config) as config_file:
+        config = json.load(config_file)
+    path = config.get('heard', {}).get('path')
+    if not path:
+        parser.error('No heard.path in {}'.format(args.config))
+
+    # Read-only, and WAL mode lets this run while pymma is writing.
+    database = sqlite3.connect('file:{}?mode=ro'.format(path), uri=True)
+    columns = ', '.join(pymma.HeardList.COLUMNS)
+    if args.callsign:
+        rows = database.execute(
+            'SELECT {} FROM heard WHERE callsign = ?'.format(columns),
+            (args.callsign,))
+    else:
+        rows = database.execute(
+            'SELECT {} FROM heard ORDER BY last_heard DESC LIMIT ?'.format(
+                columns), (args.limit,))
+
+    for row in rows:
+        station = dict(zip(pymma.HeardList.COLUMNS, row))
+        print(json.dumps(station))
+    database.close()
+
+
+def _decode_file(executor, path: str, chunk: int, overlap: int) -> tuple:
+    """
+    Submits a recording's chunks to executor, returning its duration in
+    samples and a generator of its (unix time, frame) tuples in order.
+
+    Recordings are taken to end at their modification time.
+    """
+    data_offset, samples = _pcm_layout(path)
+    started = os.path.getmtime(path) - samples / pymma.SAMPLE_RATE
+    futures = [
+        executor.submit(
+            pymma.decode_pcm_chunk, path, data_offset,
+            max(0, own_start - overlap), own_start,
+            min(samples, own_start + chunk))
+        for own_start in range(0, samples, chunk)]
+
+    def _frames():
+        for future in futures:
+            for sample_index, frame in future.result():
+                yield started + sample_index / pymma.SAMPLE_RATE, frame
+
+    return samples, _frames()
+
+
+def decode():  # pylint: disable=too-many-locals,too-many-statements
+    """Decodes recorded audio across all cores."""
+    parser = argparse.ArgumentParser(
+        description='PYMMA Offline Decoder',
+        epilog='Frames are written as `<unix time> <frame>` lines, like the '
+               'spool, unless sent to an APRS-IS server.')
+    parser.add_argument(
+        'files', nargs='+',
+        help='Mono S16_LE recordings at {} Hz, raw or .wav'.format(
+            pymma.SAMPLE_RATE))
+    output_group = parser.add_mutually_exclusive_group()
+    output_group.add_argument(
+        '-o', dest='output',
+        help='Write frames to this file instead of stdout')
+    output_group.add_argument(
+        '-g', dest='gateway',
+        help='Send frames to this APRS-IS server (host:port)')
+    output_group.add_argument(
+        '--stand-in', action='store_true',
+        help='Send frames to a local stand-in APRS-IS server')
+    parser.add_argument(
+        '-c', dest='config',
+        help='Use the callsign, passcode and dedupe settings from this '
+             'config file')
+    parser.add_argument(
+        '-j', dest='workers', type=int, default=os.cpu_count(),
+        help='Number of decoder processes')
+    parser.add_argument(
+        '--chunk-seconds', type=float, default=pymma.DECODE_CHUNK_SECONDS,
+        help='Seconds of audio per chunk')
+    parser.add_argument(
+        '--overlap-seconds', type=float,
+        default=pymma.DECODE_OVERLAP_SECONDS,
+        help='Seconds each chunk overlaps the one before it, longer than '
+             'the longest frame')
+    args = parser.parse_args()
+
+    config: dict = {'callsign': 'N0CALL', 'passcode': '-1'}
+    if args.config:
+        with open(args.config) as config_file:
+            config.update(json.load(config_file))
+    dupe_cache = pymma.DupeCache.from_config(config)
+
+    stand_in = None
+    if args.stand_in:
+        stand_in = _APRSISStandIn()
+        stand_in.start()
+        args.gateway = '127.0.0.1:{}'.format(stand_in.port)
+
+    sock = None
+    if args.gateway:
+        sock = pymma.happy_eyeballs_connect(
+            *pymma.parse_gateway(args.gateway))
+        sock.sendall(bytes(
+            'user {} pass {} vers PYMMA {}\r\n'.format(
+                config['callsign'], config['passcode'],
+                pymma.IGateThread.get_version()), 'utf8'))
+        write = sock.sendall
+    elif args.output:
+        output_file = open(args.output, 'wb')
+        write = output_file.write
+    else:
+        output_file = sys.stdout.buffer
+        write = output_file.write
+
+    usage_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    wall_start = time.monotonic()
+    results: dict = {'samples': 0, 'frames': 0, 'duplicates': 0}
+
+    chunk = int(args.chunk_seconds * pymma.SAMPLE_RATE)
+    overlap = int(args.overlap_seconds * pymma.SAMPLE_RATE)
+    with concurrent.futures.ProcessPoolExecutor(args.workers) as executor:
+        recordings = []
+        for path in args.files:
+            samples, frames = _decode_file(executor, path, chunk, overlap)
+            results['samples'] += samples
+            recordings.append(frames)
+
+        batch = []
+        batch_bytes = 0
+        for stamp, frame in heapq.merge(*recordings, key=lambda x: x[0]):
+            if dupe_cache is not None:
+                matched_frame = pymma.HEADER_REX.match(frame)
+                key = matched_frame.group(
+                    'source', 'dest', 'payload') if matched_frame else frame
+                if dupe_cache.is_dupe(key, stamp):
+                    results['duplicates'] += 1
+                    continue
+
+            results['frames'] += 1
+            line = (pymma.encode_frame(frame) if sock else
+                    b'%.3f %s\n' % (stamp, frame))
+            batch.append(line)
+            batch_bytes += len(line)
+            if batch_bytes >= pymma.TCP_BATCH_BYTES:
+                write(b''.join(batch))
+                batch.clear()
+                batch_bytes = 0
+        write(b''.join(batch))
+
+    wall = time.monotonic() - wall_start
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    audio = results['samples'] / pymma.SAMPLE_RATE
+    results.update({
+        'files': len(args.files),
+        'workers': args.workers,
+        'audio_seconds': round(audio, 3),
+        'wall_seconds': round(wall, 3),
+        'cpu_seconds': round(
+            usage.ru_utime + usage.ru_stime -
+            usage_start.ru_utime - usage_start.ru_stime, 3),
+        'realtime_factor': round(audio / wall, 1) if wall else None,
+    })
+
+    if sock is not None:
+        sock.shutdown(socket.SHUT_WR)
+        # Wait for the server to close, so every frame has been read.
+        sock.settimeout(pymma.DOWNLINK_TIMEOUT)
+        try:
+            while sock.recv(65536):
+                pass
+        except socket.timeout:
+            pass
+        sock.close()
+    elif args.output:
+        output_file.close()
+    else:
+        output_file.flush()
+
+    if stand_in is not None:
+        results['stand_in_lines'] = stand_in.lines
+        stand_in.close()
+
+    print(json.dumps(results, indent=2), file=sys.stderr)
+
+
 if __name__ == '__main__':
     cli()
@@ -23,16 +23,170 @@ LOG_FORMAT = logging.Formatter(
     ' - %(message)s')
 
 START_FRAME_REX = re.compile(b'^APRS: (.*)')
+# multimon-ng's line prefix for a decoded frame, and how much of its output
+# is read at a time.
+FRAME_PREFIX = b'APRS: '
+DECODER_READ_SIZE = 65536
 SAMPLE_RATE = 22050
 
+# Splits a TNC2 frame into source, destination, path and payload.
 HEADER_REX = re.compile(
-    b'^(?P<source>\w*(-\d{1,2})?)>(?P<dest>\w*(-\d{1,2})?),(?P<path>[^\s]*)')
+    b'^(?P<source>[^>:,\\s]+)>(?P<dest>[^>:,\\s]+)(,(?P<path>[^:\\s]*))?:'
+    b'(?P<payload>.*)', re.DOTALL)
 
 # Filter packets from TCP2RF gateways
 REJECT_PATHS = set(['TCPIP', 'TCPIP*', 'NOGATE', 'RFONLY'])
 
+# APRS packet types for filter rules, by their data type identifiers (the
+# first byte of the payload).
+PACKET_TYPES = {
+    'position': b'!=/@',
+    'mic_e': b"`'\x1c\x1d",
+    'message': b':',
+    'status': b'>',
+    'object': b';',
+    'item': b')',
+    'weather': b'_',
+    'telemetry': b'T',
+    'third_party': b'}',
+    'capabilities': b'<',
+    'query': b'?',
+    'raw_gps': b'$',
+    'user_defined': b'{',
+}
+
+# Rate limit filter rules remember at most this many keys.
+FILTER_MAX_KEYS = 10000
+
+# Geofence grid cells are this many degrees square.
+GEOFENCE_CELL_SIZE = 0.5
+EARTH_RADIUS_KM = 6371.0
+
 GPS_WARM_UP = 5
 
+# Batched TCP transport: flush once this many bytes are buffered, or once the
+# first frame in the batch has waited this many seconds. Waiting a few tens of
+# milliseconds lets a burst of frames share one write, at a latency APRS-IS
+# won't notice.
+TCP_BATCH_BYTES = 8192
+TCP_BATCH_LATENCY = 0.02
+
+# Gateway selection: seconds allowed to connect and log in to a gateway, and
+# the Happy Eyeballs (RFC 8305) delay between connection attempts.
+CONNECT_TIMEOUT = 5
+HAPPY_EYEBALLS_DELAY = 0.25
+
+# APRS-IS servers send a '#' keepalive line every 20 seconds, a link that
+# has been silent for this long is considered dead.
+DOWNLINK_TIMEOUT = 60
+DOWNLINK_MAX_LINE = 4096
+
+# Uplink transports and the HTTP transport defaults.
+TRANSPORTS = ('tcp', 'http', 'udp')
+HTTP_URL = 'http://noam.aprs2.net:8080/'
+HTTP_BATCH_FRAMES = 10
+HTTP_BATCH_BYTES = 8192
+HTTP_BATCH_LATENCY = 0.02
+HTTP_RETRIES = 3
+HTTP_BACKOFF = 0.5
+HTTP_MAX_BACKOFF = 10
+HTTP_TIMEOUT = 10
+HTTP_POOL_SIZE = 2
+
+# UDP transport defaults.
+UDP_GATEWAY = 'noam.aprs2.net:8080'
+UDP_BATCH_FRAMES = 64
+UDP_RESOLVE_INTERVAL = 300
+
+# Disk spool for frames queued during APRS-IS outages.
+SPOOL_SEGMENT_BYTES = 1024 * 1024
+SPOOL_MAX_BYTES = 64 * 1024 * 1024
+SPOOL_MAX_AGE = 3600
+SPOOL_REPLAY_RATE = 20
+SPOOL_FSYNC_FRAMES = 100
+SPOOL_FSYNC_INTERVAL = 1.0
+
+# Duplicate suppression window, matching the APRS-IS dupe check.
+DUPE_TTL = 30
+DUPE_MAX_ENTRIES = 10000
+
+# Local APRS-IS server: clients whose unsent data would exceed
+# SERVER_MAX_BUFFER bytes are disconnected.
+SERVER_ADDRESS = '127.0.0.1'
+SERVER_PORT = 14580
+SERVER_MAX_CLIENTS = 64
+SERVER_MAX_BUFFER = 262144
+SERVER_KEEPALIVE = 20
+
+# Heard stations table: stations kept in memory, and seconds between
+# flushes to SQLite.
+HEARD_MAX_ENTRIES = 200000
+HEARD_FLUSH_INTERVAL = 10
+
+# Bounded frame queue: 'drop_oldest', 'drop_newest' or 'block' (for up to
+# QUEUE_BLOCK_TIMEOUT seconds) when full.
+QUEUE_MAX_DEPTH = 10000
+QUEUE_POLICY = 'drop_oldest'
+QUEUE_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+QUEUE_BLOCK_TIMEOUT = 10
+
+# Metrics endpoint and end-to-end latency histogram buckets (seconds).
+METRICS_ADDRESS = '127.0.0.1'
+METRICS_INTERVAL = 60
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Native AFSK1200 decoder.
+AFSK_BAUD = 1200
+AFSK_MARK = 1200
+AFSK_SPACE = 2200
+AX25_MIN_BITS = 18 * 8
+AX25_MAX_BITS = 4096
+NATIVE_BLOCK_SIZE = 16384
+
+# Offline decoding (pymma-decode): recordings are split into chunks of
+# DECODE_CHUNK_SECONDS, each also decoding the DECODE_OVERLAP_SECONDS before
+# it, which must be longer than the longest frame (AX25_MAX_BITS at 1200 Bd).
+DECODE_CHUNK_SECONDS = 60
+DECODE_OVERLAP_SECONDS = 5
+DECODE_BLOCK_SAMPLES = 262144
+
+# KISS TNC source: framing bytes, and the default TCP port (Direwolf's).
+KISS_FEND = b'\xc0'
+KISS_FESC = b'\xdb'
+KISS_TFEND = b'\xdc'
+KISS_TFESC = b'\xdd'
+KISS_PORT = 8001
+KISS_SPEED = 9600
+
+# IQ source and FM receiver. The IQ sample rate must be a multiple of
+# SAMPLE_RATE, the default is within the RTL-SDR's 225-300 kS/s range.
+IQ_SAMPLE_RATE = SAMPLE_RATE * 12
+IQ_FORMAT = 'cu8'
+IQ_BLOCK_SAMPLES = 32768
+FM_DEVIATION = 5000
+FIR_TAPS_PER_PHASE = 8
+# The channelizer takes one FFT of the capture for at least this many audio
+# samples per channel.
+CHANNELIZER_OUTPUTS = 1024
+
+# Energy gate: audio is only decoded around windows louder than
+# GATE_THRESHOLD dBFS, plus pre-roll before and hang time after (seconds).
+GATE_THRESHOLD = -40.0
+GATE_WINDOW = 0.01
+GATE_PRE_ROLL = 0.1
+GATE_HANG = 0.5
+
+# Seconds between per-receiver stats log lines, 0 disables.
+STATS_INTERVAL = 300
+
+# Source/decoder process supervision: restart backoff bounds, and how long
+# (in seconds) without PCM or decoder output counts as a stall (0 disables).
+SUPERVISOR_BACKOFF = 1
+SUPERVISOR_MAX_BACKOFF = 60
+STALL_TIMEOUT = 10
+LINE_TIMEOUT = 0
+
 NMEA_PROPERTIES = [
     'timestamp',
     'lat',
@@ -0,0 +1,903 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""PYMMA Native DSP."""
+
+import collections
+import math
+import mmap
+import os
+
+try:
+    import numpy as np  # type: ignore
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:  # pragma: no cover
+    np = None
+
+try:
+    import rtlsdr  # type: ignore
+except ImportError:  # pragma: no cover
+    rtlsdr = None
+
+try:
+    import SoapySDR  # type: ignore
+except ImportError:  # pragma: no cover
+    SoapySDR = None
+
+import pymma
+
+__author__ = 'Greg Albrecht W2GMD <oss@undef.net>'
+__copyright__ = 'Copyright 2016 Dominik Heidler'
+__license__ = 'GNU General Public License, Version 3'
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError(
+            'The native decoder requires numpy, try: pip install numpy')
+
+
+class AFSKDemodulator(object):  # pylint: disable=too-many-instance-attributes
+
+    """
+    Streaming AFSK1200 demodulator and HDLC/AX.25 deframer.
+
+    Each block of samples is run through a pair of mark/space correlators
+    with numpy, the sign of the tone difference is sliced into runs between
+    transitions, and runs are turned into NRZI bits at one iteration per
+    transition rather than per sample.
+    """
+
+    def __init__(self, sample_rate: int = pymma.SAMPLE_RATE) -> None:
+        _require_numpy()
+        self.sample_rate = sample_rate
+        self.samples_per_bit = sample_rate / pymma.AFSK_BAUD
+
+        window = int(round(self.samples_per_bit))
+        phase = 2 * math.pi * np.arange(window) / sample_rate
+        self._mark_kernel = np.exp(-1j * pymma.AFSK_MARK * phase)
+        self._space_kernel = np.exp(-1j * pymma.AFSK_SPACE * phase)
+        self._tail = np.zeros(window - 1)
+        self._odd_byte = b''
+
+        # Absolute index of the next sample, and of the last tone transition.
+        self._position = 0
+        self._last_transition = 0
+        self._last_tone = False
+
+        # HDLC state.
+        self._bits = bytearray()
+        self._in_frame = False
+        self._skip_zero = False
+        self._prev_ones = 0
+
+        self.stats: dict = {
+            'samples': 0,
+            'frames': 0,
+            'fcs_errors': 0,
+            'invalid_frames': 0,
+        }
+
+    def process(self, pcm: bytes) -> list:
+        """
+        Demodulates a block of S16_LE PCM, returning a list of
+        (sample_index, frame) tuples for every frame completed in it.
+        """
+        if self._odd_byte:
+            pcm = self._odd_byte + pcm
+            self._odd_byte = b''
+        if len(pcm) % 2:
+            self._odd_byte = pcm[-1:]
+            pcm = pcm[:-1]
+        return self.process_samples(np.frombuffer(pcm, dtype='<i2'))
+
+    def process_samples(self, samples) -> list:
+        """
+        Demodulates a block of samples (any numeric numpy array), returning a
+        list of (sample_index, frame) tuples.
+        """
+        if not len(samples):  # pylint: disable=len-as-condition
+            return []
+
+        signal = np.concatenate((self._tail, samples))
+        self._tail = signal[len(signal) - len(self._tail):]
+
+        mark = np.abs(np.convolve(signal, self._mark_kernel, 'valid'))
+        space = np.abs(np.convolve(signal, self._space_kernel, 'valid'))
+        tones = mark > space
+
+        start = self._position
+        self._position += len(tones)
+        self.stats['samples'] += len(tones)
+
+        changes = np.flatnonzero(tones[1:] != tones[:-1]) + 1
+        if tones[0] != self._last_tone:
+            changes = np.concatenate(([0], changes))
+        self._last_tone = bool(tones[-1])
+
+        if not len(changes):  # pylint: disable=len-as-condition
+            return []
+
+        transitions = changes + start
+        run_lengths = np.diff(transitions, prepend=self._last_transition)
+        self._last_transition = int(transitions[-1])
+
+        return self._deframe(run_lengths.tolist(), transitions.tolist())
+
+    def _deframe(self, run_lengths: list, transitions: list) -> list:
+        """
+        Turns NRZI runs into HDLC frames.
+
+        A run of n bit periods between transitions is a 0 followed by n - 1
+        ones: six ones are a flag, more are an abort, and the 0 after five
+        ones is a stuffed bit.
+        """
+        frames = []
+        bits = self._bits
+        samples_per_bit = self.samples_per_bit
+        carry = 0
+
+        for run_length, transition in zip(run_lengths, transitions):
+            # Glitches shorter than half a bit belong to the following run.
+            run_length += carry
+            run = int(run_length / samples_per_bit + 0.5)
+            if run < 1:
+                carry = run_length
+                continue
+            carry = 0
+
+            ones = run - 1
+            if ones == 6:
+                if self._in_frame and len(bits) >= pymma.AX25_MIN_BITS:
+                    frame = self._check_frame(bits)
+                    if frame:
+                        frames.append((transition, frame))
+                bits.clear()
+                self._in_frame = True
+                self._skip_zero = True
+                self._prev_ones = 0
+                continue
+
+            if ones > 6 or not self._in_frame:
+                self._in_frame = False
+                continue
+
+            if self._skip_zero:
+                self._skip_zero = False
+            elif self._prev_ones != 5:
+                bits.append(0)
+            bits.extend(b'\x01' * ones)
+            self._prev_ones = ones
+
+            if len(bits) > pymma.AX25_MAX_BITS:
+                self._in_frame = False
+                bits.clear()
+
+        return frames
+
+    def _check_frame(self, bits: bytearray):
+        if len(bits) % 8:
+            return None
+
+        data = np.packbits(
+            np.frombuffer(bits, dtype=np.uint8), bitorder='little').tobytes()
+        fcs = data[-2] | (data[-1] << 8)
+        if pymma.ax25_fcs(data[:-2]) != fcs:
+            self.stats['fcs_errors'] += 1
+            return None
+
+        try:
+            frame = pymma.decode_ax25(data[:-2])
+        except pymma.InvalidFrame:
+            self.stats['invalid_frames'] += 1
+            return None
+
+        self.stats['frames'] += 1
+        return frame
+
+
+def decode_pcm_chunk(path: str, data_offset: int, start: int,
+                     own_start: int, stop: int) -> list:
+    """
+    Decodes samples [start, stop) of the S16_LE PCM at data_offset in a
+    file, returning (sample_index, frame) tuples for the frames that end at
+    or after own_start.
+
+    The samples before own_start overlap the previous chunk, so frames
+    straddling a chunk boundary are decoded whole, and are only returned by
+    the chunk their closing flag falls in. The file is memory-mapped, so
+    worker processes read only their own chunk.
+    """
+    _require_numpy()
+    frames = []
+    with open(path, 'rb') as pcm_file:
+        with mmap.mmap(
+                pcm_file.fileno(), 0, access=mmap.ACCESS_READ) as pcm_map:
+            samples = np.frombuffer(
+                pcm_map, dtype='<i2', count=stop - start,
+                offset=data_offset + start * 2)
+            demodulator = AFSKDemodulator()
+            block = None
+            for index in range(0, len(samples), pymma.DECODE_BLOCK_SAMPLES):
+                block = samples[index:index + pymma.DECODE_BLOCK_SAMPLES]
+                for sample_index, frame in demodulator.process_samples(block):
+                    if start + sample_index >= own_start:
+                        frames.append((start + sample_index, frame))
+            # The mmap can't close while an array still refers to it.
+            del samples, block
+    return frames
+
+
+def afsk_modulate(frames: list, sample_rate: int = pymma.SAMPLE_RATE,
+                  preamble: int = 32, gap: float = 0.5):
+    """
+    Modulates TNC2 frames as AFSK1200 audio, returning int16 samples.
+
+    Used to generate test and benchmark audio.
+    """
+    _require_numpy()
+    flag = [0, 1, 1, 1, 1, 1, 1, 0]
+    samples_per_bit = sample_rate / pymma.AFSK_BAUD
+    gap_samples = np.zeros(int(gap * sample_rate), dtype=np.int16)
+
+    audio = [gap_samples]
+    for frame in frames:
+        data = pymma.encode_ax25(frame)
+        fcs = pymma.ax25_fcs(data)
+        data += bytes([fcs & 0xFF, fcs >> 8])
+
+        bits = flag * preamble
+        ones = 0
+        for byte in data:
+            for shift in range(8):
+                bit = (byte >> shift) & 1
+                bits.append(bit)
+                ones = ones + 1 if bit else 0
+                if ones == 5:
+                    bits.append(0)
+                    ones = 0
+        bits += flag * 4
+
+        # NRZI: a 0 toggles the tone, a 1 keeps it.
+        tones = []
+        mark = True
+        for bit in bits:
+            if not bit:
+                mark = not mark
+            tones.append(mark)
+
+        edges = np.rint(
+            np.arange(len(tones) + 1) * samples_per_bit).astype(int)
+        frequency = np.repeat(
+            np.where(tones, pymma.AFSK_MARK, pymma.AFSK_SPACE),
+            np.diff(edges))
+        phase = np.cumsum(2 * math.pi * frequency / sample_rate)
+        audio.append((np.sin(phase) * 16384).astype(np.int16))
+        audio.append(gap_samples)
+
+    return np.concatenate(audio)
+
+
+class EnergyGate(object):  # pylint: disable=too-many-instance-attributes
+
+    """
+    Passes audio on only around activity, so silence is not decoded.
+
+    The power of every window of samples is measured at once over the
+    whole block with numpy. A window above the threshold opens the gate,
+    which first releases the pre-roll windows held back before it, and
+    stays open for the hang time after the last loud window.
+    """
+
+    def __init__(self, threshold: float = pymma.GATE_THRESHOLD,
+                 window: float = pymma.GATE_WINDOW,
+                 pre_roll: float = pymma.GATE_PRE_ROLL,
+                 hang: float = pymma.GATE_HANG,
+                 sample_rate: int = pymma.SAMPLE_RATE) -> None:
+        _require_numpy()
+        self.window = max(1, int(window * sample_rate))
+        # Threshold as the mean square of int16 samples.
+        self.threshold = (32768 * 10 ** (threshold / 20)) ** 2
+        self.hang_windows = int(round(hang / window))
+        self.is_open = False
+        self._hang = 0
+        self._pre_roll = collections.deque(
+            maxlen=int(round(pre_roll / window)))
+        self._partial = np.empty(0, np.int16)
+        self._odd_byte = b''
+
+        self.stats: dict = {
+            'samples_in': 0,
+            'samples_out': 0,
+            'openings': 0,
+            'duty_cycle': 0.0,
+        }
+
+    def process(self, pcm):
+        """
+        Gates a block of S16_LE PCM (or int16 samples, which are copied),
+        returning the int16 samples to decode, possibly none.
+        """
+        if isinstance(pcm, np.ndarray):
+            samples = np.array(pcm, np.int16)
+        else:
+            if self._odd_byte:
+                pcm = self._odd_byte + pcm
+                self._odd_byte = b''
+            if len(pcm) % 2:
+                self._odd_byte = pcm[-1:]
+                pcm = pcm[:-1]
+            samples = np.frombuffer(pcm, '<i2')
+        self.stats['samples_in'] += len(samples)
+
+        if len(self._partial):
+            samples = np.concatenate((self._partial, samples))
+        windows = len(samples) // self.window
+        self._partial = samples[windows * self.window:]
+
+        blocks = samples[:windows * self.window].reshape(windows, self.window)
+        floats = blocks.astype(np.float32)
+        loud = (np.einsum('ij,ij->i', floats, floats) / self.window >
+                self.threshold).tolist()
+
+        passed = []
+        for block, is_loud in zip(blocks, loud):
+            if is_loud:
+                if not self.is_open:
+                    self.is_open = True
+                    self.stats['openings'] += 1
+                    passed.extend(self._pre_roll)
+                    self._pre_roll.clear()
+                self._hang = self.hang_windows
+                passed.append(block)
+            elif self.is_open and self._hang > 0:
+                self._hang -= 1
+                passed.append(block)
+            else:
+                self.is_open = False
+                self._pre_roll.append(block)
+
+        if not passed:
+            out = samples[:0]
+        else:
+            out = np.concatenate(passed)
+        self.stats['samples_out'] += len(out)
+        self.stats['duty_cycle'] = (
+            self.stats['samples_out'] / self.stats['samples_in'])
+        return out
+
+
+def fm_modulate(audio, iq_rate: int = pymma.IQ_SAMPLE_RATE,
+                offset: float = 0, deviation: float = 3500,
+                audio_rate: int = pymma.SAMPLE_RATE):
+    """
+    FM modulates int16 audio (eg. from afsk_modulate) as complex64 IQ at
+    offset Hz from the center frequency.
+
+    Used to generate test and benchmark IQ.
+    """
+    _require_numpy()
+    samples = len(audio) * iq_rate // audio_rate
+    upsampled = np.interp(
+        np.arange(samples) * audio_rate / iq_rate, np.arange(len(audio)),
+        np.asarray(audio, np.float64) / 32768)
+    phase = np.cumsum(
+        2 * math.pi * (offset + deviation * upsampled) / iq_rate)
+    return np.exp(1j * np.mod(phase, 2 * math.pi)).astype(np.complex64)
+
+
+def lowpass_taps(num_taps: int, cutoff: float):
+    """
+    Designs a Hamming windowed-sinc low-pass FIR filter, with cutoff as a
+    fraction of the sample rate. The taps are symmetric and sum to 1.
+    """
+    _require_numpy()
+    index = np.arange(num_taps) - (num_taps - 1) / 2
+    taps = np.sinc(2 * cutoff * index) * np.hamming(num_taps)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+class Mixer(object):
+
+    """
+    Shifts complex samples down by a frequency offset, keeping the
+    oscillator phase continuous from block to block.
+    """
+
+    def __init__(self, offset: float, sample_rate: float) -> None:
+        _require_numpy()
+        self.step = -2 * math.pi * offset / sample_rate
+        self._phase = 0.0
+        self._table = np.empty(0, np.complex64)
+        self._out = np.empty(0, np.complex64)
+
+    def process(self, samples):
+        """
+        Returns the mixed samples, in a buffer reused by the next call.
+        """
+        count = len(samples)
+        if len(self._table) != count:
+            self._table = np.exp(
+                1j * self.step * np.arange(count)).astype(np.complex64)
+            self._out = np.empty(count, np.complex64)
+
+        out = self._out
+        np.multiply(samples, self._table, out=out)
+        out *= np.complex64(complex(
+            math.cos(self._phase), math.sin(self._phase)))
+        self._phase = math.fmod(self._phase + self.step * count, 2 * math.pi)
+        return out
+
+
+class Decimator(object):
+
+    """
+    Decimating FIR filter for complex samples.
+
+    Only every decimation'th output is computed: a strided
+    sliding_window_view of the input is multiplied with the taps, which
+    costs the same as a polyphase filterbank. The complex samples are
+    viewed as float32 pairs so each tap costs two real multiplies, and the
+    input and output buffers are reused between blocks.
+    """
+
+    def __init__(self, decimation: int, taps) -> None:
+        _require_numpy()
+        self.decimation = decimation
+        # The filter is symmetric, so correlating with the taps (as the
+        # matrix product does) is the same as convolving.
+        self.taps = taps
+        self._held = 0
+        self._buffer = np.zeros(len(taps) + decimation, np.complex64)
+        self._out = np.empty((0, 2), np.float32)
+
+    def process(self, samples):
+        """
+        Filters and decimates a block, returning complex64 samples in a
+        buffer reused by the next call.
+        """
+        num_taps = len(self.taps)
+        total = self._held + len(samples)
+        if len(self._buffer) < total:
+            buffer = np.empty(total, np.complex64)
+            buffer[:self._held] = self._buffer[:self._held]
+            self._buffer = buffer
+        buffer = self._buffer
+        buffer[self._held:total] = samples
+
+        outputs = max(0, (total - num_taps) // self.decimation + 1)
+        if len(self._out) < outputs:
+            self._out = np.empty((outputs, 2), np.float32)
+        out = self._out[:outputs]
+
+        if outputs:
+            windows = sliding_window_view(
+                buffer[:total].view(np.float32).reshape(-1, 2),
+                num_taps, axis=0)[::self.decimation][:outputs]
+            np.matmul(windows, self.taps, out=out)
+
+        # Keep the samples the next outputs still need.
+        consumed = outputs * self.decimation
+        self._held = total - consumed
+        buffer[:self._held] = buffer[consumed:total]
+
+        return out.view(np.complex64).ravel()
+
+
+class Discriminator(object):
+
+    """
+    Quadrature FM discriminator, turning baseband IQ at the audio sample
+    rate into float32 audio scaled to +/-1 at the peak deviation.
+    """
+
+    def __init__(self, audio_rate: int = pymma.SAMPLE_RATE,
+                 deviation: float = pymma.FM_DEVIATION) -> None:
+        _require_numpy()
+        self.gain = audio_rate / (2 * math.pi * deviation)
+        self._last = np.complex64(0)
+        self._product = np.empty(0, np.complex64)
+        self._audio = np.empty(0, np.float32)
+
+    def process(self, baseband):
+        """
+        Demodulates a block of complex64 baseband, returning float32 audio
+        in a buffer reused by the next call.
+        """
+        count = len(baseband)
+        if len(self._audio) < count:
+            self._product = np.empty(count, np.complex64)
+            self._audio = np.empty(count, np.float32)
+        product = self._product[:count]
+        audio = self._audio[:count]
+        if not count:
+            return audio
+
+        # The phase difference between consecutive samples.
+        product[0] = self._last
+        product[1:] = baseband[:-1]
+        np.conjugate(product, out=product)
+        np.multiply(product, baseband, out=product)
+        self._last = baseband[-1]
+
+        np.arctan2(product.imag, product.real, out=audio)
+        audio *= self.gain
+        return audio
+
+
+class FMDemodulator(object):
+
+    """
+    Narrowband FM receiver: mixes the channel to baseband, filters and
+    decimates the IQ to the audio sample rate and runs a quadrature
+    discriminator.
+
+    Audio is float32, scaled to +/-1 at the peak deviation.
+    """
+
+    def __init__(self, iq_rate: int = pymma.IQ_SAMPLE_RATE,
+                 audio_rate: int = pymma.SAMPLE_RATE, offset: float = 0,
+                 deviation: float = pymma.FM_DEVIATION,
+                 taps_per_phase: int = pymma.FIR_TAPS_PER_PHASE) -> None:
+        _require_numpy()
+        if iq_rate % audio_rate:
+            raise ValueError(
+                'IQ sample rate {} is not a multiple of the audio sample '
+                'rate {}'.format(iq_rate, audio_rate))
+        decimation = iq_rate // audio_rate
+
+        self.mixer = Mixer(offset, iq_rate) if offset else None
+        # Pass the channel (deviation plus the 2200 Hz tone) with some
+        # margin, stopping before the decimated Nyquist frequency.
+        self.decimator = Decimator(
+            decimation,
+            lowpass_taps(decimation * taps_per_phase + 1, 0.4 / decimation))
+        self.discriminator = Discriminator(audio_rate, deviation)
+        self._pcm = np.empty(0, np.int16)
+
+        self.stats: dict = {
+            'iq_samples': 0,
+            'audio_samples': 0,
+        }
+
+    def process(self, iq):
+        """
+        Demodulates a block of complex64 IQ, returning float32 audio in a
+        buffer reused by the next call.
+        """
+        self.stats['iq_samples'] += len(iq)
+        if self.mixer is not None:
+            iq = self.mixer.process(iq)
+        audio = self.discriminator.process(self.decimator.process(iq))
+        self.stats['audio_samples'] += len(audio)
+        return audio
+
+    def to_pcm(self, audio):
+        """
+        Converts audio to S16_LE PCM in a buffer reused by the next call,
+        overwriting audio.
+        """
+        if len(self._pcm) < len(audio):
+            self._pcm = np.empty(len(audio), np.int16)
+        pcm = self._pcm[:len(audio)]
+        np.clip(audio * 16384, -32768, 32767, out=audio)
+        pcm[:] = audio
+        return pcm
+
+
+def _to_complex(raw, offset: float, scale, out) -> None:
+    """Converts interleaved integer I/Q to complex64 samples in out."""
+    floats = out.view(np.float32)
+    np.subtract(raw, offset, out=floats, casting='unsafe')
+    floats *= scale
+
+
+class Channelizer(object):  # pylint: disable=too-many-instance-attributes
+
+    """
+    Splits one wideband IQ stream into several narrowband FM channels, each
+    with its own FM discriminator and AFSK1200 decoder.
+
+    All channels share one FFT filterbank: each FFT of the capture is
+    reused by every channel, which picks its bins around the channel
+    frequency, applies the channel filter to them and takes an inverse FFT
+    only as long as its decimated output. Successive FFTs overlap by the
+    filter length (overlap-save). The result is FMDemodulator's mixer,
+    filter and decimator, except that the filter's response beyond the
+    decimated Nyquist frequency is cut off rather than aliased.
+
+    The forward FFT costs about as much as one FMDemodulator, each channel
+    a fraction of one, so this pays off from a few channels up. Everything
+    runs on the calling thread.
+    """
+
+    def __init__(self, frequencies: list, center: float,  # NOQA pylint: disable=too-many-arguments
+                 iq_rate: int = pymma.IQ_SAMPLE_RATE,
+                 deviation: float = pymma.FM_DEVIATION,
+                 taps_per_phase: int = pymma.FIR_TAPS_PER_PHASE,
+                 outputs: int = pymma.CHANNELIZER_OUTPUTS) -> None:
+        _require_numpy()
+        if iq_rate % pymma.SAMPLE_RATE:
+            raise ValueError(
+                'IQ sample rate {} is not a multiple of the audio sample '
+                'rate {}'.format(iq_rate, pymma.SAMPLE_RATE))
+        for frequency in frequencies:
+            if abs(frequency - center) > iq_rate / 2 - pymma.SAMPLE_RATE / 2:
+                raise ValueError(
+                    'Channel {} Hz is outside the {} S/s capture centered '
+                    'on {} Hz'.format(frequency, iq_rate, center))
+
+        self.frequencies = list(frequencies)
+        self.iq_rate = iq_rate
+        self.decimation = iq_rate // pymma.SAMPLE_RATE
+        taps = lowpass_taps(
+            self.decimation * taps_per_phase + 1, 0.4 / self.decimation)
+
+        # Each FFT overlaps the previous one by a whole number of outputs
+        # covering the filter, and is a power of two outputs long.
+        overlap = -(-(len(taps) - 1) // self.decimation)
+        fft_outputs = 1
+        while fft_outputs < max(outputs, 4 * overlap):
+            fft_outputs *= 2
+        self.fft_size = fft_outputs * self.decimation
+        self.overlap = overlap * self.decimation
+        self._first_output = overlap
+
+        # The bins of a decimated output, as offsets from the channel bin.
+        self._bins = np.fft.fftfreq(fft_outputs, 1 / fft_outputs).astype(int)
+        self._filter = np.fft.fft(taps, self.fft_size)[
+            self._bins % self.fft_size] / self.decimation
+
+        # Channels are mixed down by a whole number of bins, the rest of
+        # their offset is rotated out of the decimated output.
+        output_index = np.arange(
+            self._first_output, fft_outputs) * self.decimation
+        self._channel_bins = []
+        self._residuals = []
+        self._rotations = []
+        for frequency in self.frequencies:
+            offset = frequency - center
+            channel_bin = int(round(offset * self.fft_size / iq_rate))
+            residual = offset - channel_bin * iq_rate / self.fft_size
+            self._channel_bins.append(channel_bin)
+            self._residuals.append(residual)
+            self._rotations.append(
+                np.exp(-2j * math.pi * residual * output_index / iq_rate))
+
+        # The stream starts after overlap samples of silence, so the first
+        # FFT already yields output for the first samples. numpy's FFTs are
+        # faster in double precision.
+        self._buffer = np.zeros(self.fft_size, np.complex128)
+        self._held = self.overlap
+        self._position = -self.overlap
+
+        self.discriminators = [
+            Discriminator(pymma.SAMPLE_RATE, deviation)
+            for _ in self.frequencies]
+        self.demodulators = [AFSKDemodulator() for _ in self.frequencies]
+        # Live per-channel decoder stats.
+        self.stats = [demodulator.stats for demodulator in self.demodulators]
+
+    def _channel(self, index: int, spectrum):
+        """Returns a channel's baseband from the FFT at self._position."""
+        channel_bin = self._channel_bins[index]
+        baseband = np.fft.ifft(
+            spectrum[(channel_bin + self._bins) % self.fft_size] *
+            self._filter)[self._first_output:]
+
+        # Line the channel's phase up with the previous FFT's. Turns are
+        # kept modulo 1 so they stay exact for long streams.
+        position = self._position
+        turns = math.fmod(
+            (channel_bin * position % self.fft_size) / self.fft_size +
+            self._residuals[index] * position / self.iq_rate, 1)
+        baseband *= self._rotations[index]
+        baseband *= complex(
+            math.cos(2 * math.pi * turns), -math.sin(2 * math.pi * turns))
+        return baseband.astype(np.complex64)
+
+    def process(self, iq) -> list:
+        """
+        Demodulates a block of complex64 IQ on every channel, returning a
+        list of (frequency, frame) tuples.
+
+        Output lags the input by up to one FFT, frames are returned once
+        the FFT covering their end has been taken.
+        """
+        results = []
+        step = self.fft_size - self.overlap
+        offset = 0
+        while offset < len(iq):
+            taken = min(len(iq) - offset, self.fft_size - self._held)
+            self._buffer[self._held:self._held + taken] = \
+                iq[offset:offset + taken]
+            self._held += taken
+            offset += taken
+            if self._held < self.fft_size:
+                break
+
+            spectrum = np.fft.fft(self._buffer)
+            for index, frequency in enumerate(self.frequencies):
+                audio = self.discriminators[index].process(
+                    self._channel(index, spectrum))
+                results.extend(
+                    (frequency, frame) for _, frame in
+                    self.demodulators[index].process_samples(audio))
+
+            self._buffer[:self.overlap] = self._buffer[step:]
+            self._held = self.overlap
+            self._position += step
+        return results
+
+
+class IQFileSource(object):
+
+    """
+    Reads IQ samples from a file or FIFO, eg. the output of rtl_sdr.
+
+    Formats are cu8 (rtl_sdr), cs8, cs16 and cf32 interleaved I/Q.
+    """
+
+    FORMATS = {
+        'cu8': ('u1', 127.5, 127.5),
+        'cs8': ('i1', 0, 128),
+        'cs16': ('<i2', 0, 32768),
+        'cf32': ('<f4', 0, 1),
+    }
+
+    def __init__(self, path: str, iq_format: str = pymma.IQ_FORMAT) -> None:
+        _require_numpy()
+        if iq_format not in self.FORMATS:
+            raise ValueError(
+                'Unknown IQ format "{}", expected one of: {}'.format(
+                    iq_format, ', '.join(sorted(self.FORMATS))))
+        dtype, self._offset, scale = self.FORMATS[iq_format]
+        self._dtype = np.dtype(dtype)
+        self._scale = np.float32(1 / scale)
+        # A recording ends at EOF, while a FIFO's writer may come back.
+        self.finite = os.path.isfile(path)
+        self._file = open(path, 'rb', buffering=0)
+        self._raw = bytearray()
+        self._samples = np.empty(0, np.complex64)
+
+    def read(self, count: int):
+        """
+        Reads up to count samples, returning complex64 samples in a buffer
+        reused by the next call; empty at EOF.
+        """
+        sample_bytes = 2 * self._dtype.itemsize
+        if len(self._raw) != count * sample_bytes:
+            self._raw = bytearray(count * sample_bytes)
+            self._samples = np.empty(count, np.complex64)
+
+        view = memoryview(self._raw)
+        filled = 0
+        while filled < len(view):
+            read = self._file.readinto(view[filled:])
+            if not read:
+                break
+            filled += read
+
+        samples = self._samples[:filled // sample_bytes]
+        _to_complex(
+            np.frombuffer(self._raw, self._dtype, count=2 * len(samples)),
+            self._offset, self._scale, samples)
+        return samples
+
+    def close(self) -> None:
+        """Closes the file."""
+        self._file.close()
+
+
+class RtlSdrSource(object):
+
+    """Reads IQ samples from an RTL-SDR dongle through pyrtlsdr."""
+
+    def __init__(self, frequency: float, sample_rate: int, ppm: int = 0,
+                 gain='auto', device_index: int = 0) -> None:
+        if rtlsdr is None:
+            raise ImportError(
+                'The rtlsdr IQ device requires pyrtlsdr, try: '
+                'pip install pyrtlsdr')
+        _require_numpy()
+        self.finite = False
+        self._samples = np.empty(0, np.complex64)
+
+        self._sdr = rtlsdr.RtlSdr(device_index)
+        self._sdr.sample_rate = sample_rate
+        self._sdr.center_freq = frequency
+        if ppm:
+            self._sdr.freq_correction = ppm
+        self._sdr.gain = gain
+
+    def read(self, count: int):
+        """
+        Reads count samples, returning complex64 samples in a buffer reused
+        by the next call.
+        """
+        raw = self._sdr.read_bytes(2 * count)
+        if len(self._samples) != len(raw) // 2:
+            self._samples = np.empty(len(raw) // 2, np.complex64)
+        _to_complex(
+            np.frombuffer(raw, np.uint8), 127.5, np.float32(1 / 127.5),
+            self._samples)
+        return self._samples
+
+    def close(self) -> None:
+        """Closes the device."""
+        self._sdr.close()
+
+
+class SoapySource(object):
+
+    """Reads IQ samples from any SoapySDR device."""
+
+    def __init__(self, frequency: float, sample_rate: int, gain=None,
+                 args: str = '') -> None:
+        if SoapySDR is None:
+            raise ImportError(
+                'The soapy IQ device requires the SoapySDR Python bindings')
+        _require_numpy()
+        self.finite = False
+        self._samples = np.empty(0, np.complex64)
+
+        self._sdr = SoapySDR.Device(args)
+        self._sdr.setSampleRate(SoapySDR.SOAPY_SDR_RX, 0, sample_rate)
+        self._sdr.setFrequency(SoapySDR.SOAPY_SDR_RX, 0, frequency)
+        if gain is None or gain == 'auto':
+            self._sdr.setGainMode(SoapySDR.SOAPY_SDR_RX, 0, True)
+        else:
+            self._sdr.setGain(SoapySDR.SOAPY_SDR_RX, 0, float(gain))
+        self._stream = self._sdr.setupStream(
+            SoapySDR.SOAPY_SDR_RX, SoapySDR.SOAPY_SDR_CF32)
+        self._sdr.activateStream(self._stream)
+
+    def read(self, count: int):
+        """
+        Reads count samples, returning complex64 samples in a buffer reused
+        by the next call.
+        """
+        if len(self._samples) != count:
+            self._samples = np.empty(count, np.complex64)
+        filled = 0
+        while filled < count:
+            result = self._sdr.readStream(
+                self._stream, [self._samples[filled:]], count - filled,
+                timeoutUs=1000000)
+            if result.ret < 0:
+                raise IOError(
+                    'SoapySDR readStream failed: {}'.format(
+                        SoapySDR.errToStr(result.ret)))
+            filled += result.ret
+        return self._samples
+
+    def close(self) -> None:
+        """Stops and closes the stream and device."""
+        self._sdr.deactivateStream(self._stream)
+        self._sdr.closeStream(self._stream)
+
+
+def open_iq_source(iq_config: dict, frequency: float):
+    """
+    Opens the IQ source described by the `iq` config section: a `path` to a
+    file or FIFO, or a `device` (rtlsdr or soapy) with its center frequency
+    tuned to frequency (Hz).
+    """
+    sample_rate = int(iq_config.get('sample_rate', pymma.IQ_SAMPLE_RATE))
+    device = iq_config.get('device')
+
+    if device == 'rtlsdr':
+        return RtlSdrSource(
+            frequency, sample_rate, int(iq_config.get('ppm', 0)),
+            iq_config.get('gain', 'auto'),
+            int(iq_config.get('device_index', 0)))
+    elif device == 'soapy':
+        return SoapySource(
+            frequency, sample_rate, iq_config.get('gain'),
+            iq_config.get('args', ''))
+    elif device is not None:
+        raise ValueError(
+            'Unknown IQ device "{}", expected rtlsdr or soapy'.format(device))
+
+    return IQFileSource(
+        iq_config['path'], iq_config.get('format', pymma.IQ_FORMAT))
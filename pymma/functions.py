@@ -3,20 +3,287 @@
 
 """PYMMA Beacon functions."""
 
+import collections
 import datetime
+import errno
+import functools
+import itertools
 import json
 import os
+import selectors
+import socket
+import time
 
 import aprslib
 
 from aprslib.packets.base import APRSPacket
 
+import pymma
+
 
 __author__ = 'Greg Albrecht W2GMD <oss@undef.net>'
 __copyright__ = 'Copyright 2016 Dominik Heidler'
 __license__ = 'GNU General Public License, Version 3'
 
 
+def encode_frame(frame) -> bytes:
+    """
+    Encodes a queued frame as a newline terminated APRS-IS line.
+    """
+    if isinstance(frame, bytes):
+        return frame + b'\n'
+    return bytes(str(frame) + '\n', 'utf8')
+
+
+def parse_gateway(gateway: str) -> tuple:
+    """
+    Splits a gateway into (host, port), eg. 'noam.aprs2.net:14580' or
+    '[2000::1234]:14580'.
+    """
+    host, _, port = gateway.rpartition(':')
+    return host.strip('[]'), int(port)
+
+
+def happy_eyeballs_connect(host: str, port: int,  # NOQA pylint: disable=too-many-locals,too-many-branches
+                           family: int = socket.AF_UNSPEC,
+                           timeout: float = pymma.CONNECT_TIMEOUT,
+                           delay: float = pymma.HAPPY_EYEBALLS_DELAY
+                           ) -> socket.socket:
+    """
+    Connects to host, racing its addresses Happy Eyeballs style (RFC 8305).
+
+    Address families are interleaved and a new attempt is started every
+    `delay` seconds (or as soon as one fails) while earlier attempts are
+    still pending. The first to connect wins and is returned in blocking
+    mode.
+    """
+    addrinfo = socket.getaddrinfo(host, port, family, socket.SOCK_STREAM)
+
+    by_family: collections.OrderedDict = collections.OrderedDict()
+    for info in addrinfo:
+        by_family.setdefault(info[0], []).append(info)
+    candidates = [
+        info for infos in itertools.zip_longest(*by_family.values())
+        for info in infos if info]
+
+    deadline = time.monotonic() + timeout
+    next_attempt = 0.0
+    errors: list = []
+    winner = None
+    selector = selectors.DefaultSelector()
+
+    try:
+        while winner is None:
+            now = time.monotonic()
+
+            if candidates and now >= next_attempt:
+                info = candidates.pop(0)
+                sock = socket.socket(*info[0:3])
+                sock.setblocking(False)
+                err = sock.connect_ex(info[4])
+                if err in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                    selector.register(sock, selectors.EVENT_WRITE)
+                    next_attempt = now + delay
+                else:
+                    errors.append(OSError(err, os.strerror(err)))
+                    sock.close()
+                continue
+
+            if not selector.get_map():
+                raise OSError(
+                    'Failed to connect to {}:{}: {}'.format(
+                        host, port, errors or 'no addresses'))
+            if now >= deadline:
+                raise socket.timeout(
+                    'Timed out connecting to {}:{}'.format(host, port))
+
+            wait = deadline - now
+            if candidates:
+                wait = min(wait, max(0.0, next_attempt - now))
+
+            for key, _ in selector.select(wait):
+                sock = key.fileobj
+                selector.unregister(sock)
+                err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if err:
+                    errors.append(OSError(err, os.strerror(err)))
+                    sock.close()
+                    next_attempt = 0.0
+                elif winner is None:
+                    winner = sock
+                else:
+                    sock.close()
+    finally:
+        for key in list(selector.get_map().values()):
+            key.fileobj.close()
+        selector.close()
+
+    winner.setblocking(True)
+    return winner
+
+
+def _make_fcs_table() -> list:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0x8408
+            else:
+                crc >>= 1
+        table.append(crc)
+    return table
+
+
+_FCS_TABLE = _make_fcs_table()
+
+# Maps each AX.25 address byte to its ASCII character (addresses are stored
+# shifted left by one bit).
+_AX25_ADDRESS_TABLE = bytes(byte >> 1 for byte in range(256))
+
+
+def ax25_fcs(data: bytes) -> int:
+    """
+    Calculates the AX.25 Frame Check Sequence (CRC-16/X.25).
+    """
+    crc = 0xFFFF
+    table = _FCS_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc ^ 0xFFFF
+
+
+_AX25_SSIDS = [b''] + [b'-' + str(ssid).encode() for ssid in range(1, 16)]
+
+
+@functools.lru_cache(maxsize=4096)
+def _decode_ax25_address(address: bytes) -> bytes:
+    # The same few callsigns and digipeaters make up most addresses heard.
+    return address[:6].translate(_AX25_ADDRESS_TABLE).rstrip(b' ') + \
+        _AX25_SSIDS[(address[6] >> 1) & 0x0F]
+
+
+def decode_ax25(frame: bytes) -> bytes:
+    """
+    Decodes an AX.25 UI frame (without FCS) into the TNC2 form multimon-ng
+    prints, eg. b'SRC>DST,DIGI*:payload'.
+
+    The payload is cut at the first CR or LF, as APRS-IS igates do: the
+    uplink, spool and fan-out are line based, and the rest of the payload
+    would otherwise be sent as a packet of its own.
+    """
+    view = memoryview(frame)
+    frame_len = len(view)
+
+    # The address field ends with the first SSID byte with bit 0 set.
+    offset = 6
+    while offset < frame_len and not view[offset] & 0x01:
+        offset += 7
+    if offset >= frame_len:
+        raise pymma.InvalidFrame('Unterminated AX.25 address field')
+
+    control = offset + 1
+    addresses = control // 7
+    if addresses < 2 or addresses > 10:
+        raise pymma.InvalidFrame(
+            'Invalid AX.25 address count: {}'.format(addresses))
+    if control + 2 > frame_len or view[control] != 0x03 or \
+            view[control + 1] != 0xF0:
+        raise pymma.InvalidFrame('Not an AX.25 UI frame')
+
+    header = [
+        _decode_ax25_address(bytes(view[7:14])),
+        b'>',
+        _decode_ax25_address(bytes(view[0:7])),
+    ]
+    for digi in range(14, control, 7):
+        header.append(b',')
+        header.append(_decode_ax25_address(bytes(view[digi:digi + 7])))
+        if view[digi + 6] & 0x80:
+            header.append(b'*')
+    header.append(b':')
+    header.append(
+        bytes(view[control + 2:]).partition(b'\r')[0].partition(b'\n')[0])
+    return b''.join(header)
+
+
+def _encode_ax25_address(address: bytes, last: bool) -> bytes:
+    repeated = address.endswith(b'*')
+    callsign, _, ssid = address.rstrip(b'*').partition(b'-')
+    ssid_byte = 0x60 | (int(ssid or 0) << 1)
+    if repeated:
+        ssid_byte |= 0x80
+    if last:
+        ssid_byte |= 0x01
+    return bytes(byte << 1 for byte in callsign.ljust(6)[:6]) + \
+        bytes([ssid_byte])
+
+
+def encode_ax25(frame: bytes) -> bytes:
+    """
+    Encodes a TNC2 frame, eg. b'SRC>DST,DIGI*:payload', as an AX.25 UI frame
+    (without FCS).
+    """
+    header, _, payload = frame.partition(b':')
+    source, _, path = header.partition(b'>')
+    addresses = [address for address in path.split(b',') if address]
+    addresses.insert(1, source)
+    last = len(addresses) - 1
+    return b''.join(
+        _encode_ax25_address(address, index == last)
+        for index, address in enumerate(addresses)) + b'\x03\xf0' + payload
+
+
+def kiss_unescape(data: bytes) -> bytes:
+    """
+    Undoes the KISS escaping of FEND and FESC bytes in a frame.
+    """
+    return data.replace(
+        pymma.KISS_FESC + pymma.KISS_TFEND, pymma.KISS_FEND).replace(
+            pymma.KISS_FESC + pymma.KISS_TFESC, pymma.KISS_FESC)
+
+
+def encode_kiss(frame: bytes, port: int = 0) -> bytes:
+    """
+    Encodes an AX.25 frame as a KISS data frame for the TNC port.
+    """
+    escaped = frame.replace(
+        pymma.KISS_FESC, pymma.KISS_FESC + pymma.KISS_TFESC).replace(
+            pymma.KISS_FEND, pymma.KISS_FESC + pymma.KISS_TFEND)
+    return b''.join((
+        pymma.KISS_FEND, bytes([port << 4]), escaped, pymma.KISS_FEND))
+
+
+def get_receiver_configs(config: dict) -> list:
+    """
+    Builds one config per receiver.
+
+    Each entry in `receivers` is merged over the top-level config, with
+    nested sections (eg. `rtl`) merged key by key. Without `receivers` the
+    top-level config describes a single receiver.
+    """
+    receivers = config.get('receivers')
+    if not receivers:
+        return [dict(config, name=config.get('name', 'default'))]
+
+    receiver_configs = []
+    for index, receiver in enumerate(receivers):
+        receiver_config = dict(config)
+        del receiver_config['receivers']
+
+        for key, value in receiver.items():
+            if isinstance(value, dict) and isinstance(config.get(key), dict):
+                receiver_config[key] = dict(config[key], **value)
+            else:
+                receiver_config[key] = value
+
+        receiver_config['name'] = receiver.get(
+            'name', '{}{}'.format(receiver_config.get('source'), index))
+        receiver_configs.append(receiver_config)
+
+    return receiver_configs
+
+
 def process_ambiguity(position: str, ambiguity: int) -> str:
     """
     Recalculate Postition with given Ambiguity.
@@ -53,6 +320,112 @@ def encode_lng(lng: float) -> str:
     return "%03i%05.2f" % (lng_deg, lng_min)
 
 
+def _decode_uncompressed(payload: bytes, offset: int) -> tuple:
+    # DDMM.mmN, symbol table, DDDMM.mmW, with ambiguity spaces as zeros.
+    lat = payload[offset:offset + 8].replace(b' ', b'0')
+    lng = payload[offset + 9:offset + 18].replace(b' ', b'0')
+    if len(lng) != 9 or lat[4:5] != b'.' or lng[5:6] != b'.':
+        return None
+    latitude = int(lat[:2]) + float(lat[2:7]) / 60
+    longitude = int(lng[:3]) + float(lng[3:8]) / 60
+    if lat[7:8] == b'S':
+        latitude = -latitude
+    elif lat[7:8] != b'N':
+        return None
+    if lng[8:9] == b'W':
+        longitude = -longitude
+    elif lng[8:9] != b'E':
+        return None
+    return latitude, longitude
+
+
+def _decode_compressed(payload: bytes, offset: int) -> tuple:
+    # Symbol table, then latitude and longitude as 4 base-91 digits each.
+    digits = payload[offset + 1:offset + 9]
+    if len(digits) != 8 or min(digits) < 33 or max(digits) > 124:
+        return None
+    lat = ((digits[0] - 33) * 753571 + (digits[1] - 33) * 8281 +
+           (digits[2] - 33) * 91 + digits[3] - 33)
+    lng = ((digits[4] - 33) * 753571 + (digits[5] - 33) * 8281 +
+           (digits[6] - 33) * 91 + digits[7] - 33)
+    return 90 - lat / 380926, -180 + lng / 190463
+
+
+def _decode_mic_e(dest: bytes, payload: bytes) -> tuple:
+    # Latitude digits and flags are in the destination callsign.
+    dest = dest[:6]
+    if len(dest) != 6 or len(payload) < 4:
+        return None
+    digits = []
+    for char in dest:
+        if 48 <= char <= 57:
+            digits.append(char - 48)
+        elif 65 <= char <= 74:
+            digits.append(char - 65)
+        elif 80 <= char <= 89:
+            digits.append(char - 80)
+        elif char in b'KLZ':
+            digits.append(0)
+        else:
+            return None
+    latitude = digits[0] * 10 + digits[1] + (
+        digits[2] * 10 + digits[3] + (digits[4] * 10 + digits[5]) / 100) / 60
+    if dest[3] < 80:
+        latitude = -latitude
+
+    degrees = payload[1] - 28
+    if dest[4] >= 80:
+        degrees += 100
+    if 180 <= degrees <= 189:
+        degrees -= 80
+    elif 190 <= degrees <= 199:
+        degrees -= 190
+    minutes = payload[2] - 28
+    if minutes >= 60:
+        minutes -= 60
+    longitude = degrees + (minutes + (payload[3] - 28) / 100) / 60
+    if dest[5] >= 80:
+        longitude = -longitude
+    return latitude, longitude
+
+
+def decode_position(dest: bytes, payload: bytes) -> tuple:
+    """
+    Decodes the (lat, lng) of a position, Mic-E, object or item report
+    from its raw destination and payload, or returns None if there is none.
+    """
+    data_type = payload[:1]
+    if data_type in b'!=':
+        offset = 1
+    elif data_type in b'/@':
+        offset = 8
+    elif data_type == b';':
+        offset = 18
+    elif data_type == b')':
+        offset = min(
+            (index for index in (payload.find(b'!', 4, 11),
+                                 payload.find(b'_', 4, 11)) if index > 0),
+            default=-1) + 1
+        if not offset:
+            return None
+    elif data_type in b"`'\x1c\x1d":
+        return _decode_mic_e(dest, payload)
+    else:
+        return None
+
+    try:
+        if payload[offset:offset + 1].isdigit():
+            position = _decode_uncompressed(payload, offset)
+        else:
+            position = _decode_compressed(payload, offset)
+    except ValueError:
+        return None
+    if position is None or not (-90 <= position[0] <= 90 and
+                                -180 <= position[1] <= 180):
+        return None
+    return position
+
+
 def get_beacon_frame(lat: float, lng: float, callsign: str, table: str,  # NOQA pylint: disable=too-many-arguments
                      symbol: str, comment: str,
                      ambiguity: float) -> APRSPacket:
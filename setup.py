@@ -34,9 +34,16 @@ setuptools.setup(
     description='Python Multimon APRS',
     entry_points={
         'console_scripts': [
-            'pymma = pymma.cmd:cli'
+            'pymma = pymma.cmd:cli',
+            'pymma-bench = pymma.cmd:bench',
+            'pymma-heard = pymma.cmd:heard',
+            'pymma-decode = pymma.cmd:decode'
         ]
     },
+    extras_require={
+        'native': ['numpy'],
+        'rtlsdr': ['numpy', 'pyrtlsdr']
+    },
     include_package_data=True,
     install_requires=[
         'aprslib',
@@ -0,0 +1,628 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for PYMMA Classes."""
+
+import os
+import queue
+import random
+import shutil
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+import pymma
+import pymma.cmd
+
+__author__ = 'Greg Albrecht W2GMD <oss@undef.net>'
+__copyright__ = 'Copyright 2016 Dominik Heidler'
+__license__ = 'GNU General Public License, Version 3'
+
+
+class DupeCacheTest(unittest.TestCase):  # NOQA pylint: disable=missing-docstring
+
+    def test_ttl(self):
+        dupe_cache = pymma.DupeCache(ttl=30)
+        self.assertFalse(dupe_cache.is_dupe((b'N0CALL', b'APRS', b'>a'), 0))
+        self.assertTrue(dupe_cache.is_dupe((b'N0CALL', b'APRS', b'>a'), 29))
+        self.assertFalse(dupe_cache.is_dupe((b'N0CALL', b'APRS', b'>b'), 29))
+        # The first copy has expired, so the frame is gated again.
+        self.assertFalse(dupe_cache.is_dupe((b'N0CALL', b'APRS', b'>a'), 31))
+        self.assertEqual(1, dupe_cache.stats['hits'])
+        self.assertEqual(1, dupe_cache.stats['expired'])
+        self.assertEqual(2, len(dupe_cache))
+
+    def test_eviction(self):
+        dupe_cache = pymma.DupeCache(ttl=30, max_entries=3)
+        for payload in (b'>a', b'>b', b'>c', b'>d'):
+            self.assertFalse(
+                dupe_cache.is_dupe((b'N0CALL', b'APRS', payload), 0))
+        self.assertEqual(3, len(dupe_cache))
+        self.assertEqual(1, dupe_cache.stats['evictions'])
+        # The oldest key made room, the newest are still remembered.
+        self.assertTrue(dupe_cache.is_dupe((b'N0CALL', b'APRS', b'>d'), 1))
+        self.assertFalse(dupe_cache.is_dupe((b'N0CALL', b'APRS', b'>a'), 1))
+
+
+class FrameQueueTest(unittest.TestCase):  # NOQA pylint: disable=missing-docstring
+
+    @staticmethod
+    def _drain(frame_queue: pymma.FrameQueue) -> list:
+        items = []
+        while True:
+            try:
+                items.append(frame_queue.get(False))
+            except queue.Empty:
+                return items
+
+    def test_priority_lane(self):
+        frame_queue = pymma.FrameQueue(10)
+        frame_queue.put('rf1')
+        frame_queue.put('beacon', priority=True)
+        frame_queue.put('rf2')
+        self.assertEqual(['beacon', 'rf1', 'rf2'], self._drain(frame_queue))
+
+    def test_drop_oldest(self):
+        frame_queue = pymma.FrameQueue(2, 'drop_oldest')
+        for item in ('a', 'b', 'c'):
+            frame_queue.put(item)
+        self.assertEqual(['b', 'c'], self._drain(frame_queue))
+        self.assertEqual(1, frame_queue.stats['dropped_oldest'])
+        self.assertEqual(2, frame_queue.stats['high_water'])
+
+    def test_drop_newest(self):
+        frame_queue = pymma.FrameQueue(2, 'drop_newest')
+        frame_queue.put('a')
+        frame_queue.put('b')
+        with self.assertRaises(queue.Full):
+            frame_queue.put('c')
+        self.assertEqual(['a', 'b'], self._drain(frame_queue))
+        self.assertEqual(1, frame_queue.stats['dropped_newest'])
+
+    def test_priority_when_full(self):
+        frame_queue = pymma.FrameQueue(2, 'drop_newest')
+        frame_queue.put('a')
+        frame_queue.put('b')
+        # Locally generated frames displace the oldest RF frame.
+        frame_queue.put('beacon', priority=True)
+        self.assertEqual(['beacon', 'b'], self._drain(frame_queue))
+
+    def test_block_times_out(self):
+        frame_queue = pymma.FrameQueue(1, 'block', block_timeout=0.05)
+        frame_queue.put('a')
+        started = time.monotonic()
+        with self.assertRaises(queue.Full):
+            frame_queue.put('b')
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertEqual(1, frame_queue.stats['dropped_newest'])
+
+    def test_block_waits_for_room(self):
+        frame_queue = pymma.FrameQueue(1, 'block', block_timeout=5)
+        frame_queue.put('a')
+        consumer = threading.Timer(0.05, frame_queue.get)
+        consumer.start()
+        frame_queue.put('b')
+        consumer.join()
+        self.assertEqual(['b'], self._drain(frame_queue))
+        self.assertEqual(0, frame_queue.stats['dropped_newest'])
+
+    def test_block_put_nowait(self):
+        frame_queue = pymma.FrameQueue(1, 'block', block_timeout=5)
+        frame_queue.put('a')
+        started = time.monotonic()
+        with self.assertRaises(queue.Full):
+            frame_queue.put_nowait('b')
+        with self.assertRaises(queue.Full):
+            frame_queue.put('b', block=False)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(2, frame_queue.stats['dropped_newest'])
+
+    def test_block_put_timeout(self):
+        frame_queue = pymma.FrameQueue(1, 'block', block_timeout=5)
+        frame_queue.put('a')
+        started = time.monotonic()
+        with self.assertRaises(queue.Full):
+            frame_queue.put('b', timeout=0.05)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertLess(time.monotonic() - started, 1)
+        with self.assertRaises(ValueError):
+            frame_queue.put('b', timeout=-1)
+
+
+FRAME = b'N0CALL>APRS,WIDE1-1:>spooled %d\n'
+
+
+class SpoolTest(unittest.TestCase):  # NOQA pylint: disable=missing-docstring
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    @staticmethod
+    def _frames(records: list) -> list:
+        return [raw_frame for _, raw_frame in records]
+
+    def test_replay(self):
+        spool = pymma.Spool(self.path)
+        spool.extend([FRAME % 0, FRAME % 1])
+        spool.extend([FRAME % 2, FRAME % 3, FRAME % 4])
+        self.assertTrue(spool)
+        self.assertEqual([FRAME % 0, FRAME % 1, FRAME % 2],
+                         self._frames(spool.pop(3)))
+        self.assertEqual([FRAME % 3, FRAME % 4], self._frames(spool.pop(10)))
+        self.assertEqual([], spool.pop(10))
+        self.assertFalse(spool)
+        self.assertEqual(5, spool.stats['replayed'])
+        spool.close()
+
+    def test_stamps_kept_through_replay(self):
+        spool = pymma.Spool(self.path, max_age=60)
+        received = time.monotonic() - 50
+        spool.extend([FRAME % 0], [received])
+        records = spool.pop(10)
+        self.assertAlmostEqual(received, records[0][0], places=2)
+
+        # Spooled again after failing to send, it keeps its age and expires.
+        stamps = [stamp for stamp, _ in records]
+        spool.extend(self._frames(records), stamps)
+        spool.max_age = 40
+        self.assertEqual([], spool.pop(10))
+        self.assertEqual(1, spool.stats['expired'])
+        spool.close()
+
+    def test_segment_rotation(self):
+        spool = pymma.Spool(self.path, segment_bytes=100)
+        for index in range(10):
+            spool.extend([FRAME % index])
+        self.assertGreater(spool.stats['segments'], 1)
+        self.assertEqual([FRAME % index for index in range(10)],
+                         self._frames(spool.pop(100)))
+        self.assertEqual(0, spool.stats['segments'])
+        spool.close()
+
+    def test_segment_rotation_within_batch(self):
+        spool = pymma.Spool(self.path, segment_bytes=100)
+        spool.extend([FRAME % index for index in range(20)])
+        spool.close()
+        sizes = [os.path.getsize(os.path.join(self.path, name))
+                 for name in os.listdir(self.path)]
+        self.assertGreater(len(sizes), 1)
+        self.assertLess(max(sizes), 100 + len(FRAME) + 20)
+
+    def test_max_bytes(self):
+        spool = pymma.Spool(self.path, segment_bytes=100, max_bytes=300)
+        for index in range(20):
+            spool.extend([FRAME % index])
+        self.assertGreater(spool.stats['dropped_segments'], 0)
+        self.assertLessEqual(spool.stats['bytes'], 300)
+        # The oldest frames were dropped to make room.
+        frames = self._frames(spool.pop(100))
+        self.assertEqual(FRAME % 19, frames[-1])
+        self.assertNotIn(FRAME % 0, frames)
+        spool.close()
+
+    def test_max_bytes_single_segment(self):
+        spool = pymma.Spool(self.path, segment_bytes=10000, max_bytes=300)
+        for index in range(20):
+            spool.extend([FRAME % index])
+            self.assertLessEqual(spool.stats['bytes'], 300)
+        self.assertGreater(spool.stats['dropped_segments'], 0)
+        spool.close()
+
+    def test_max_age(self):
+        spool = pymma.Spool(self.path, max_age=60)
+        spool.extend([FRAME % 0], [time.monotonic() - 120])
+        spool.extend([FRAME % 1])
+        self.assertEqual([FRAME % 1], self._frames(spool.pop(10)))
+        self.assertEqual(1, spool.stats['expired'])
+        spool.close()
+
+    def test_reopen(self):
+        spool = pymma.Spool(self.path, segment_bytes=100)
+        for index in range(5):
+            spool.extend([FRAME % index])
+        spool.close()
+        spool = pymma.Spool(self.path, segment_bytes=100)
+        self.assertTrue(spool)
+        spool.extend([FRAME % 5])
+        self.assertEqual([FRAME % index for index in range(6)],
+                         self._frames(spool.pop(100)))
+        spool.close()
+
+
+FRAMES = [
+    b'N0CALL-%d>APRS,WIDE1-1:!3745.00N/12224.00W-PYMMA %d' % (
+        index % 15 + 1, index) for index in range(200)]
+
+
+class UplinkBatchingTest(unittest.TestCase):  # NOQA pylint: disable=missing-docstring
+
+    """Sends queued frames through each transport to a local stand-in."""
+
+    def _send(self, stand_in, config: dict) -> tuple:
+        lines: list = []
+        stand_in.on_line = lambda line, received: lines.append(line)
+        stand_in.start()
+        config.update({
+            'callsign': 'N0CALL',
+            'passcode': '-1',
+            'gateways': ['127.0.0.1:{}'.format(stand_in.port)],
+        })
+
+        frame_queue = pymma.FrameQueue.from_config(config)
+        for frame in FRAMES:
+            frame_queue.put(frame)
+        igate_thread = pymma.IGateThread(frame_queue, config)
+        igate_thread.start()
+
+        deadline = time.monotonic() + 10
+        while len(lines) < len(FRAMES) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        igate_thread.stop()
+        igate_thread.join(5)
+        stand_in.close()
+        return igate_thread.stats, lines
+
+    def _assert_batched(self, stats: dict, lines: list) -> None:
+        self.assertEqual(FRAMES, lines)
+        self.assertEqual(len(FRAMES), stats['frames_sent'])
+        self.assertLess(stats['batches'], len(FRAMES))
+        self.assertGreater(stats['max_batch_frames'], 1)
+
+    def test_tcp(self):
+        stats, lines = self._send(pymma.cmd._APRSISStandIn(), {  # NOQA pylint: disable=protected-access
+            'tcp': {'batch_bytes': 2048, 'batch_latency': 0.05}})
+        self._assert_batched(stats, lines)
+        self.assertEqual(1, stats['connects'])
+
+    def test_tcp_batch_bytes(self):
+        stats, _ = self._send(pymma.cmd._APRSISStandIn(), {  # NOQA pylint: disable=protected-access
+            'tcp': {'batch_bytes': 512, 'batch_latency': 0.05}})
+        # A batch stops at the first frame that fills the byte budget.
+        max_frame = max(len(frame) + 1 for frame in FRAMES)
+        self.assertLessEqual(
+            stats['bytes_sent'] / stats['batches'], 512 + max_frame)
+
+    def test_udp(self):
+        stand_in = pymma.cmd._UDPStandIn()  # NOQA pylint: disable=protected-access
+        stats, lines = self._send(stand_in, {
+            'transport': 'udp',
+            'udp': {
+                'gateway': '127.0.0.1:{}'.format(stand_in.port),
+                'batch_frames': 50,
+            }})
+        self._assert_batched(stats, lines)
+        self.assertLessEqual(stats['max_batch_frames'], 50)
+
+    def test_http(self):
+        stand_in = pymma.cmd._HTTPStandIn()  # NOQA pylint: disable=protected-access
+        stats, lines = self._send(stand_in, {
+            'transport': 'http',
+            'http': {'url': stand_in.url, 'batch_frames': 50},
+        })
+        self._assert_batched(stats, lines)
+        self.assertLessEqual(stats['max_batch_frames'], 50)
+        self.assertEqual(0, stats['send_errors'])
+
+    def test_http_batch_bytes(self):
+        stand_in = pymma.cmd._HTTPStandIn()  # NOQA pylint: disable=protected-access
+        stats, lines = self._send(stand_in, {
+            'transport': 'http',
+            'http': {
+                'url': stand_in.url,
+                'batch_frames': len(FRAMES),
+                'batch_bytes': 512,
+                'batch_latency': 0.05,
+            },
+            # The TCP budget doesn't apply to HTTP batches.
+            'tcp': {'batch_bytes': 2},
+        })
+        self._assert_batched(stats, lines)
+        max_frame = max(len(frame) + 2 for frame in FRAMES)
+        self.assertLessEqual(
+            stats['bytes_sent'] / stats['batches'], 512 + max_frame)
+        self.assertGreater(stats['bytes_sent'] / stats['batches'], 256)
+
+
+class FrameFilterTest(unittest.TestCase):  # NOQA pylint: disable=missing-docstring
+
+    def test_rate_limit(self):
+        rule = pymma.FilterRule('flood', rate=2, per=60)
+        self.assertFalse(rule.matches(b'N0CALL', b'APRS', [], b'>a', 0))
+        self.assertFalse(rule.matches(b'N0CALL', b'APRS', [], b'>b', 1))
+        self.assertTrue(rule.matches(b'N0CALL', b'APRS', [], b'>c', 2))
+        # Other sources have their own bucket.
+        self.assertFalse(rule.matches(b'W2GMD', b'APRS', [], b'>a', 2))
+        # A token comes back every 30 seconds.
+        self.assertFalse(rule.matches(b'N0CALL', b'APRS', [], b'>d', 32))
+        self.assertTrue(rule.matches(b'N0CALL', b'APRS', [], b'>e', 33))
+
+    def test_rate_limit_by_all(self):
+        rule = pymma.FilterRule('flood', rate=1, per=60, by='all')
+        self.assertFalse(rule.matches(b'N0CALL', b'APRS', [], b'>a', 0))
+        self.assertTrue(rule.matches(b'W2GMD', b'APRS', [], b'>a', 1))
+
+    def test_max_keys(self):
+        rule = pymma.FilterRule('flood', rate=1, per=60, max_keys=2)
+        for source in (b'A', b'B', b'C'):
+            rule.matches(source, b'APRS', [], b'>a', 0)
+        self.assertEqual(2, len(rule._buckets))  # NOQA pylint: disable=protected-access
+
+    def test_max_keys_evicts_least_recently_seen(self):
+        rule = pymma.FilterRule('flood', rate=2, per=60, max_keys=2)
+        self.assertFalse(rule.matches(b'BUSY', b'APRS', [], b'>a', 0))
+        self.assertFalse(rule.matches(b'QUIET', b'APRS', [], b'>a', 1))
+        self.assertFalse(rule.matches(b'BUSY', b'APRS', [], b'>b', 2))
+        # QUIET is evicted, not BUSY, which keeps its exhausted bucket.
+        self.assertFalse(rule.matches(b'NEW', b'APRS', [], b'>a', 3))
+        self.assertTrue(rule.matches(b'BUSY', b'APRS', [], b'>c', 4))
+
+    def test_conditions(self):
+        rule = pymma.FilterRule(
+            'weather', types=['weather'], source=['CW'], payload='^_')
+        self.assertTrue(rule.matches(b'CW1234', b'APRS', [], b'_10090556'))
+        self.assertFalse(rule.matches(b'N0CALL', b'APRS', [], b'_10090556'))
+        self.assertFalse(rule.matches(b'CW1234', b'APRS', [], b'>status'))
+        with self.assertRaises(ValueError):
+            pymma.FilterRule('empty')
+        with self.assertRaises(ValueError):
+            pymma.FilterRule.from_config({'sorce': ['N0CALL']}, 'typo')
+
+    def test_from_config(self):
+        frame_filter = pymma.FrameFilter.from_config({
+            'reject_internet': True,
+            'filters': [{'name': 'no_wx', 'types': ['weather']}],
+        })
+        self.assertEqual('reject_paths', frame_filter.match(
+            b'N0CALL', b'APRS', [b'TCPIP*'], b'>status').name)
+        self.assertEqual('reject_internet', frame_filter.match(
+            b'N0CALL', b'APRS', [], b'}W2GMD>APRS,TCPIP:>status').name)
+        self.assertEqual('no_wx', frame_filter.match(
+            b'N0CALL', b'APRS', [], b'_10090556c220s004g005t077').name)
+        self.assertIsNone(frame_filter.match(
+            b'N0CALL', b'APRS', [b'WIDE1-1'], b'>status'))
+        hits = {rule.name: rule.stats['hits'] for rule in frame_filter.rules}
+        self.assertEqual(
+            {'reject_paths': 1, 'reject_internet': 1, 'no_wx': 1}, hits)
+
+
+class GeofenceTest(unittest.TestCase):  # NOQA pylint: disable=missing-docstring
+
+    def setUp(self):
+        self.circle = pymma.CircleFence('bay', 37.75, -122.4, 50)
+        self.polygon = pymma.PolygonFence(
+            'square', [[40, -100], [40, -98], [42, -98], [42, -100]])
+        self.geofence = pymma.Geofence([self.circle, self.polygon], 0.5)
+
+    def test_fences(self):
+        self.assertTrue(self.circle.contains(37.9, -122.3))
+        self.assertFalse(self.circle.contains(38.5, -122.4))
+        self.assertTrue(self.polygon.contains(41, -99))
+        self.assertFalse(self.polygon.contains(43, -99))
+
+    def test_locate(self):
+        self.assertIs(self.circle, self.geofence.locate(37.9, -122.3))
+        self.assertIs(self.polygon, self.geofence.locate(41, -99))
+        self.assertIsNone(self.geofence.locate(0, 0))
+        self.assertEqual(1, self.circle.stats['frames'])
+
+    def test_grid_matches_fences(self):
+        # The grid lookup agrees with testing every fence, near their edges
+        # as well as in cells they cover entirely.
+        rng = random.Random(1)
+        for _ in range(5000):
+            lat = rng.uniform(36.5, 43)
+            lng = rng.uniform(-124, -97)
+            if rng.random() < 0.5:
+                lng = rng.uniform(-124, -121)
+            expected = self.circle.contains(lat, lng) or \
+                self.polygon.contains(lat, lng)
+            self.assertEqual(
+                expected, self.geofence.locate(lat, lng) is not None,
+                (lat, lng))
+
+    def test_matches(self):
+        # Positions outside every fence are dropped.
+        self.assertFalse(self.geofence.matches(
+            b'N0CALL', b'APRS', [], b'!3745.00N/12224.00W-'))
+        self.assertTrue(self.geofence.matches(
+            b'N0CALL', b'APRS', [], b'!3000.00N/09000.00W-'))
+        # Frames without a position pass.
+        self.assertFalse(self.geofence.matches(
+            b'N0CALL', b'APRS', [], b'>status'))
+        self.assertEqual(2, self.geofence.stats['positions'])
+
+    def test_from_config(self):
+        geofence = pymma.Geofence.from_config({'geofence': {'fences': [
+            {'name': 'bay', 'lat': 37.75, 'lng': -122.4, 'radius_km': 50},
+            {'polygon': [[40, -100], [40, -98], [42, -98]]}]}})
+        self.assertEqual(['bay', 'fence1'],
+                         [fence.name for fence in geofence.fences])
+        self.assertIsNone(pymma.Geofence.from_config({}))
+
+
+class DecodePositionTest(unittest.TestCase):  # NOQA pylint: disable=missing-docstring
+
+    def assertPosition(self, expected, position):  # NOQA pylint: disable=invalid-name
+        self.assertIsNotNone(position)
+        self.assertAlmostEqual(expected[0], position[0], places=3)
+        self.assertAlmostEqual(expected[1], position[1], places=3)
+
+    def test_uncompressed(self):
+        self.assertPosition((37.75, -122.4), pymma.decode_position(
+            b'APRS', b'!3745.00N/12224.00W-'))
+        self.assertPosition((-33.5, 151.25), pymma.decode_position(
+            b'APRS', b'@092345z3330.00S/15115.00E_'))
+
+    def test_compressed(self):
+        # The example from the APRS 1.01 specification.
+        self.assertPosition((49.5, -72.75), pymma.decode_position(
+            b'APRS', b'!/5L!!<*e7>7P['))
+
+    def test_no_position(self):
+        self.assertIsNone(pymma.decode_position(b'APRS', b'>status'))
+        self.assertIsNone(pymma.decode_position(b'APRS', b'!garbage'))
+
+
+class HeardListTest(unittest.TestCase):  # NOQA pylint: disable=missing-docstring
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'heard.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _rows(self) -> dict:
+        database = sqlite3.connect(self.path)
+        rows = {
+            row[0]: row[1:] for row in database.execute(
+                'SELECT callsign, lat, lng, path, packets FROM heard')}
+        database.close()
+        return rows
+
+    def test_upsert(self):
+        heard_list = pymma.HeardList(self.path)
+        heard_list.heard(
+            b'N0CALL-1', b'APRS', [b'WIDE1-1'], b'!3745.00N/12224.00W-')
+        heard_list.heard(b'N0CALL-1', b'APRS', [], b'>status')
+        self.assertEqual(1, heard_list.flush())
+        self.assertEqual(0, heard_list.flush())
+
+        heard_list.heard(b'N0CALL-1', b'APRS', [b'WIDE2-1'], b'>status')
+        heard_list.flush()
+        heard_list.close()
+        # Packets add up across flushes and the last position is kept.
+        lat, lng, path, packets = self._rows()['N0CALL-1']
+        self.assertAlmostEqual(37.75, lat)
+        self.assertAlmostEqual(-122.4, lng)
+        self.assertEqual('WIDE2-1', path)
+        self.assertEqual(3, packets)
+        self.assertEqual(3, heard_list.get('N0CALL-1')['packets'])
+
+    def test_lru(self):
+        heard_list = pymma.HeardList(self.path, max_entries=2)
+        for source in (b'A', b'B', b'A', b'C'):
+            heard_list.heard(source, b'APRS', [], b'>status')
+        # B was heard least recently, so it made room for C.
+        self.assertEqual(2, len(heard_list))
+        self.assertIsNone(heard_list.get('B'))
+        self.assertEqual(['C', 'A'], [
+            station['callsign'] for station in heard_list.recent()])
+        self.assertEqual(1, heard_list.stats['evictions'])
+
+        # Evicted stations are still written out.
+        self.assertEqual(3, heard_list.flush())
+        heard_list.close()
+        self.assertEqual(
+            {'A': 2, 'B': 1, 'C': 1},
+            {callsign: row[3] for callsign, row in self._rows().items()})
+
+    def test_no_path(self):
+        heard_list = pymma.HeardList()
+        heard_list.heard(b'N0CALL', b'APRS', [], b'>status')
+        self.assertEqual(0, heard_list.flush())
+        self.assertEqual(1, heard_list.get('N0CALL')['packets'])
+
+
+class FanoutServerTest(unittest.TestCase):  # NOQA pylint: disable=missing-docstring
+
+    def setUp(self):
+        self.server = pymma.FanoutServer({
+            'callsign': 'N0CALL',
+            'append_callsign': True,
+            'server': {'port': 0, 'max_buffer': 4096, 'keepalive': 0},
+        })
+        self.server.start()
+        deadline = time.monotonic() + 5
+        while self.server.server_socket is None and \
+                time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.address = self.server.server_socket.getsockname()
+
+    def tearDown(self):
+        self.server.stop()
+        self.server.join(5)
+
+    def _wait_for(self, condition) -> None:
+        deadline = time.monotonic() + 10
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_stream(self):
+        client = socket.create_connection(self.address)
+        client.settimeout(5)
+        self.assertTrue(client.recv(1024).startswith(b'# pymma'))
+        self._wait_for(lambda: self.server.stats['clients'])
+
+        client.sendall(b'user W2GMD pass -1 vers test 1.0\r\n')
+        self.assertTrue(client.recv(1024).startswith(b'# logresp W2GMD'))
+
+        self.server.publish(b'W2GMD-1', b'APRS', [b'WIDE1-1'], b'>one')
+        self.server.publish(b'W2GMD-2', b'APRS', [], b'>two')
+        received = b''
+        while received.count(b'\n') < 2:
+            received += client.recv(1024)
+        self.assertEqual(
+            b'W2GMD-1>APRS,WIDE1-1,qAR,N0CALL:>one\r\n'
+            b'W2GMD-2>APRS,qAR,N0CALL:>two\r\n', received)
+        client.close()
+
+    def test_slow_client(self):
+        client = socket.socket()
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        client.connect(self.address)
+        self._wait_for(lambda: self.server.stats['clients'])
+
+        # The client never reads, so it falls behind and is disconnected.
+        # Each frame is handed over before the next, so none are dropped
+        # on the way to the client however slowly the server runs.
+        payload = b'>' + b'x' * 2000
+        deadline = time.monotonic() + 30
+        while not self.server.stats['slow_disconnects'] and \
+                time.monotonic() < deadline:
+            published = self.server.stats['frames'] + 1
+            self.server.publish(b'W2GMD-1', b'APRS', [], payload)
+            while self.server.stats['frames'] < published and \
+                    time.monotonic() < deadline:
+                time.sleep(0.0001)
+        self._wait_for(lambda: not self.server.stats['clients'])
+        self.assertEqual(0, self.server.stats['dropped'])
+        self.assertEqual(1, self.server.stats['slow_disconnects'])
+        self.assertEqual(0, self.server.stats['clients'])
+        client.close()
+
+    def test_pending_bounded(self):
+        server = pymma.FanoutServer({
+            'callsign': 'N0CALL', 'server': {'max_buffer': 1000}})
+        # Nothing is serving, so frames only pile up until the bound.
+        for frame in range(100):
+            server.publish(b'W2GMD-1', b'APRS', [], b'>frame %d' % frame)
+        self.assertLessEqual(server._pending_bytes, 1000)  # NOQA pylint: disable=protected-access
+        self.assertGreater(server.stats['dropped'], 0)
+        self.assertEqual(
+            100, server.stats['dropped'] + len(server._pending))  # NOQA pylint: disable=protected-access
+
+    def test_gated_frames_only(self):
+        server = pymma.FanoutServer({'callsign': 'N0CALL', 'server': {}})
+        for fast_path in (False, True):
+            multimon_thread = pymma.MultimonThread(pymma.FrameQueue(), {
+                'callsign': 'N0CALL', 'fast_path': fast_path})
+            multimon_thread.gated_listeners.append(server.publish)
+            for frame in (b'W2GMD-1>APRS,WIDE1-1:>gated',
+                          b'W2GMD-2>APRS,NOGATE:>not gated',
+                          b'W2GMD-3>APRS,TCPIP*:>not gated'):
+                multimon_thread.handle_frame(frame)
+        # Without append_callsign no q construct is added either.
+        self.assertEqual(
+            [b'W2GMD-1>APRS,WIDE1-1:>gated\r\n'] * 2,
+            list(server._pending))  # NOQA pylint: disable=protected-access
+
+
+if __name__ == '__main__':
+    unittest.main()
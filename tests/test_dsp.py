@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for PYMMA DSP."""
+
+import concurrent.futures
+import os
+import shutil
+import tempfile
+import unittest
+import wave
+
+try:
+    import numpy  # type: ignore
+except ImportError:  # pragma: no cover
+    numpy = None
+
+import pymma
+import pymma.cmd
+
+__author__ = 'Greg Albrecht W2GMD <oss@undef.net>'
+__copyright__ = 'Copyright 2016 Dominik Heidler'
+__license__ = 'GNU General Public License, Version 3'
+
+
+FRAMES = [
+    b'N0CALL-%d>APRS,WIDE1-1:!3745.00N/12224.00W-PYMMA %d' % (index, index)
+    for index in range(1, 4)]
+
+
+@unittest.skipIf(numpy is None, 'The native decoder requires numpy')
+class IQTest(unittest.TestCase):  # NOQA pylint: disable=missing-docstring
+
+    """Decodes frames from synthetic IQ recordings."""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _write_iq(self, iq, iq_format: str) -> str:
+        interleaved = numpy.empty(2 * len(iq), numpy.float32)
+        interleaved[0::2] = iq.real
+        interleaved[1::2] = iq.imag
+        if iq_format == 'cu8':
+            raw = (interleaved * 127 + 127.5).astype(numpy.uint8)
+        elif iq_format == 'cs16':
+            raw = (interleaved * 32767).astype('<i2')
+        else:
+            raw = interleaved.astype('<f4')
+        path = os.path.join(self.path, 'capture.' + iq_format)
+        raw.tofile(path)
+        return path
+
+    def _decode(self, iq_config: dict, offset: float = 0) -> list:
+        source = pymma.open_iq_source(iq_config, 144390000)
+        fm_demodulator = pymma.FMDemodulator(offset=offset)
+        demodulator = pymma.AFSKDemodulator()
+        frames = []
+        while True:
+            iq = source.read(pymma.IQ_BLOCK_SAMPLES)
+            if not len(iq):  # pylint: disable=len-as-condition
+                break
+            audio = fm_demodulator.process(iq)
+            frames.extend(
+                frame for _, frame in demodulator.process_samples(
+                    fm_demodulator.to_pcm(audio)))
+        source.close()
+        self.assertTrue(source.finite)
+        return frames
+
+    def test_cu8(self):
+        iq = pymma.fm_modulate(pymma.afsk_modulate(FRAMES))
+        path = self._write_iq(iq, 'cu8')
+        self.assertEqual(FRAMES, self._decode({'path': path}))
+
+    def test_offset(self):
+        # A channel 25 kHz off the center frequency is mixed down first.
+        iq = pymma.fm_modulate(pymma.afsk_modulate(FRAMES), offset=25000)
+        path = self._write_iq(iq, 'cs16')
+        self.assertEqual(FRAMES, self._decode(
+            {'path': path, 'format': 'cs16'}, offset=25000))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            pymma.open_iq_source(
+                {'path': os.devnull, 'format': 'cs4'}, 144390000)
+
+
+@unittest.skipIf(numpy is None, 'The native decoder requires numpy')
+class ChannelizerTest(unittest.TestCase):  # NOQA pylint: disable=missing-docstring
+
+    """Decodes two channels from one synthetic IQ capture."""
+
+    center = 144390000
+    # Neither offset falls on an FFT bin.
+    offsets = (-60013.7, 70021.3)
+    channel_frames = (
+        FRAMES,
+        [b'W2GMD-%d>APRS,WIDE2-1:>channel two %d' % (index, index)
+         for index in range(1, 4)])
+
+    def setUp(self):
+        audio = [pymma.afsk_modulate(frames) for frames in self.channel_frames]
+        samples = max(len(channel_audio) for channel_audio in audio)
+        iq = sum(
+            pymma.fm_modulate(
+                numpy.pad(channel_audio, (0, samples - len(channel_audio))),
+                offset=offset)
+            for offset, channel_audio in zip(self.offsets, audio))
+        self.iq = (iq / 2).astype(numpy.complex64)
+        self.frequencies = [self.center + offset for offset in self.offsets]
+
+    def _assert_decoded(self, decoded: list) -> None:
+        for frequency, frames in zip(self.frequencies, self.channel_frames):
+            self.assertEqual(frames, [
+                frame for channel, frame in decoded if channel == frequency])
+
+    def test_one_block(self):
+        channelizer = pymma.Channelizer(self.frequencies, self.center)
+        self._assert_decoded(channelizer.process(self.iq))
+        self.assertEqual(
+            [len(frames) for frames in self.channel_frames],
+            [stats['frames'] for stats in channelizer.stats])
+
+    def test_blocks(self):
+        # Block boundaries don't line up with the FFTs.
+        channelizer = pymma.Channelizer(self.frequencies, self.center)
+        decoded = []
+        for index in range(0, len(self.iq), 5000):
+            decoded.extend(channelizer.process(self.iq[index:index + 5000]))
+        self._assert_decoded(decoded)
+
+    def test_outside_capture(self):
+        with self.assertRaises(ValueError):
+            pymma.Channelizer(
+                [self.center + pymma.IQ_SAMPLE_RATE / 2], self.center)
+
+
+@unittest.skipIf(numpy is None, 'The native decoder requires numpy')
+class DecodeChunkTest(unittest.TestCase):  # NOQA pylint: disable=missing-docstring
+
+    """Decodes a recording in chunks, as pymma-decode does."""
+
+    frames = [
+        b'N0CALL-%d>APRS,WIDE1-1:!3745.00N/12224.00W-PYMMA %d' % (
+            index % 15 + 1, index) for index in range(20)]
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.pcm = pymma.afsk_modulate(self.frames).astype('<i2').tobytes()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _decode(self, path: str, chunk_seconds: float) -> list:
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            samples, frames = pymma.cmd._decode_file(  # NOQA pylint: disable=protected-access
+                executor, path, int(chunk_seconds * pymma.SAMPLE_RATE),
+                pymma.SAMPLE_RATE)
+            frames = list(frames)
+        self.assertEqual(len(self.pcm) // 2, samples)
+        stamps = [stamp for stamp, _ in frames]
+        self.assertEqual(sorted(stamps), stamps)
+        return [frame for _, frame in frames]
+
+    def test_chunks(self):
+        path = os.path.join(self.path, 'capture.raw')
+        with open(path, 'wb') as pcm_file:
+            pcm_file.write(self.pcm)
+        # Frames straddling a chunk boundary are decoded exactly once.
+        for chunk_seconds in (1.5, 2, 3.7, 100):
+            self.assertEqual(self.frames, self._decode(path, chunk_seconds))
+
+    def test_wav(self):
+        path = os.path.join(self.path, 'capture.wav')
+        with wave.open(path, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(pymma.SAMPLE_RATE)
+            wav_file.writeframes(self.pcm)
+        self.assertEqual(
+            (44, len(self.pcm) // 2), pymma.cmd._pcm_layout(path))  # NOQA pylint: disable=protected-access
+        self.assertEqual(self.frames, self._decode(path, 2))
+
+    def test_decode_pcm_chunk(self):
+        path = os.path.join(self.path, 'capture.raw')
+        with open(path, 'wb') as pcm_file:
+            pcm_file.write(self.pcm)
+        samples = len(self.pcm) // 2
+        everything = pymma.decode_pcm_chunk(path, 0, 0, 0, samples)
+        self.assertEqual(self.frames, [frame for _, frame in everything])
+        # Frames ending before own_start belong to the previous chunk.
+        own_start = everything[5][0] + 1
+        self.assertEqual(everything[6:], pymma.decode_pcm_chunk(
+            path, 0, 0, own_start, samples))
+
+
+if __name__ == '__main__':
+    unittest.main()
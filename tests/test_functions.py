@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for PYMMA Functions."""
+
+import os
+import unittest
+
+import pymma
+
+__author__ = 'Greg Albrecht W2GMD <oss@undef.net>'
+__copyright__ = 'Copyright 2016 Dominik Heidler'
+__license__ = 'GNU General Public License, Version 3'
+
+
+FRAMES = [
+    b'N0CALL>APRS:>status',
+    b'N0CALL-7>APRS,WIDE1-1,WIDE2-1:!3745.00N/12224.00W-PYMMA',
+    b'W2GMD-15>APZMDR,N0CALL-1*,WIDE2-1:`c3Vl!>/]"4V}=',
+    b'N0CALL>APRS,A-1,B-2,C-3,D-4,E-5,F-6,G-7,H-8*::BLN1     :bulletin',
+]
+
+
+class AX25Test(unittest.TestCase):  # pylint: disable=missing-docstring
+
+    def test_round_trip(self):
+        for frame in FRAMES:
+            self.assertEqual(
+                frame, pymma.decode_ax25(pymma.encode_ax25(frame)))
+
+    def test_payload_cut_at_line_end(self):
+        for line_end in (b'\r', b'\n', b'\r\n'):
+            frame = pymma.encode_ax25(
+                b'N0CALL>APRS:>status' + line_end + b'EVIL>APRS:>forged')
+            self.assertEqual(b'N0CALL>APRS:>status', pymma.decode_ax25(frame))
+
+    def test_fcs(self):
+        # The CRC-16/X.25 check value.
+        self.assertEqual(0x906E, pymma.ax25_fcs(b'123456789'))
+
+    def test_invalid_frames(self):
+        frame = pymma.encode_ax25(FRAMES[0])
+        for invalid in (
+                b'',
+                frame[:13],  # Unterminated address field.
+                frame[:7] + frame[14:],  # One address.
+                frame.replace(b'\x03\xf0', b'\x13\xf0')):  # Not UI.
+            with self.assertRaises(pymma.InvalidFrame):
+                pymma.decode_ax25(invalid)
+
+
+class KISSTest(unittest.TestCase):  # pylint: disable=missing-docstring
+
+    def test_escaping(self):
+        frame = b'a\xc0b\xdbc\xdb\xdc\xdb\xdd'
+        encoded = pymma.encode_kiss(frame, port=2)
+        self.assertEqual(b'\xc0\x20', encoded[:2])
+        self.assertEqual(b'\xc0', encoded[-1:])
+        self.assertNotIn(b'\xc0', encoded[1:-1])
+        self.assertEqual(frame, pymma.kiss_unescape(encoded[2:-1]))
+
+    def test_unescape_random(self):
+        for _ in range(200):
+            frame = os.urandom(64)
+            self.assertEqual(
+                frame, pymma.kiss_unescape(pymma.encode_kiss(frame)[2:-1]))
+
+    def test_unescape_unescaped(self):
+        self.assertEqual(b'N0CALL', pymma.kiss_unescape(b'N0CALL'))
+
+
+if __name__ == '__main__':
+    unittest.main()